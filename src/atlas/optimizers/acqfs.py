@@ -1,7 +1,9 @@
 #!/usr/bin/env python
 
 import itertools
+import weakref
 from copy import deepcopy
+from typing import Dict, List, Optional, Tuple
 
 import gpytorch
 import numpy as np
@@ -24,10 +26,28 @@ from botorch.acquisition.multi_objective.monte_carlo import (
 from botorch.acquisition.multi_objective.objective import (
     IdentityMCMultiOutputObjective,
 )
+from botorch.models.kernels.categorical import CategoricalKernel
+from gpytorch.kernels import (
+    AdditiveKernel,
+    InducingPointKernel,
+    Kernel,
+    MaternKernel,
+    ProductKernel,
+    RBFKernel,
+    RQKernel,
+    ScaleKernel,
+)
+from gpytorch.likelihoods import GaussianLikelihood
+from gpytorch.means import ConstantMean
+from gpytorch.models import ExactGP
+from linear_operator.utils.cholesky import psd_safe_cholesky
 
 from atlas import Logger
+from atlas.optimizers.samplers import sample_param_space
 from atlas.optimizers.utils import (
+    ParamEncoder,
     cat_param_to_feat,
+    evaluate_known_constraints,
     forward_normalize,
     propose_randomly,
 )
@@ -189,6 +209,492 @@ class FeasibilityAwareVarainceBased(
         return self.compute_combined_acqf(acqf, X)
 
 
+def generate_X_sns(params_obj, param_space):
+    """generate the expanded representations of all the options of the
+    general parameters (Cartesian product space) with empty (zero) functional
+    parameters
+    Returns:
+            X_sns_empty (torch.Tensor): shape (# general options, 1,
+                # exp param dims)
+            general_raw (list): values of the general parameters of each option
+    """
+    general_params = [param_space[ix] for ix in params_obj.general_dims]
+    cart_product = list(
+        itertools.product(*[param.options for param in general_params])
+    )
+
+    X_sns_empty = torch.zeros(
+        size=(len(cart_product), params_obj.expanded_dims)
+    ).double()
+    general_expanded = []
+    general_raw = []
+    for elem in cart_product:
+        # convert to ohe and add to currently available options
+        ohe = []
+        for val, obj in zip(elem, general_params):
+            if obj.type == "categorical":
+                ohe.append(
+                    cat_param_to_feat(obj, val, params_obj.has_descriptors)
+                )
+            else:
+                ohe.append([val])
+        general_expanded.append(np.concatenate(ohe))
+        general_raw.append(list(elem))
+
+    general_expanded = torch.tensor(np.array(general_expanded)).double()
+
+    X_sns_empty[:, params_obj.exp_general_mask] = general_expanded
+    # forward normalize
+    X_sns_empty = forward_normalize(
+        X_sns_empty,
+        params_obj._mins_x,
+        params_obj._maxs_x,
+    )
+    # TODO: careful of the batch size, will need to change this
+    X_sns_empty = torch.unsqueeze(X_sns_empty, 1)
+
+    return X_sns_empty, general_raw
+
+
+class GeneralOptions:
+    """Encodings of the options of the general parameters, built once per
+    ask() call and shared by the general acquisition function and the
+    variance-based selection of the general parameters. Kernel quantities which
+    only involve the fixed general dimensions of a fitted model are cached as
+    well
+
+    Args:
+            params_obj (obj): atlas Parameters object
+            param_space (obj): Olympus parameter space object
+    """
+
+    def __init__(self, params_obj, param_space):
+        self.params_obj = params_obj
+        self.param_space = param_space
+        self.X_sns_empty, self.general_raw = generate_X_sns(
+            params_obj, param_space
+        )
+        self.functional_dims = np.logical_not(params_obj.exp_general_mask)
+        self.functional_idx = torch.from_numpy(
+            np.where(self.functional_dims)[0]
+        )
+        self.general_idx = torch.from_numpy(np.where(~self.functional_dims)[0])
+        # cached kernel quantities of each fitted model
+        self._kernel_factors = weakref.WeakKeyDictionary()
+
+    def __len__(self) -> int:
+        return self.X_sns_empty.shape[0]
+
+    def expand(self, X: torch.Tensor) -> torch.Tensor:
+        """combine the functional parameters of each sample with every option
+        of the general parameters in a single expand-and-scatter
+
+        Args:
+            X (torch.Tensor): samples with either all the expanded dimensions
+                or only the functional ones, shape (# samples, # batch size,
+                # dims)
+
+        Returns:
+            (torch.Tensor): shape (# samples, # general options, # batch size,
+                # exp param dims)
+        """
+        if X.shape[-1] == self.functional_dims.shape[0]:
+            X = X[..., self.functional_idx]
+        num_samples, q = X.shape[0], X.shape[-2]
+        num_options, num_dims = (
+            self.X_sns_empty.shape[0],
+            self.X_sns_empty.shape[-1],
+        )
+
+        X_sns = (
+            self.X_sns_empty[:, :1, :]
+            .to(X)
+            .expand(num_samples, num_options, q, num_dims)
+            .clone()
+        )
+        X_sns[..., self.functional_idx] = X.unsqueeze(1).expand(
+            num_samples, num_options, q, X.shape[-1]
+        )
+        return X_sns
+
+    def kernel_factors(self, reg_model) -> Dict:
+        """dictionary of the cached kernel quantities of reg_model"""
+        if reg_model not in self._kernel_factors:
+            self._kernel_factors[reg_model] = {}
+        return self._kernel_factors[reg_model]
+
+
+# kernels which only depend on the differences between the inputs
+STATIONARY_KERNELS = (RBFKernel, MaternKernel, RQKernel, CategoricalKernel)
+# kernels combining the values of other kernels
+COMPOSITE_KERNELS = (ScaleKernel, AdditiveKernel, ProductKernel)
+# kernels which are products over their dimensions
+SEPARABLE_KERNELS = (RBFKernel, CategoricalKernel)
+
+
+def is_stationary_kernel(kernel: Kernel) -> bool:
+    """whether the kernel is built from stationary kernels only"""
+    for module in kernel.modules():
+        if not isinstance(module, Kernel) or isinstance(
+            module, COMPOSITE_KERNELS
+        ):
+            continue
+        if not isinstance(module, STATIONARY_KERNELS):
+            return False
+    return True
+
+
+def kernel_active_dims(kernel: Kernel, num_dims: int) -> List[int]:
+    """dimensions of the inputs the kernel acts on"""
+    if kernel.active_dims is None:
+        return list(range(num_dims))
+    return [int(dim) for dim in kernel.active_dims]
+
+
+class RestrictedKernel:
+    """a kernel which is a product over its dimensions (see
+    SEPARABLE_KERNELS), evaluated on a subset of its dimensions only
+
+    Args:
+            kernel (gpytorch.kernels.Kernel): RBF or categorical kernel
+            dims (set): dimensions of the inputs to evaluate the kernel on
+            num_dims (int): number of dimensions of the inputs
+    """
+
+    def __init__(self, kernel: Kernel, dims: set, num_dims: int):
+        kernel_dims = kernel_active_dims(kernel, num_dims)
+        self.kernel = kernel
+        self.num_kernel_dims = len(kernel_dims)
+        # dimensions of the inputs, and of the kernel lengthscales
+        self.dims = [dim for dim in kernel_dims if dim in dims]
+        self.cols = [ix for ix, dim in enumerate(kernel_dims) if dim in dims]
+
+    def __call__(self, X1: torch.Tensor, X2: torch.Tensor) -> torch.Tensor:
+        lengthscale = self.kernel.lengthscale.view(-1)
+        if lengthscale.shape[0] == 1:
+            lengthscale = lengthscale.expand(self.num_kernel_dims)
+        lengthscale = lengthscale[self.cols]
+        X1 = X1[..., self.dims].unsqueeze(-2)
+        X2 = X2[..., self.dims].unsqueeze(-3)
+        if isinstance(self.kernel, RBFKernel):
+            diff = (X1 - X2) / lengthscale
+            return torch.exp(-0.5 * diff.pow(2).sum(dim=-1))
+        # the categorical kernel averages the distances over all its dimensions
+        delta = (X1 != X2).to(lengthscale)
+        return torch.exp(
+            -(delta / lengthscale).sum(dim=-1) / self.num_kernel_dims
+        )
+
+
+def evaluate_kernel_factor(factor, X1, X2) -> torch.Tensor:
+    if isinstance(factor, Kernel):
+        return factor(X1, X2).to_dense()
+    return factor(X1, X2)
+
+
+def general_kernel_terms(
+    kernel: Kernel, general_dims: set, num_dims: int
+) -> Optional[List[Tuple[List, List, List]]]:
+    """decompose the kernel into a sum of terms
+    outputscales * prod(functional factors) * prod(general factors), where the
+    functional factors only depend on the functional dimensions of the inputs
+    and the general factors only on the general dimensions. This is the
+    structure of the kernels of MixedSingleTaskGP (when the general parameters
+    are its only categorical parameters), of categorical kernels and of RBF
+    kernels. Returns None for kernels without this structure, e.g. Matern
+    kernels over all the dimensions
+    """
+    if isinstance(kernel, ScaleKernel):
+        terms = general_kernel_terms(
+            kernel.base_kernel, general_dims, num_dims
+        )
+        if terms is None:
+            return None
+        return [(scales + [kernel], func, gen) for scales, func, gen in terms]
+    if isinstance(kernel, AdditiveKernel):
+        terms = []
+        for sub_kernel in kernel.kernels:
+            sub_terms = general_kernel_terms(
+                sub_kernel, general_dims, num_dims
+            )
+            if sub_terms is None:
+                return None
+            terms.extend(sub_terms)
+        return terms
+    if isinstance(kernel, ProductKernel):
+        term = ([], [], [])
+        for sub_kernel in kernel.kernels:
+            sub_terms = general_kernel_terms(
+                sub_kernel, general_dims, num_dims
+            )
+            # products of sums are not expanded
+            if sub_terms is None or len(sub_terms) != 1:
+                return None
+            for factors, sub_factors in zip(term, sub_terms[0]):
+                factors.extend(sub_factors)
+        return [term]
+
+    kernel_dims = set(kernel_active_dims(kernel, num_dims))
+    if kernel_dims <= general_dims:
+        return [([], [], [kernel])]
+    if not kernel_dims & general_dims:
+        return [([], [kernel], [])]
+    if isinstance(kernel, SEPARABLE_KERNELS):
+        return [
+            (
+                [],
+                [
+                    RestrictedKernel(
+                        kernel, kernel_dims - general_dims, num_dims
+                    )
+                ],
+                [
+                    RestrictedKernel(
+                        kernel, kernel_dims & general_dims, num_dims
+                    )
+                ],
+            )
+        ]
+    return None
+
+
+class GeneralOptionAverage:
+    """Exact posterior of the average of the regression surrogate over the
+    options of the general parameters, f_bar(x) = 1/n sum_s f(x, s). The
+    average is a linear operator A applied to the joint posterior of the n
+    options, i.e. the mean is A mu and the variance is A Sigma A^T.
+
+    For exact GPs with a Gaussian likelihood the averaged cross-covariance with
+    the training data, A K(X_sns, X_train), is computed first, such that only a
+    single triangular solve against the (cached) Cholesky factor of the
+    training covariance is needed per sample, instead of one per option. Other
+    models fall back to the joint posterior of all the options.
+
+    For stationary kernels, the prior covariance between the options of a point
+    does not depend on its functional parameters, such that the prior variance
+    of the average is computed once for the grid of general options. For
+    kernels which are sums of products of factors of the general and of the
+    functional dimensions (see general_kernel_terms), e.g. those of
+    MixedSingleTaskGP and CategoricalSingleTaskGP, the averages over the
+    options of the general factors of the cross-covariance with the training
+    data are cached as well, and only the functional factors are evaluated
+    per sample. Matern kernels over all the dimensions (SingleTaskGP) do not
+    factorize and are evaluated on all the options. These factors are stored
+    on the GeneralOptions of the current ask() call.
+
+    Use get_general_option_average to share the instance (and its cached
+    factors) between all the acquisition functions built on the same fitted
+    model
+
+    Args:
+            reg_model (gpytorch.models.GP): fitted regression surrogate model
+    """
+
+    def __init__(self, reg_model):
+        # the instances are cached per model in get_general_option_average, a
+        # strong reference would keep every fitted model alive
+        self._reg_model = weakref.ref(reg_model)
+        self._operators = {}
+        self._train_factors = None
+        self.is_exact_gp = (
+            isinstance(reg_model, ExactGP)
+            and isinstance(reg_model.likelihood, GaussianLikelihood)
+            and getattr(reg_model, "outcome_transform", None) is None
+            and getattr(reg_model, "input_transform", None) is None
+            and not any(
+                isinstance(module, InducingPointKernel)
+                for module in reg_model.modules()
+            )
+        )
+        if self.is_exact_gp:
+            self.is_stationary = is_stationary_kernel(reg_model.covar_module)
+
+    @property
+    def reg_model(self):
+        """the fitted regression surrogate model"""
+        return self._reg_model()
+
+    def averaging_operator(
+        self, num_options: int, q: int, X: torch.Tensor
+    ) -> torch.Tensor:
+        """(q, num_options * q) operator averaging each of the q points over
+        the options, for inputs ordered as (options, q)
+        """
+        key = (num_options, q, X.dtype, X.device)
+        if key not in self._operators:
+            A = torch.eye(q, dtype=X.dtype, device=X.device).repeat(
+                1, num_options
+            )
+            self._operators[key] = A / num_options
+        return self._operators[key]
+
+    def train_factors(self) -> Tuple[torch.Tensor, torch.Tensor]:
+        """Cholesky factor of the noisy training covariance and the
+        corresponding weights of the posterior mean, computed once per fitted
+        model
+        """
+        if self._train_factors is None:
+            model = self.reg_model
+            train_x = model.train_inputs[0]
+            train_y = model.train_targets
+            with torch.no_grad():
+                K = model.covar_module(train_x).to_dense()
+                noise = model.likelihood.noise.to(K).expand(K.shape[-1])
+                L = psd_safe_cholesky(K + torch.diag_embed(noise))
+                resid = (train_y - model.mean_module(train_x)).unsqueeze(-1)
+                alpha = torch.cholesky_solve(resid, L)
+            self._train_factors = (L, alpha)
+        return self._train_factors
+
+    def _cross_kernel_terms(self, general_options):
+        """terms of the kernel (see general_kernel_terms), with the average
+        over the options of the product of their general factors, or None if
+        the kernel does not factorize
+        """
+        model = self.reg_model
+        factors = general_options.kernel_factors(model)
+        if "cross_general" not in factors:
+            train_x = model.train_inputs[0]
+            terms = general_kernel_terms(
+                model.covar_module,
+                set(general_options.general_idx.tolist()),
+                train_x.shape[-1],
+            )
+            if terms is not None:
+                grid = general_options.X_sns_empty[:, 0, :].to(train_x)
+                averaged_terms = []
+                for scales, func, gen in terms:
+                    # average of the general factors over the options, (N,)
+                    gen_average = None
+                    if gen:
+                        with torch.no_grad():
+                            K_gen = evaluate_kernel_factor(
+                                gen[0], grid, train_x
+                            )
+                            for gen_ in gen[1:]:
+                                K_gen = K_gen * evaluate_kernel_factor(
+                                    gen_, grid, train_x
+                                )
+                        gen_average = K_gen.mean(dim=0)
+                    averaged_terms.append((scales, func, gen_average))
+                terms = averaged_terms
+            factors["cross_general"] = terms
+        return factors["cross_general"]
+
+    def _averaged_cross_covariance(self, X_sns, A, Z, general_options):
+        """A K(X_sns, X_train), with shape (# samples, q, N)"""
+        model = self.reg_model
+        train_x = model.train_inputs[0]
+        terms = None
+        if general_options is not None:
+            terms = self._cross_kernel_terms(general_options)
+        if terms is None:
+            return A @ model.covar_module(Z, train_x).to_dense()
+
+        # the functional parameters are shared by the options of each point
+        X_func = X_sns[:, 0, :, :]
+        K_bar = 0.0
+        for scales, func, gen_average in terms:
+            K_term = torch.ones(X_func.shape[:-1] + train_x.shape[:1]).to(
+                train_x
+            )
+            for func_ in func:
+                K_term = K_term * evaluate_kernel_factor(
+                    func_, X_func, train_x
+                )
+            if gen_average is not None:
+                K_term = K_term * gen_average
+            for scale in scales:
+                K_term = scale.outputscale * K_term
+            K_bar = K_bar + K_term
+        return K_bar
+
+    def _averaged_prior_variance(self, X_sns, A, Z, general_options):
+        """diagonal of A K(X_sns, X_sns) A^T, with shape (# samples, q)"""
+        model = self.reg_model
+        num_samples, _, q, _ = X_sns.shape
+        if not self.is_stationary:
+            return torch.einsum(
+                "ij,bjk,ik->bi", A, model.covar_module(Z).to_dense(), A
+            )
+
+        # the options of a point only differ in the general dimensions, such
+        # that the prior variance of their average is the same for all the
+        # points
+        factors = (
+            {}
+            if general_options is None
+            else general_options.kernel_factors(model)
+        )
+        if "prior_var" not in factors:
+            with torch.no_grad():
+                grid = X_sns[0, :, 0, :].detach()
+                factors["prior_var"] = (
+                    model.covar_module(grid).to_dense().mean()
+                )
+        return factors["prior_var"].expand(num_samples, q)
+
+    def __call__(
+        self,
+        X_sns: torch.Tensor,
+        general_options: Optional[GeneralOptions] = None,
+    ) -> Tuple[torch.Tensor, torch.Tensor]:
+        """posterior mean and variance of the average over the general options
+        Args:
+                X_sns (torch.Tensor): shape (# samples, # general options, q,
+                    # dims)
+                general_options (GeneralOptions): the general options of the
+                    current ask() call, used to cache the kernel factors of the
+                    general dimensions
+        Returns:
+                mean and variance of the average, each with shape
+                (# samples, q)
+        """
+        num_samples, num_options, q, num_dims = X_sns.shape
+        A = self.averaging_operator(num_options, q, X_sns)
+        Z = X_sns.reshape(num_samples, num_options * q, num_dims)
+
+        if self.is_exact_gp:
+            model = self.reg_model
+            L, alpha = self.train_factors()
+            # averaged cross-covariance with the training data, (samples, q, N)
+            K_bar = self._averaged_cross_covariance(
+                X_sns, A, Z, general_options
+            )
+            if isinstance(model.mean_module, ConstantMean):
+                mean = model.mean_module.constant.to(K_bar).expand(
+                    num_samples, q
+                )
+            else:
+                mean = (A @ model.mean_module(Z).unsqueeze(-1)).squeeze(-1)
+            mean = mean + (K_bar @ alpha).squeeze(-1)
+            prior_var = self._averaged_prior_variance(
+                X_sns, A, Z, general_options
+            )
+            V = torch.linalg.solve_triangular(
+                L, K_bar.transpose(-1, -2), upper=False
+            )
+            var = prior_var - V.pow(2).sum(dim=-2)
+        else:
+            mvn = self.reg_model.posterior(Z).mvn
+            mean = mvn.mean.view(num_samples, num_options * q) @ A.T
+            var = torch.einsum("ij,bjk,ik->bi", A, mvn.covariance_matrix, A)
+
+        return mean, var.clamp_min(1e-9)
+
+
+# option averages of the fitted regression models, shared between
+# acquisition functions
+_general_option_averages = weakref.WeakKeyDictionary()
+
+
+def get_general_option_average(reg_model) -> GeneralOptionAverage:
+    """option-averaged posterior of reg_model, created once per fitted model"""
+    if reg_model not in _general_option_averages:
+        _general_option_averages[reg_model] = GeneralOptionAverage(reg_model)
+    return _general_option_averages[reg_model]
+
+
 class FeasibilityAwareGeneral(
     AcquisitionFunction, FeasibilityAwareAcquisition
 ):
@@ -212,6 +718,8 @@ class FeasibilityAwareGeneral(
         use_min_filter=True,
         objective=None,
         maximize=False,
+        exact_posterior=False,
+        general_options=None,
         **kwargs,
     ) -> None:
         super().__init__(reg_model, **kwargs)
@@ -220,6 +728,7 @@ class FeasibilityAwareGeneral(
         self.cla_model = cla_model
         self.cla_likelihood = cla_likelihood
         self.params_obj = params_obj
+        self.exact_posterior = exact_posterior
         self.param_space = param_space
         self.feas_strategy = feas_strategy
         self.feas_param = feas_param
@@ -233,9 +742,19 @@ class FeasibilityAwareGeneral(
         # set the p_feas postprocessing step
         self.set_p_feas_postprocess()
 
-        self.X_sns_empty, _ = self.generate_X_sns()
-        self.functional_dims = np.logical_not(self.params_obj.exp_general_mask)
-        
+        # encodings of the general parameter options, shared within an ask()
+        # call
+        if general_options is None:
+            general_options = GeneralOptions(self.params_obj, self.param_space)
+        self.general_options = general_options
+        self.X_sns_empty = self.general_options.X_sns_empty
+        self.functional_dims = self.general_options.functional_dims
+
+    def expand_general_options(self, X):
+        """combine the functional parameters of each sample with every option
+        of the general parameters, see GeneralOptions.expand
+        """
+        return self.general_options.expand(X)
 
     def forward(self, X):
 
@@ -243,30 +762,29 @@ class FeasibilityAwareGeneral(
         best_f = self.best_f.to(X)
 
         # shape (# samples, # exp general dims, # batch size, # exp param dims)
-        X_sns = torch.empty((X.shape[0],) + self.X_sns_empty.shape).double()
-
-        for x_ix in range(X.shape[0]):
-            X_sn = torch.clone(self.X_sns_empty)
-            #X_sn[:, :, self.functional_dims] = X[x_ix, :] #X[x_ix, :, self.functional_dims]
-            X_sn[:, :, self.functional_dims] = X[x_ix, :, self.functional_dims]
-            X_sns[x_ix, :, :, :] = X_sn
+        X_sns = self.expand_general_options(X)
+        num_samples, num_options, q, num_dims = X_sns.shape
 
-        pred_mu_x, pred_sigma_x = [], []
-
-        for X_sn in X_sns:
-            posterior = self.reg_model.posterior(X_sn.double())
-            mu = posterior.mean
-            view_shape = mu.shape[:-2] if mu.shape[-2] == 1 else mu.shape[:-1]
-            mu = mu.view(view_shape)
-            sigma = posterior.variance.clamp_min(1e-9).sqrt().view(view_shape)
-            pred_mu_x.append(mu)
-            pred_sigma_x.append(sigma)
-
-        pred_mu_x = torch.stack(pred_mu_x)
-        pred_sigma_x = torch.stack(pred_sigma_x)
+        if self.exact_posterior:
+            # posterior of the average over the general parameter options
+            mu_x, var_x = get_general_option_average(self.reg_model)(
+                X_sns, self.general_options
+            )
+            sigma_x = var_x.sqrt()
+        else:
+            # single posterior over all the samples and general options
+            posterior = self.reg_model.posterior(X_sns.view(-1, q, num_dims))
+            pred_mu_x = posterior.mean.view(num_samples, num_options, q)
+            pred_sigma_x = (
+                posterior.variance.clamp_min(1e-9)
+                .sqrt()
+                .view(num_samples, num_options, q)
+            )
 
-        mu_x = torch.mean(pred_mu_x, 0)
-        sigma_x = torch.mean(pred_sigma_x, 0)
+            # approximate the posterior of the average with the averages of the
+            # means and sigmas over the general parameter options
+            mu_x = torch.mean(pred_mu_x, 1)
+            sigma_x = torch.mean(pred_sigma_x, 1)
 
         u = (mu_x - best_f.expand_as(mu_x)) / sigma_x
         if not self.maximize:
@@ -276,53 +794,15 @@ class FeasibilityAwareGeneral(
         )
         ucdf = normal.cdf(u)
         updf = torch.exp(normal.log_prob(u))
-        ei = sigma * (updf + u * ucdf)
+        ei = sigma_x * (updf + u * ucdf)
 
-        return ei
+        return ei.sum(dim=-1)
 
     def generate_X_sns(self):
-        # generate Cartesian product space of the general parameter options
-        param_options = []
-        for ix in self.params_obj.general_dims:
-            param_options.append(self.param_space[ix].options)
-
-        cart_product = list(itertools.product(*param_options))
-        cart_product = [list(elem) for elem in cart_product]
-
-        X_sns_empty = torch.empty(
-            size=(len(cart_product), self.params_obj.expanded_dims)
-        ).double()
-        general_expanded = []
-        general_raw = []
-        for elem in cart_product:
-            # convert to ohe and add to currently available options
-            ohe, raw = [], []
-            for val, obj in zip(elem, self.param_space):
-                if obj.type == "categorical":
-                    ohe.append(
-                        cat_param_to_feat(
-                            obj, val, self.params_obj.has_descriptors
-                        )
-                    )
-                    raw.append(val)
-                else:
-                    ohe.append([val])
-            general_expanded.append(np.concatenate(ohe))
-            general_raw.append(raw)
-
-        general_expanded = torch.tensor(np.array(general_expanded))
-
-        X_sns_empty[:, self.params_obj.exp_general_mask] = general_expanded
-        # forward normalize
-        X_sns_empty = forward_normalize(
-            X_sns_empty,
-            self.params_obj._mins_x,
-            self.params_obj._maxs_x,
+        return (
+            self.general_options.X_sns_empty,
+            self.general_options.general_raw,
         )
-        # TODO: careful of the batch size, will need to change this
-        X_sns_empty = torch.unsqueeze(X_sns_empty, 1)
-
-        return X_sns_empty, general_raw
 
 
 class FeasibilityAwareQEI(qExpectedImprovement, FeasibilityAwareAcquisition):
@@ -611,6 +1091,86 @@ class MedusaAcquisition():
         self.beta = beta
 
 
+    def _gather_options(self, X_funcs, Gs):
+        """ build the expanded representation of all the options of a population
+        of (X_func, G) assignments at once
+
+        Args:
+            X_funcs (list): de-indexified functional parameter settings of each
+                individual, each with shape (Ng, func param dim)
+            Gs (list): subsets of the non-functional parameters of each individual
+
+        Returns:
+            options (torch.Tensor): all the options, (num options, num dims)
+            ind_idx (torch.Tensor): individual of each option, (num options,)
+            group_idx (np.ndarray): position of the functional parameter setting
+                of each option in the concatenated X_funcs, (num options,)
+            si_idx (np.ndarray): non-functional parameter option of each option
+        """
+        ind_idx, group_idx, si_idx = [], [], []
+        group_offset = 0
+        for ind_ix, (X_func, G) in enumerate(zip(X_funcs, Gs)):
+            for g_ix, S in enumerate(G):
+                ind_idx.extend([ind_ix] * len(S))
+                group_idx.extend([group_offset + g_ix] * len(S))
+                si_idx.extend(S)
+            group_offset += len(G)
+        group_idx = np.array(group_idx, dtype=int)
+        si_idx = np.array(si_idx, dtype=int)
+
+        X_func_all = torch.tensor(
+            np.concatenate(
+                [
+                    np.asarray(X_func, dtype=float).reshape(len(G), -1)
+                    for X_func, G in zip(X_funcs, Gs)
+                ]
+            )
+        ).double()
+        options = self.X_sns_empty[si_idx, 0, :].double().clone()
+        options[:, self.functional_dims] = X_func_all[group_idx]
+
+        return options, torch.tensor(ind_idx, dtype=torch.long), group_idx, si_idx
+
+    def _posterior_mean_sigma(self, options, max_batch_size=10000):
+        """ marginal posterior mean and standard deviation of each option """
+        mus, sigmas = [], []
+        with torch.no_grad():
+            for options_ in torch.split(options, max_batch_size):
+                # t-batch of single points, no joint covariance is required
+                posterior = self.reg_model.posterior(options_.unsqueeze(1))
+                mus.append(posterior.mean.view(-1))
+                sigmas.append(posterior.variance.clamp_min(1e-9).sqrt().view(-1))
+        return torch.cat(mus), torch.cat(sigmas)
+
+    def evaluate_population(self, X_funcs, Gs, mu_only=False):
+        """ Evaluate the acquisition function for a whole population of (X_func, G)
+        assignments with a single surrogate posterior, the per-option means and
+        standard deviations are summed per individual
+
+        Args:
+            X_funcs (list): de-indexified functional parameter settings of each
+                individual, each with shape (Ng, func param dim)
+            Gs (list): subsets of the non-functional parameters of each individual
+            mu_only (bool): whether to only use the mean prediction
+
+        Returns:
+            (torch.Tensor): acquisition function value of each individual
+        """
+        options, ind_idx, _, _ = self._gather_options(X_funcs, Gs)
+        mu, sigma = self._posterior_mean_sigma(options)
+
+        num_inds = len(Gs)
+        mu_sum = torch.zeros(num_inds, dtype=mu.dtype).index_add_(0, ind_idx, mu)
+        if not self.maximize:
+            mu_sum = -mu_sum
+        if mu_only:
+            return mu_sum
+        sigma_sum = torch.zeros(num_inds, dtype=sigma.dtype).index_add_(
+            0, ind_idx, sigma
+        )
+
+        return mu_sum + self.beta.sqrt() * sigma_sum
+
     def __call__(self, X_func, G):
         """ Evaluate the acquisition function
 
@@ -622,52 +1182,14 @@ class MedusaAcquisition():
             with shape (# samples, Ng, |Sg| )
 
         """
-        # generate a tensor of all options
-        all_options = []
-        all_options_raw = []
-        for X, S in zip(X_func, G):
-            for si in S:
-                all_options_raw.append([X, si])
-                opt = deepcopy(self.X_sns_empty[si])
-                opt[:,self.functional_dims] = torch.tensor(X)
-                all_options.append(opt)
-        
-        all_options = torch.cat(all_options) # (num options, num dims)
-
-        # make prediction with regression surrogate
-        posterior = self.reg_model.posterior(all_options.double())
-        mu = posterior.mean   # (num options, 1)
-        sigma = posterior.variance.clamp_min(1e-9).sqrt() # (num options, 1)
-
-        # sum the mean and sigmas
-        mu_sum  = torch.sum(mu)  # scalar
-        sigma_sum = torch.sum(sigma) # scalar
-
-        # compute the UCB acquisition with these values
-        return (mu_sum if self.maximize else -mu_sum) + self.beta.sqrt() * sigma_sum
+        # compute the UCB acquisition with the summed means and sigmas
+        return self.evaluate_population([X_func], [G])[0]
 
 
     def run_mu_only(self, X_func, G):
         """ mean prediction with regression surorgate only
         """
-        # generate a tensor of all options
-        all_options = []
-        all_options_raw = []
-        for X, S in zip(X_func, G):
-            for si in S:
-                all_options_raw.append([X, si])
-                opt = deepcopy(self.X_sns_empty[si])
-                opt[:,self.functional_dims] = torch.tensor(X)
-                all_options.append(opt)
-        
-        all_options = torch.cat(all_options) # (num options, num dims)
-
-        # make prediction with regression surrogate
-        posterior = self.reg_model.posterior(all_options.double())
-        mu = posterior.mean   # (num options, 1)
-        mu_sum = torch.sum(mu)
-
-        return mu_sum if self.maximize else -mu_sum
+        return self.evaluate_population([X_func], [G], mu_only=True)[0]
 
     # def __call__(self, X_funcs, Gs):
     #     """ dummy acquisition evaluation """
@@ -677,56 +1199,19 @@ class MedusaAcquisition():
     def acqf_var(self, X_funcs_deindex, G, X_funcs_cat):
         """ variance-based sampling over all potential options
         """
-        sigmas = []
-        all_options_raw = []
-        if X_funcs_cat is not None: 
+        options, _, group_idx, si_idx = self._gather_options([X_funcs_deindex], [G])
+        _, sigmas = self._posterior_mean_sigma(options)
+
+        # get the index of the largest sigma --> most uncertain
+        select_idx = int(torch.argmax(sigmas))
+        if X_funcs_cat is not None:
             # have some categorical functional parameters
-            all_options_cat = []
-            for X, S, X_cat in zip(X_funcs_deindex, G, X_funcs_cat):
-                for si in S:
-                    # print('si :', si)
-                    # print('X :', X)
-                    # print('G :', G)
-                    # print('X_cat :', X_cat)
-    
-                    all_options_raw.append([X, si])
-                    all_options_cat.append([X_cat, si])
-                    # produce the option
-                    opt = deepcopy(self.X_sns_empty[si])
-                    opt[:,self.functional_dims] = torch.tensor(X)
-
-                    #print('opt :', opt)
-                    
-                    # make prediction with regression surrogate model
-                    posterior = self.reg_model.posterior(opt.double())
-                    sigma = posterior.variance.clamp_min(1e-9).sqrt()
-                    sigmas.append(sigma.detach().numpy().item())
-
-            # get the index of the largest sigma --> most uncertain
-            select_idx = np.argmax(sigmas)
-            select_option = all_options_cat[select_idx]
-
-        else: 
+            select_X_func = X_funcs_cat[group_idx[select_idx]]
+        else:
             # continuous and/or discrete functional parameters
+            select_X_func = X_funcs_deindex[group_idx[select_idx]]
 
-            for X, S in zip(X_funcs_deindex, G):
-                for si in S:
-                    all_options_raw.append([X, si])
-                    # produce the option
-                    opt = deepcopy(self.X_sns_empty[si])
-                    opt[:,self.functional_dims] = torch.tensor(X)
-                    # make prediction with regression surrogate model
-                    posterior = self.reg_model.posterior(opt.double())
-                    sigma = posterior.variance.clamp_min(1e-9).sqrt()
-                    sigmas.append(sigma.detach().numpy().item())
-
-            # get the index of the largest sigma --> most uncertain
-            select_idx = np.argmax(sigmas)
-            select_option = all_options_raw[select_idx]
-
-
-    
-        return select_option[0], select_option[1] # X_func, si
+        return select_X_func, int(si_idx[select_idx]) # X_func, si
 
 
 
@@ -740,6 +1225,9 @@ def get_batch_initial_conditions(
     has_descriptors,
     num_chances=15,
     return_raw=False,
+    rng=None,
+    sampler="random",
+    candidate_pool=None,
 ):
     """generate batches of initial conditions for a
     random restart optimization subject to some constraints. This uses
@@ -753,29 +1241,54 @@ def get_batch_initial_conditions(
                     mins_x (np.array): minimum values of each parameter space dimension
                     maxs_x (np.array): maximum values of each parameter
                     num_chances (int):
+                    rng (np.random.Generator): random number generator used to draw the raw samples
+                    sampler (str): strategy used to draw the raw samples, "random", "sobol" or "lhs"
+                    candidate_pool (CandidatePool): candidates shared within the current ask, from
+                            which the initial conditions are selected instead of drawing raw samples
     Returns:
                     a torch.tensor with shape (num_restarts, batch_size, num_dims)
                     of initial optimization conditions
     """
-    # take 20*num_restarts points randomly and evaluate the constraint function on all of
-    # them, if we have enough, proceed, if not proceed to sequential rejection sampling
-    num_raw_samples = 20 * num_restarts
-    raw_samples, raw_proposals = propose_randomly(
-        num_proposals=num_raw_samples * batch_size,
-        param_space=param_space,
-        has_descriptors=has_descriptors,
-    )
-    # forward normalize the randomly generated samples
-    raw_samples = forward_normalize(raw_samples, mins_x, maxs_x)
+    if candidate_pool is not None:
+        # select from the candidates of the current ask, the constraint values
+        # are memoized by the pool
+        raw_samples = candidate_pool.batched_samples
+        raw_proposals = candidate_pool.batched_raw_samples
+    else:
+        # take 20*num_restarts points randomly and evaluate the constraint function on all of
+        # them, if we have enough, proceed, if not proceed to sequential rejection sampling
+        num_raw_samples = 20 * num_restarts
+        raw_samples, raw_proposals = sample_param_space(
+            num_samples=num_raw_samples * batch_size,
+            param_space=param_space,
+            has_descriptors=has_descriptors,
+            kind=sampler,
+            rng=rng,
+            return_torch=True,
+        )
+        # forward normalize the randomly generated samples
+        raw_samples = forward_normalize(raw_samples, mins_x, maxs_x)
 
-    raw_samples = torch.tensor(raw_samples).view(
-        raw_samples.shape[0] // batch_size, batch_size, raw_samples.shape[1]
-    )
+        raw_samples = raw_samples.view(
+            raw_samples.shape[0] // batch_size, batch_size, raw_samples.shape[1]
+        )
 
     if constraint_callable == []:
         # no constraints
         batch_initial_conditions = raw_samples
         batch_initial_conditions_raw = raw_proposals
+    elif candidate_pool is not None:
+        constraint_vals = torch.cat(
+            [
+                candidate_pool.constraint_values(constraint)
+                for constraint in constraint_callable
+            ],
+            dim=1,
+        )
+        feas_ix = torch.where(torch.all(constraint_vals >= 0, dim=1))[0]
+
+        batch_initial_conditions = raw_samples[feas_ix, :, :]
+        batch_initial_conditions_raw = raw_proposals[feas_ix.numpy(), :]
     else:
         # we have some constraints (could be known and or fca)
         constraint_vals = []
@@ -872,6 +1385,281 @@ def sample_around_x(raw_samples, constraint_callable):
     return batch_initial_conditions
 
 
+def measured_option_indices(param_space, params, param_ixs, radices):
+    """get the flat (mixed-radix) indices of the measured parameters in the
+    Cartesian product space of the options of the parameters param_ixs.
+    Measurements with values which are not options of the parameters are ignored
+    """
+    params = np.asarray(params, dtype=object).reshape(-1, len(param_space))
+    digits, valid = [], np.ones(params.shape[0], dtype=bool)
+    for param_ix in param_ixs:
+        param = param_space[param_ix]
+        if param.type == "categorical":
+            option_to_index = {str(option): ix for ix, option in enumerate(param.options)}
+            column = [option_to_index.get(str(val), -1) for val in params[:, param_ix]]
+        else:
+            option_to_index = {float(option): ix for ix, option in enumerate(param.options)}
+            column = [option_to_index.get(float(val), -1) for val in params[:, param_ix]]
+        column = np.array(column, dtype=np.int64)
+        valid &= column >= 0
+        digits.append(column)
+
+    if not np.any(valid):
+        return np.array([], dtype=np.int64)
+
+    digits = [column[valid] for column in digits]
+    return np.unique(np.ravel_multi_index(digits, radices))
+
+
+def iter_available_options(
+    param_space,
+    params,
+    known_constraint_callables,
+    normalize,
+    mins_x,
+    maxs_x,
+    has_descriptors,
+    exclude_measured=True,
+    chunk_size=100000,
+    return_flat_ixs=False,
+):
+    """lazily enumerate the Cartesian product space of the options of the
+    categorical and discrete parameters in chunks. Each option is identified by
+    its flat index in a mixed-radix numbering (same ordering as itertools.product),
+    such that chunks are built with a few numpy operations without materializing
+    the full space. Yields (feat_chunk, cat_chunk) tuples of the encoded options
+    (torch.tensor) and their Olympus representation (np.array)
+
+    Args:
+                    param_space (obj): Olympus parameter space object
+                    params (list): parameters from the current Campaign
+                    known_constraint_callables (List[Callable]): list of known constraints
+                    normalize (bool): whether to normalize the encoded options
+                    mins_x (np.array): minimum values of each parameter space dimension
+                    maxs_x (np.array): maximum values of each parameter
+                    has_descriptors (bool): whether to use descriptors as features for the
+                            categorical parameters
+                    exclude_measured (bool): whether to skip the options which have
+                            already been measured
+                    chunk_size (int): number of options enumerated at once
+                    return_flat_ixs (bool): whether to also yield the flat indices of the
+                            options of each chunk
+    """
+    param_ixs = [
+        ix
+        for ix, p in enumerate(param_space)
+        if p.type in ["categorical", "discrete"]
+    ]
+    radices = [len(param_space[ix].options) for ix in param_ixs]
+    num_options = int(np.prod(radices, dtype=object)) if radices else 0
+
+    encoder = ParamEncoder(param_space, has_descriptors)
+    is_cat = any(param_space[ix].type == "categorical" for ix in param_ixs)
+    option_arrays = [
+        np.asarray(param_space[ix].options, dtype=object if is_cat else float)
+        for ix in param_ixs
+    ]
+
+    measured = np.array([], dtype=np.int64)
+    if exclude_measured and len(params) > 0:
+        measured = measured_option_indices(param_space, params, param_ixs, radices)
+
+    for start in range(0, num_options, chunk_size):
+        flat_ixs = np.arange(start, min(start + chunk_size, num_options))
+        if measured.size > 0:
+            # hash based exclusion of the measured options
+            flat_ixs = flat_ixs[~np.isin(flat_ixs, measured)]
+        if flat_ixs.size == 0:
+            continue
+
+        digits = np.unravel_index(flat_ixs, radices)
+
+        feats, cats = [], []
+        for param_ix, options, option_ixs in zip(param_ixs, option_arrays, digits):
+            table = encoder.feat_tables[param_ix]
+            if table is None:
+                feats.append(options[option_ixs].astype(float).reshape(-1, 1))
+            else:
+                feats.append(table[option_ixs])
+            cats.append(options[option_ixs])
+        feat_chunk = np.concatenate(feats, axis=1)
+        cat_chunk = np.stack(cats, axis=1)
+        cat_chunk = cat_chunk.astype(str) if is_cat else cat_chunk.astype(float)
+
+        # check known constraints not associated with FCA (if any)
+        if known_constraint_callables is not None:
+            kc_mask = evaluate_known_constraints(
+                known_constraint_callables, cat_chunk, param_space
+            )
+            feat_chunk, cat_chunk = feat_chunk[kc_mask], cat_chunk[kc_mask]
+            flat_ixs = flat_ixs[kc_mask]
+            if cat_chunk.shape[0] == 0:
+                continue
+
+        # forward normalize the options before evaluating the fca constraint
+        if normalize:
+            feat_chunk = forward_normalize(feat_chunk, mins_x, maxs_x)
+
+        if return_flat_ixs:
+            yield torch.tensor(feat_chunk), cat_chunk, flat_ixs
+        else:
+            yield torch.tensor(feat_chunk), cat_chunk
+
+
+class OptionSpace:
+    """Cartesian product space of the options of a parameter space without
+    continuous parameters, enumerated and encoded once. The options which
+    violate the known constraints are removed upfront, and the measured options
+    are tracked with a boolean mask which is updated incrementally with the
+    new observations, such that each ask only needs to select the unmeasured
+    rows. The options are only enumerated when they are first used
+
+    Args:
+                    param_space (obj): Olympus parameter space object
+                    known_constraint_callables (List[Callable]): list of known constraints
+                    has_descriptors (bool): whether to use descriptors as features for the
+                            categorical parameters
+                    chunk_size (int): number of options enumerated at once
+    """
+
+    def __init__(
+        self,
+        param_space,
+        known_constraint_callables,
+        has_descriptors,
+        chunk_size=100000,
+    ):
+        self.param_space = param_space
+        self.known_constraint_callables = known_constraint_callables
+        self.has_descriptors = has_descriptors
+        self.chunk_size = chunk_size
+        self.param_ixs = [
+            ix
+            for ix, p in enumerate(param_space)
+            if p.type in ["categorical", "discrete"]
+        ]
+        self.radices = [len(param_space[ix].options) for ix in self.param_ixs]
+
+        self.feat, self.cat, self.flat_ixs, self.measured = (
+            None,
+            None,
+            None,
+            None,
+        )
+        self.num_marked = 0
+        # observations to mark as measured once the options are enumerated
+        self._params = []
+
+    @staticmethod
+    def estimate_nbytes(param_space, has_descriptors):
+        """upper estimate of the memory (in bytes) taken by the enumerated
+        options of param_space, before removing the infeasible ones
+        """
+        params = [
+            p for p in param_space if p.type in ["categorical", "discrete"]
+        ]
+        num_options = np.prod([len(p.options) for p in params], dtype=object)
+        num_feats = sum(
+            (
+                len(p.descriptors[0])
+                if p.type == "categorical" and has_descriptors
+                else len(p.options) if p.type == "categorical" else 1
+            )
+            for p in params
+        )
+        if any(p.type == "categorical" for p in params):
+            # unicode string representation, 4 bytes per character
+            str_len = max(
+                len(str(option)) for p in params for option in p.options
+            )
+            row_nbytes = 4 * str_len * len(params)
+        else:
+            row_nbytes = 8 * len(params)
+        # float64 features, flat index and measured flag of each row
+        row_nbytes += 8 * num_feats + 8 + 1
+        return int(num_options * row_nbytes)
+
+    @property
+    def is_built(self):
+        """whether the options have been enumerated"""
+        return self.flat_ixs is not None
+
+    def _build(self):
+        """enumerate and encode the feasible options"""
+        chunks = list(
+            iter_available_options(
+                self.param_space,
+                [],
+                self.known_constraint_callables,
+                False,
+                None,
+                None,
+                self.has_descriptors,
+                exclude_measured=False,
+                chunk_size=self.chunk_size,
+                return_flat_ixs=True,
+            )
+        )
+        self.feat, self.cat = _concat_option_chunks(
+            [chunk[:2] for chunk in chunks],
+            self.param_space,
+            self.has_descriptors,
+        )
+        # flat indices of the rows, in increasing order
+        self.flat_ixs = (
+            np.concatenate([chunk[2] for chunk in chunks])
+            if len(chunks) > 0
+            else np.array([], dtype=np.int64)
+        )
+
+        self.measured = np.zeros(self.flat_ixs.shape[0], dtype=bool)
+        self.num_marked = 0
+        self._mark(self._params)
+
+    def __len__(self):
+        if not self.is_built:
+            self._build()
+        return self.flat_ixs.shape[0]
+
+    def update(self, params):
+        """mark the options of the observations which have not been processed
+        yet as measured
+        """
+        self._params = params
+        if self.is_built:
+            self._mark(params)
+
+    def _mark(self, params):
+        if len(params) < self.num_marked:
+            # the observations have been replaced, start over
+            self.measured[:] = False
+            self.num_marked = 0
+        new_params = params[self.num_marked :]
+        if len(new_params) > 0 and len(self) > 0:
+            measured = measured_option_indices(
+                self.param_space, new_params, self.param_ixs, self.radices
+            )
+            rows = np.searchsorted(self.flat_ixs, measured)
+            rows = rows[rows < len(self)]
+            rows = rows[np.isin(self.flat_ixs[rows], measured)]
+            self.measured[rows] = True
+        self.num_marked = len(params)
+
+    def iter_available(self, normalize, mins_x, maxs_x, chunk_size=100000):
+        """yields (feat_chunk, cat_chunk) tuples of the unmeasured options, with
+        the same format as iter_available_options
+        """
+        if not self.is_built:
+            self._build()
+        avail_rows = np.where(~self.measured)[0]
+        for start in range(0, avail_rows.shape[0], chunk_size):
+            rows = avail_rows[start : start + chunk_size]
+            feat_chunk = self.feat[rows]
+            if normalize:
+                feat_chunk = forward_normalize(feat_chunk, mins_x, maxs_x)
+            yield feat_chunk, self.cat[rows]
+
+
 def create_available_options(
     param_space,
     params,
@@ -881,6 +1669,7 @@ def create_available_options(
     mins_x,
     maxs_x,
     has_descriptors,
+    chunk_size=100000,
 ):
     """build cartesian product space of options, then remove options
     which have already been measured. Returns an (num_options, num_dims)
@@ -896,77 +1685,31 @@ def create_available_options(
                     known_constraint_callables (List[Callable]): list of known constraints
                     mins_x (np.array): minimum values of each parameter space dimension
                     maxs_x (np.array): maximum values of each parameter
+                    chunk_size (int): number of options enumerated at once
     """
-
-    # make sure params are proper data type
-    real_params = []
-    for param in params:
-        p = []
-        for ix, elem in enumerate(param):
-            if param_space[ix].type == "categorical":
-                p.append(elem)
-            else:
-                p.append(float(elem))
-        real_params.append(p)
-
-    # params = [list(elem) for elem in params]
-    # get the relevant parmeters -> only categorical and discrete
     relevant_params = [
         p for p in param_space if p.type in ["categorical", "discrete"]
     ]
-    param_names = [p.name for p in relevant_params]
-    param_options = [p.options for p in relevant_params]
 
-    cart_product = list(itertools.product(*param_options))
-    cart_product = [list(elem) for elem in cart_product]
-
-    if len(param_names) == len(param_space):
+    if len(relevant_params) == len(param_space):
         # no continuous parameters
         # remove options that we have measured already
-        current_avail_feat = []
-        current_avail_cat = []
-
-        for elem in cart_product:
-            if elem not in real_params:
-                # convert to ohe and add to currently available options
-                ohe = []
-                for val, obj in zip(elem, param_space):
-                    if obj.type == "categorical":
-                        ohe.append(
-                            cat_param_to_feat(obj, val, has_descriptors)
-                        )
-                    else:
-                        ohe.append([val])
-                current_avail_feat.append(np.concatenate(ohe))
-                current_avail_cat.append(elem)
-
-        current_avail_feat_unconst = np.array(current_avail_feat)
-        current_avail_cat_unconst = np.array(current_avail_cat)
-
-        # # check known constraints not associated with FCA (if any)
-        if known_constraint_callables is not None:
-            # known constraints
-            kc_results = []
-            for cat_unconst in current_avail_cat_unconst:
-                if all([kc(cat_unconst) for kc in known_constraint_callables]):
-                    # feasible
-                    kc_results.append(True)
-                else:
-                    kc_results.append(False)
-            feas_mask = np.where(kc_results)[0]
-            current_avail_feat_kc = current_avail_feat_unconst[feas_mask]
-            current_avail_cat_kc = current_avail_cat_unconst[feas_mask]
-        else:
-            current_avail_feat_kc = current_avail_feat_unconst
-            current_avail_cat_kc = current_avail_cat_unconst
-
-        # forward normalize the options before evaluating the fca constraint
-        if normalize:
-            current_avail_feat_kc = forward_normalize(
-                current_avail_feat_kc, mins_x, maxs_x
+        chunks = list(
+            iter_available_options(
+                param_space,
+                params,
+                known_constraint_callables,
+                normalize,
+                mins_x,
+                maxs_x,
+                has_descriptors,
+                exclude_measured=True,
+                chunk_size=chunk_size,
             )
-
-        current_avail_feat_kc = torch.tensor(current_avail_feat_kc)
+        )
+        current_avail_feat_kc, current_avail_cat_kc = _concat_option_chunks(
+            chunks, param_space, has_descriptors
+        )
 
         # remove options which are infeasible given the feasibility surrogate model
         # and the threshold
@@ -979,8 +1722,9 @@ def create_available_options(
             )
             constraint_vals = fca_constraint_callable(constraint_input)
             feas_mask = torch.where(constraint_vals >= 0.0)[0]
-            print(
-                f"{feas_mask.shape[0]}/{len(current_avail_feat)} options are feasible"
+            Logger.log(
+                f"{feas_mask.shape[0]}/{current_avail_feat_kc.shape[0]} options are feasible",
+                "INFO",
             )
             if feas_mask.shape[0] == 0:
                 msg = "No feasible samples after FCA constraint, resorting back to full space"
@@ -1002,28 +1746,41 @@ def create_available_options(
 
     else:
         # at least one continuous parameter, no need to remove any options
-        current_avail_feat = []
-        current_avail_cat = []
-
-        for elem in cart_product:
-            # convert to ohe and add to currently available options
-            ohe = []
-            for val, obj in zip(elem, param_space):
-                if obj.type == "categorical":
-                    ohe.append(cat_param_to_feat(obj, val, has_descriptors))
-                else:
-                    ohe.append([val])
-            current_avail_feat.append(np.concatenate(ohe))
-            current_avail_cat.append(elem)
-
-        current_avail_feat_unconst = np.array(current_avail_feat)
-        current_avail_cat_unconst = np.array(current_avail_cat)
-
         # TODO: may need to add the constraint checking here too...
-        # forward normalize the options before evaluating the constaints
-        # if normalize:
-        # 	current_avail_feat_unconst = forward_normalize(current_avail_feat_unconst, mins_x, maxs_x)
+        chunks = list(
+            iter_available_options(
+                param_space,
+                params,
+                None,
+                False,
+                mins_x,
+                maxs_x,
+                has_descriptors,
+                exclude_measured=False,
+                chunk_size=chunk_size,
+            )
+        )
 
-        current_avail_feat_unconst = torch.tensor(current_avail_feat_unconst)
+        return _concat_option_chunks(chunks, param_space, has_descriptors)
 
-        return current_avail_feat_unconst, current_avail_cat_unconst
+
+def _concat_option_chunks(chunks, param_space, has_descriptors):
+    """concatenate the chunks yielded by iter_available_options"""
+    if len(chunks) > 0:
+        return (
+            torch.cat([feat for feat, _ in chunks]),
+            np.concatenate([cat for _, cat in chunks]),
+        )
+    relevant_params = [
+        p for p in param_space if p.type in ["categorical", "discrete"]
+    ]
+    num_feats = sum(
+        len(p.descriptors[0]) if p.type == "categorical" and has_descriptors
+        else len(p.options) if p.type == "categorical"
+        else 1
+        for p in relevant_params
+    )
+    return (
+        torch.zeros((0, num_feats)).double(),
+        np.empty((0, len(relevant_params))),
+    )
@@ -1,5 +1,5 @@
 #!/usr/bin/env python
 
-from .genetic_general_optimizer import GeneticGeneralOptimizer
+from .genetic_general_optimizer import FitnessCache, GeneticGeneralOptimizer
 from .genetic_optimizer import GeneticOptimizer
 from .gradient_optimizer import GradientOptimizer
@@ -20,6 +20,7 @@ from atlas.optimizers.acqfs import VarianceBased, get_batch_initial_conditions
 # )
 
 from atlas.optimizers.params import Parameters
+from atlas.optimizers.samplers import CandidatePool
 from atlas.optimizers.utils import (
     cat_param_to_feat,
     forward_normalize,
@@ -45,6 +46,8 @@ class AcquisitionOptimizer:
         fca_constraint: Callable,
         params: torch.Tensor,
         timings_dict: Dict,
+        sampler: str = "random",
+        candidate_pool: Optional[CandidatePool] = None,
         **kwargs: Any,
 
     ):
@@ -57,6 +60,8 @@ class AcquisitionOptimizer:
         self.fca_constraint = fca_constraint
         self._params = params
         self.timings_dict = timings_dict
+        self.sampler = sampler
+        self.candidate_pool = candidate_pool
 
 
     @abstractmethod
@@ -75,9 +80,7 @@ class AcquisitionOptimizer:
         # variance-based sampling procedure to select the next general parameter(s)
         if self.acquisition_type == 'general':
 
-            X_sns_empty, general_raw = self.acqf.generate_X_sns()
-
-            functional_dims = np.logical_not(self.params_obj.exp_general_mask)
+            general_options = self.acqf.general_options
 
             # convert results to expanded tensor
             X_star = torch.tensor(
@@ -86,21 +89,28 @@ class AcquisitionOptimizer:
             # TODO: careful of batch size
             X_star = torch.unsqueeze(X_star,1)
 
-            X_sns = torch.empty( (X_star.shape[0],) + X_sns_empty.shape )
-            for x_ix in range(X_star.shape[0]):
-                X_sn  = torch.clone(X_sns_empty)
-                X_sn[:, :, functional_dims] = X_star[x_ix, :, functional_dims]
-                X_sns[x_ix,:,:,:] = X_sn
+            # (# results, # general options, 1, # exp param dims)
+            X_sns = general_options.expand(X_star.double())
+            num_results, num_options = X_sns.shape[0], X_sns.shape[1]
 
             acqf_sn = VarianceBased(reg_model=self.acqf.reg_model)
 
-            # generates list of stdevs, one set for each batch
-            for ix, X_sn in enumerate(X_sns):
-                sigma = acqf_sn(X_sn)
-                select_gen_params = general_raw[ torch.argmax(sigma) ]
+            # stdevs of all the options of each result at once
+            with torch.no_grad():
+                sigma = acqf_sn(X_sns.view(num_results * num_options, 1, -1))
+            sigma = sigma.view(num_results, num_options)
+
+            for ix in range(num_results):
+                select_gen_params = general_options.general_raw[
+                    torch.argmax(sigma[ix])
+                ]
 
-                for gen_param_ix in self.params_obj.general_dims:
-                    results[ix][self.params_obj.param_space[gen_param_ix].name] = select_gen_params[gen_param_ix]
+                # general_raw holds the values of the general parameters only
+                for gen_ix, gen_param_ix in enumerate(
+                    self.params_obj.general_dims
+                ):
+                    param_name = self.params_obj.param_space[gen_param_ix].name
+                    results[ix][param_name] = select_gen_params[gen_ix]
 
 
         return results
@@ -150,6 +160,8 @@ class AcquisitionOptimizer:
                 mins_x=self.params_obj._mins_x,
                 maxs_x=self.params_obj._maxs_x,
                 return_raw=return_raw,
+                sampler=self.sampler,
+                candidate_pool=self.candidate_pool,
             )
 
             return (
@@ -173,6 +185,8 @@ class AcquisitionOptimizer:
                 mins_x=self.params_obj._mins_x,
                 maxs_x=self.params_obj._maxs_x,
                 return_raw=return_raw,
+                sampler=self.sampler,
+                candidate_pool=self.candidate_pool,
             )
 
             if type(batch_initial_conditions) == type(None):
@@ -194,6 +208,8 @@ class AcquisitionOptimizer:
                     mins_x=self.params_obj._mins_x,
                     maxs_x=self.params_obj._maxs_x,
                     return_raw=return_raw,
+                    sampler=self.sampler,
+                    candidate_pool=self.candidate_pool,
                 )
 
                 if type(batch_initial_conditions) == type(None):
@@ -1,5 +1,6 @@
 #!/usr/bin/env python
 
+from collections import OrderedDict
 from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 
 import copy
@@ -30,10 +31,70 @@ from atlas.optimizers.utils import (
 	propose_randomly,
 	reverse_normalize,
 	reverse_standardize,
-	gen_partitions,
+	PartitionSampler,
 )
 
 
+class FitnessCache:
+	""" LRU cache of the fitness values of (X_func, G) assignments. Assignments
+	are keyed on their canonical form, i.e. the blocks of G are sorted, and paired
+	with their (rounded) functional parameters, such that equivalent individuals
+	share an entry. The cache is bound to a single acquisition function and is
+	cleared whenever it is used with another one
+
+	Args:
+		max_entries (int): maximum number of cached fitness values
+		decimals (int): number of decimals the functional parameters are rounded to
+	"""
+	def __init__(self, max_entries:int=100000, decimals:int=8):
+		self.max_entries = max_entries
+		self.decimals = decimals
+		self._entries = OrderedDict()
+		self._acqf_id = None
+		self.hits = 0
+		self.misses = 0
+
+	def bind(self, acqf) -> None:
+		""" clear the cache if it was filled with another acquisition function """
+		if self._acqf_id != id(acqf):
+			self.clear()
+			self._acqf_id = id(acqf)
+
+	def key(self, X_func, G) -> Tuple:
+		pairs = []
+		for X, S in zip(X_func, G):
+			X = tuple(
+				round(float(x), self.decimals) if isinstance(x, (float, int, np.number)) else x
+				for x in X
+			)
+			pairs.append((tuple(sorted(S)), X))
+		return tuple(sorted(pairs))
+
+	def get(self, key: Tuple) -> Optional[float]:
+		if key in self._entries:
+			self._entries.move_to_end(key)
+			self.hits += 1
+			return self._entries[key]
+		self.misses += 1
+		return None
+
+	def set(self, key: Tuple, val: float) -> None:
+		self._entries[key] = val
+		self._entries.move_to_end(key)
+		while len(self._entries) > self.max_entries:
+			self._entries.popitem(last=False)
+
+	@property
+	def hit_rate(self) -> float:
+		num_lookups = self.hits + self.misses
+		return self.hits / num_lookups if num_lookups > 0 else 0.
+
+	def clear(self) -> None:
+		self._entries.clear()
+		self.hits = 0
+		self.misses = 0
+
+
 class GeneticGeneralOptimizer(AcquisitionOptimizer):
 	def __init__(
 		self,
@@ -51,6 +112,7 @@ class GeneticGeneralOptimizer(AcquisitionOptimizer):
 		mode:str, # "acqf" or "proposal"
 		fix_Ng=None, # fix the number of X_funcs to recommmend
 		num_init_evals:int=int(1e3), # number of inital evals for GA
+		fitness_cache:Optional[FitnessCache]=None, # can be shared between optimizers
 		
 		**kwargs: Any, 
 	):
@@ -70,6 +132,12 @@ class GeneticGeneralOptimizer(AcquisitionOptimizer):
 		self.acquisition_type = acquisition_type
 		self.mode = mode 
 		self.fix_Ng = fix_Ng
+
+		# fitness values of previously evaluated individuals
+		if fitness_cache is None:
+			fitness_cache = FitnessCache()
+		self.fitness_cache = fitness_cache
+		self.fitness_cache.bind(self.acqf)
 		
 
 		self.func_param_space = func_param_space
@@ -242,24 +310,62 @@ class GeneticGeneralOptimizer(AcquisitionOptimizer):
 		# return the negative of the acqf - this is conventionally minimized by
 		# deap, but we want to maximize acqf
 		return -self.acqf(X_func=X_func, G=G).detach().numpy(),
+
+	def evaluate_population(self, individuals: List[Dict]) -> np.ndarray:
+		""" evaluate the (negative) acquisition function for a list of individuals
+		with a single call to the surrogate model, same values as acquisition_acqf
+		and acquisition_proposal
+		"""
+		if len(individuals) == 0:
+			return np.empty(0)
+		keys = [self.fitness_cache.key(ind['X_func'], ind['G']) for ind in individuals]
+
+		# only evaluate the distinct individuals which are not cached
+		vals, new_inds = {}, {}
+		for key, ind in zip(keys, individuals):
+			if key in vals or key in new_inds:
+				# duplicate within the population, not a cache lookup
+				continue
+			val = self.fitness_cache.get(key)
+			if val is None:
+				new_inds[key] = ind
+			else:
+				vals[key] = val
+
+		if len(new_inds) > 0:
+			X_funcs = [self.deindexify(np.array(ind['X_func'])) for ind in new_inds.values()]
+			Gs = [ind['G'] for ind in new_inds.values()]
+			new_vals = -self.acqf.evaluate_population(X_funcs, Gs).detach().numpy()
+			for key, val in zip(new_inds.keys(), new_vals):
+				vals[key] = float(val)
+				self.fitness_cache.set(key, float(val))
+
+		return np.array([vals[key] for key in keys])
+
+	def _assign_fitnesses(self, individuals: List[Dict]) -> None:
+		""" set the fitness values of the individuals using batched evaluation """
+		fitnesses = self.evaluate_population(individuals)
+		for ind, fit in zip(individuals, fitnesses):
+			ind.fitness.values = (fit,)
 	
 
 	#----------------------------
 	# POPULATION INITIALIZATION
 	#----------------------------
 
+	def _sample_partitions(self, max_partitions, num_blocks=None):
+		""" at most max_partitions distinct partitions of S, drawn uniformly at
+		random without enumerating all of them
+		"""
+		sampler = PartitionSampler(self.S, num_blocks=num_blocks)
+		if sampler.num_partitions > max_partitions:
+			Logger.log(f'Max partitions exceeded. Sampling random subset of {max_partitions}', 'WARNING')
+		return sampler.sample(max_partitions)
+
 	def init_population_best(self, num_inds, max_partitions=30):
 
-		if self.mode == 'acqf':
-			eval_method = self.acquisition_acqf
-		elif self.mode == 'proposal':
-			eval_method = self.acquisition_proposal
 		f_xs = []
-		Gs = gen_partitions(self.S)
-		if len(Gs) > max_partitions:
-			Logger.log(f'Max partitions exceeded. Sampling random subset of {max_partitions}', 'WARNING')
-			np.random.shuffle(Gs)
-			Gs = Gs[:max_partitions]
+		Gs = self._sample_partitions(max_partitions)
 
 		for G_ix, G in track(enumerate(Gs), total=len(Gs), description='Evaluating initial candidates...'):
 			Ng = len(G)
@@ -281,10 +387,14 @@ class GeneticGeneralOptimizer(AcquisitionOptimizer):
 					quit()
 				
 			X_funcs = np.array(X_funcs).swapaxes(0,1)
+			G_f_xs = []
 			for X_func in X_funcs:
 				dict_ = {'G': G, 'X_func': list([list(X) for X in X_func]), 'Ng': Ng}
-				dict_['f_x'] = eval_method(dict_)[0]
-				f_xs.append(dict_)
+				G_f_xs.append(dict_)
+			# evaluate all the candidates of this partition at once
+			for dict_, f_x in zip(G_f_xs, self.evaluate_population(G_f_xs)):
+				dict_['f_x'] = f_x
+			f_xs.extend(G_f_xs)
 
 		vals = [d['f_x'] for d in f_xs]
 		
@@ -296,17 +406,10 @@ class GeneticGeneralOptimizer(AcquisitionOptimizer):
 
 	def init_population_random(self, num_inds, max_partitions=30):
 		f_xs = []
-		Gs = gen_partitions(self.S)
-		if self.fix_Ng:
-			# select all the partitions with Ng subsets
-			Gs = [G for G in Gs if len(G)==self.fix_Ng]
-			if len(Gs)==0:
-				Logger.log('Something is wrong. No selected Gs!', 'FATAL')
-
-		if len(Gs) > max_partitions:
-			Logger.log(f'Max partitions exceeded. Sampling random subset of {max_partitions}', 'WARNING')
-			np.random.shuffle(Gs)
-			Gs = Gs[:max_partitions]
+		# select only the partitions with Ng subsets if Ng is fixed
+		Gs = self._sample_partitions(max_partitions, num_blocks=self.fix_Ng)
+		if len(Gs)==0:
+			Logger.log('Something is wrong. No selected Gs!', 'FATAL')
 
 		for G_ix, G in track(enumerate(Gs), total=len(Gs), description='Evaluating initial candidates...'):
 			Ng = len(G)
@@ -596,10 +699,8 @@ class GeneticGeneralOptimizer(AcquisitionOptimizer):
 		population = toolbox.population(num_inds=num_inds)
 
 	
-		# Evaluate the entire population
-		fitnesses = map(toolbox.evaluate, population)
-		for ind, fit in zip(population, fitnesses):
-			ind.fitness.values = fit
+		# Evaluate the entire population at once
+		self._assign_fitnesses(population)
 		
 		# create hall of fame
 		num_elites = int(round(halloffame_frac * len(population), 0))  # 5% of elite individuals
@@ -637,9 +738,7 @@ class GeneticGeneralOptimizer(AcquisitionOptimizer):
 			# Evaluate the individual4s with an invalid fitness
 			invalid_ind = [ind for ind in offspring if not ind.fitness.valid]
 			
-			fitnesses = map(toolbox.evaluate, invalid_ind)
-			for ind, fit in zip(invalid_ind, fitnesses):
-				ind.fitness.values = fit
+			self._assign_fitnesses(invalid_ind)
 				
 			# add the best back to population
 			offspring.extend(halloffame.items)
@@ -653,6 +752,11 @@ class GeneticGeneralOptimizer(AcquisitionOptimizer):
 			record = stats.compile(population) if stats else {}
 			logbook.record(gen=gen, nevals=len(invalid_ind), **record)
 
+		Logger.log(
+			f'Fitness cache hit rate: {100*self.fitness_cache.hit_rate:.1f}% ({self.fitness_cache.hits} hits, {self.fitness_cache.misses} misses)',
+			'INFO',
+		)
+
 		# DEAP cleanup
 		del creator.FitnessMin
 		del creator.Individual
@@ -15,7 +15,10 @@ from atlas.optimizers.acqfs import create_available_options
 from atlas.optimizers.acquisition_optimizers.base_optimizer import \
     AcquisitionOptimizer
 from atlas.optimizers.params import Parameters
-from atlas.optimizers.utils import (cat_param_to_feat, forward_normalize,
+from atlas.optimizers.samplers import CandidatePool
+from atlas.optimizers.utils import (ParamEncoder, cat_param_to_feat,
+                                    evaluate_known_constraints,
+                                    forward_normalize,
                                     forward_standardize, get_cat_dims,
                                     get_fixed_features_list,
                                     infer_problem_type, param_vector_to_dict,
@@ -36,6 +39,8 @@ class GeneticOptimizer(AcquisitionOptimizer):
         params: torch.Tensor,
         timings_dict: Dict,
         use_reg_only:bool=False,
+        sampler: str = "random",
+        candidate_pool: Optional[CandidatePool] = None,
         **kwargs: Any,
     ):
         """
@@ -67,6 +72,11 @@ class GeneticOptimizer(AcquisitionOptimizer):
 
         self.kind = 'genetic'
 
+        # vectorized encoder for the categorical parameters, and cache of the
+        # fitness of the individuals evaluated so far
+        self.param_encoder = ParamEncoder(self.param_space, self.has_descriptors)
+        self._fitness_cache = {}
+
         # range of opt domain dimensions
         self.param_ranges = self._get_param_ranges()
 
@@ -133,37 +143,69 @@ class GeneticOptimizer(AcquisitionOptimizer):
 
 
     def deindexify(self, x):
-        samples = []
-        for x_ in x:
-            sample = []
-            counter = 0
-            for elem, p in zip(x_, self.param_space):
+        """ convert an array of individuals, with the categorical and discrete
+        parameters represented by the indices of their options, to their expanded
+        representation
+        """
+        x = np.asarray(x, dtype=float).reshape(-1, len(self.param_space))
+        feats = []
+        for param_ix, p in enumerate(self.param_space):
+            column = x[:, param_ix]
+            if p.type == 'continuous':
+                feats.append(column.reshape(-1, 1))
+            elif p.type == 'discrete':
+                options = np.asarray(p.options, dtype=float)
+                feats.append(options[column.astype(int)].reshape(-1, 1))
+            elif p.type == 'categorical':
+                table = self.param_encoder.feat_tables[param_ix]
+                feats.append(table[column.astype(int)])
+        return np.concatenate(feats, axis=1)
+
+
+    def batch_acquisition(self, x: np.ndarray, max_batch_size: int = 1000) -> np.ndarray:
+        """ evaluate the negative of the acquisition function for an array of
+        individuals in batched forward passes. Each individual is evaluated as a
+        single point. Fitness values are cached, such that each distinct individual
+        is only evaluated once per optimization
+        """
+        x = np.asarray(x, dtype=float).reshape(-1, len(self.param_space))
+        keys = [tuple(row) for row in x]
+
+        new_keys, new_rows, seen = [], [], set()
+        for key, row in zip(keys, x):
+            if key not in self._fitness_cache and key not in seen:
+                seen.add(key)
+                new_keys.append(key)
+                new_rows.append(row)
+
+        if len(new_rows) > 0:
+            X = torch.tensor(self.deindexify(np.array(new_rows)))
+            X = X.view(X.shape[0], 1, X.shape[1])
+            with torch.no_grad():
+                acqf_vals = torch.cat(
+                    [self.acqf(X_).view(-1) for X_ in X.split(max_batch_size)]
+                )
+            # return the negative of the acqf - this is conventionally minimized by
+            # deap, but we want to maximize acqf
+            for key, val in zip(new_keys, -acqf_vals.detach().numpy()):
+                self._fitness_cache[key] = float(val)
 
-                if p.type == 'continuous':
-                    sample.append(float(elem))
-                    counter+=1
-                elif p.type == 'discrete':
-                    sample.append(float(p.options[int(elem)]))
-                    counter+=1
-                elif p.type == 'categorical':
-                    sample.extend(
-                        cat_param_to_feat(
-                            p, p.options[int(elem)], self.has_descriptors,
-                        )
-                    )
-            samples.append(sample)
-        return np.array(samples)
+        return np.array([self._fitness_cache[key] for key in keys])
 
 
     def acquisition(self, x: np.ndarray) -> Tuple:
+        return self.batch_acquisition(x.reshape((1, x.shape[0])))[0],
 
-        x = self.deindexify(x.reshape((1, x.shape[0])))
-        x = torch.tensor(
-            x.reshape((1, self.batch_size, x.shape[1]))
-        )
-        # return the negative of the acqf - this is conventionally minimized by
-        # deap, but we want to maximize acqf
-        return -self.acqf(x).detach().numpy()[0],
+
+    def _evaluate_individuals(self, individuals):
+        """ assign the fitness of a list of individuals with a single batched
+        evaluation of the acquisition function
+        """
+        if len(individuals) == 0:
+            return
+        fitnesses = self.batch_acquisition(np.array(individuals, dtype=float))
+        for ind, fit in zip(individuals, fitnesses):
+            ind.fitness.values = (fit,)
 
 
 
@@ -231,9 +273,8 @@ class GeneticOptimizer(AcquisitionOptimizer):
         population = toolbox.population(samples)
 
         # Evaluate pop fitnesses
-        fitnesses = list(map(toolbox.evaluate, np.array(population)))
-        for ind, fit in zip(population, fitnesses):
-            ind.fitness.values = fit
+        self._fitness_cache = {}
+        self._evaluate_individuals(population)
 
         # create hall of fame
         num_elites = int(
@@ -283,9 +324,7 @@ class GeneticOptimizer(AcquisitionOptimizer):
 
             # Evaluate the individuals with an invalid fitness
             invalid_ind = [ind for ind in offspring if not ind.fitness.valid]
-            fitnesses = map(toolbox.evaluate, np.array(invalid_ind))
-            for ind, fit in zip(invalid_ind, fitnesses):
-                ind.fitness.values = fit
+            self._evaluate_individuals(invalid_ind)
 
             # add the best back to population
             offspring.extend(halloffame.items)
@@ -310,7 +349,8 @@ class GeneticOptimizer(AcquisitionOptimizer):
         del creator.Individual
 
         # select best recommendations and return them as param vectors
-        acqf_vals = [self.acquisition(x)[0] for x in np.array(population)]
+        # (all the individuals of the final population have a valid fitness)
+        acqf_vals = [ind.fitness.values[0] for ind in population]
 
         best_idxs = np.argsort(acqf_vals)[:self.batch_size]
         best_batch_pop = np.array(population)[best_idxs]
@@ -400,6 +440,7 @@ class GeneticOptimizer(AcquisitionOptimizer):
         offspring = list(map(toolbox.clone, offspring))
 
         # Apply crossover and mutation on the offspring
+        children, parents = [], []
         for child1, child2 in zip(offspring[::2], offspring[1::2]):
             if np.random.random() < cxpb:
                 parent1 = list(
@@ -408,50 +449,118 @@ class GeneticOptimizer(AcquisitionOptimizer):
                 parent2 = list(map(toolbox.clone, child2))
                 # mate
                 toolbox.mate(child1, child2)
-                # apply constraints
-                self._apply_feasibility_constraint(child1, parent1)
-                self._apply_feasibility_constraint(child2, parent2)
+                children.extend([child1, child2])
+                parents.extend([parent1, parent2])
                 # clear fitness values
                 del child1.fitness.values
                 del child2.fitness.values
+        # apply constraints, screening all the children at once
+        self._apply_feasibility_constraints(children, parents)
 
+        mutants, parents = [], []
         for mutant in offspring:
             if np.random.random() < mutpb:
                 parent = list(map(toolbox.clone, mutant))
                 # mutate
                 toolbox.mutate(mutant)
-                # apply constraints
-                self._apply_feasibility_constraint(mutant, parent)
+                mutants.append(mutant)
+                parents.append(parent)
                 # clear fitness values
                 del mutant.fitness.values
+        # apply constraints, screening all the mutants at once
+        self._apply_feasibility_constraints(mutants, parents)
+
         return offspring
 
+    def _apply_feasibility_constraints(self, children, parents):
+        """ screen the feasibility of all the children with a single evaluation of
+        the batched constraints, and only project the infeasible ones
+        """
+        if len(children) == 0:
+            return
+        feasible = self._evaluate_feasibility_batch(
+            np.array([list(child) for child in children], dtype=object)
+        )
+        for child, parent, feas in zip(children, parents, feasible):
+            if not feas:
+                self._apply_feasibility_constraint(child, parent, screened=True)
+
     def _evaluate_feasibility(self, sample):
         # evaluate whether the optimized sample violates the known constraints
+        return bool(self._evaluate_feasibility_batch([sample])[0])
+
+    def _evaluate_feasibility_batch(self, samples):
+        """ evaluate the feasibility of a 2d array of individuals. Batched constraints
+        (see batched_constraint) are evaluated once on all the individuals, converted
+        to arrays of parameters, the other constraints are evaluated on the dict
+        representation of each individual that is still feasible
+        """
+        samples = np.asarray(samples, dtype=object).reshape(-1, len(self.param_space))
+        batched = [
+            constr for constr in self.nonlinear_inequality_constraints
+            if getattr(constr, "is_batched", False)
+        ]
+        unbatched = [
+            constr for constr in self.nonlinear_inequality_constraints
+            if not getattr(constr, "is_batched", False)
+        ]
+
         # TODO: dont pass the parameter space here?? These should be scaled so they
         # might register a 'parameter out of bounds warning message' ...
-        param = param_vector_to_dict(
-            sample=sample,
-            param_space=self.param_space
+        feasible = evaluate_known_constraints(
+            batched, self._samples_to_params(samples), self.param_space
         )
-        #feasible = [constr(param) for constr in self.known_constraints]
-        feasible = [constr(param) for constr in self.nonlinear_inequality_constraints]
+        for ix in np.where(feasible)[0]:
+            param = param_vector_to_dict(
+                sample=samples[ix],
+                param_space=self.param_space
+            )
+            feasible[ix] = all([constr(param) for constr in unbatched])
+
+        return feasible
 
-        return all(feasible)
+    def _samples_to_params(self, samples):
+        """ convert a 2d array of individuals to their Olympus representation.
+        The continuous parameters of the individuals are scaled, they are reverse
+        normalized such that batched constraints receive the same raw values as
+        with the other acquisition optimizers and evaluate_known_constraints
+        """
+        params = np.empty(samples.shape, dtype=object)
+        counter = 0
+        for param_ix, p in enumerate(self.param_space):
+            column = samples[:, param_ix]
+            if p.type == 'continuous':
+                params[:, param_ix] = reverse_normalize(
+                    column.astype(float).reshape(-1, 1),
+                    self._mins_x[counter:counter + 1].copy(),
+                    self._maxs_x[counter:counter + 1].copy(),
+                )[:, 0]
+            else:
+                options = np.empty(len(p.options), dtype=object)
+                options[:] = p.options
+                params[:, param_ix] = options[column.astype(int)]
+            if p.type == 'categorical':
+                if self.has_descriptors:
+                    counter += len(p.descriptors[0])
+                else:
+                    counter += len(p.options)
+            else:
+                counter += 1
+        return params
 
     @staticmethod
     def _update_individual(ind, value_vector):
         for i, v in enumerate(value_vector):
             ind[i] = v
 
-    def _apply_feasibility_constraint(self, child, parent):
+    def _apply_feasibility_constraint(self, child, parent, screened=False):
 
         child_vector = np.array(
             child, dtype=object
         )  # object needed to allow strings of different lengths
-        feasible = self._evaluate_feasibility(child_vector)
-        # if feasible, stop, no need to project the mutant
-        if feasible is True:
+        # if feasible, stop, no need to project the mutant (children which
+        # have been screened already are known to be infeasible)
+        if not screened and self._evaluate_feasibility(child_vector) is True:
             return
 
         # If not feasible, we try project parent or child onto feasibility boundary following these rules:
@@ -5,7 +5,9 @@ from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 import botorch
 import numpy as np
 import torch
-from botorch.acquisition import AcquisitionFunction
+from botorch.acquisition import AcquisitionFunction, MCAcquisitionFunction
+from botorch.acquisition.fixed_feature import FixedFeatureAcquisitionFunction
+from botorch.generation.gen import gen_candidates_scipy
 from botorch.optim import (
 	optimize_acqf,
 	optimize_acqf_discrete,
@@ -16,9 +18,12 @@ from olympus.campaigns import ParameterSpace
 
 from atlas import Logger
 from atlas.optimizers.acqfs import (
+	OptionSpace,
 	create_available_options,
+	iter_available_options,
 )
 from atlas.optimizers.params import Parameters
+from atlas.optimizers.samplers import CandidatePool
 from atlas.optimizers.utils import (
 	cat_param_to_feat,
 	forward_normalize,
@@ -32,6 +37,13 @@ from atlas.optimizers.utils import (
 )
 from atlas.optimizers.acquisition_optimizers.base_optimizer import AcquisitionOptimizer
 
+# options of optimize_acqf which are understood by gen_candidates_scipy and the
+# L-BFGS-B solver, the others (e.g. batch_limit, init_batch_limit) are dropped for
+# the batched mixed optimization
+SCIPY_OPTIONS = [
+	"method", "callback", "with_grad",
+	"maxiter", "maxfun", "ftol", "gtol", "eps", "maxcor", "maxls", "disp",
+]
 
 
 class GradientOptimizer(AcquisitionOptimizer):
@@ -48,8 +60,36 @@ class GradientOptimizer(AcquisitionOptimizer):
 		batched_strategy: str,
 		timings_dict: Dict,
 		use_reg_only=False,
+		sampler: str = "random",
+		candidate_pool: Optional[CandidatePool] = None,
+		mixed_strategy: str = "serial",
+		mixed_top_k: Optional[int] = None,
+		options_chunk_size: int = 100000,
+		num_options_shortlist: int = 10000,
+		option_space: Optional[OptionSpace] = None,
 		**kwargs: Any,
 	):
+		"""
+		mixed_strategy : str
+			How the continuous parameters are optimized for each combination of the
+			categorical/discrete options on mixed parameter spaces (q=1). "serial"
+			runs one optimization per combination, "batched" optimizes the restarts
+			of many combinations jointly in a single batched L-BFGS run
+		mixed_top_k : int or None
+			If provided, the combinations are first screened by evaluating the
+			acquisition function on the initial conditions, and only the top_k
+			most promising ones are optimized
+		options_chunk_size : int
+			Number of options of fully categorical/discrete parameter spaces which are
+			enumerated, encoded and evaluated at once
+		num_options_shortlist : int
+			Number of options with the highest acquisition function values which are
+			kept while streaming over the chunks of options, and from which the batch
+			of recommendations is selected
+		option_space : OptionSpace or None
+			Options enumerated and encoded by the planner, with the measured options
+			already masked. If not provided, the options are enumerated at each call
+		"""
 		local_args = {
 			key: val for key, val in locals().items() if key != "self"
 		}
@@ -71,6 +111,15 @@ class GradientOptimizer(AcquisitionOptimizer):
 		self._params = params
 		self._mins_x = self.params_obj._mins_x
 		self._maxs_x = self.params_obj._maxs_x
+		self.mixed_strategy = mixed_strategy
+		self.mixed_top_k = mixed_top_k
+		self.options_chunk_size = options_chunk_size
+		self.num_options_shortlist = num_options_shortlist
+		self.option_space = option_space
+
+		if self.mixed_strategy not in ["serial", "batched"]:
+			msg = f"Mixed optimization strategy {self.mixed_strategy} not understood"
+			Logger.log(msg, "FATAL")
 
 		self.choices_feat, self.choices_cat = None, None
 
@@ -214,27 +263,21 @@ class GradientOptimizer(AcquisitionOptimizer):
 		
 
 	def _optimize_fully_categorical(self):
-		# need to implement the choices input, which is a
-		# (num_choices * d) torch.Tensor of the possible choices
-		# need to generate fully cartesian product space of possible
-		# choices
+		# the (num_choices * d) torch.Tensor of possible choices is the Cartesian
+		# product space of the options, which is enumerated in chunks and only the
+		# options with the highest acquisition function values are kept
 		if self.feas_strategy == "fca" and not self.use_reg_only:
 			# if we have feasibilty constrained acquisition, prepare only
 			# the feasible options as availble choices
 			fca_constraint_callable = self.fca_constraint
 		else:
 			fca_constraint_callable = None
-		
 
-		self.choices_feat, self.choices_cat = create_available_options(
-			self.param_space,
-			self._params,
+		self.choices_feat, self.choices_cat = self._stream_top_options(
+			acq_function=self.acqf,
 			fca_constraint_callable=fca_constraint_callable,
-			known_constraint_callables=self.known_constraints,
-			normalize=self.has_descriptors,
-			has_descriptors=self.has_descriptors,
-			mins_x=self._mins_x,
-			maxs_x=self._maxs_x,
+			num_shortlist=max(self.num_options_shortlist, self.batch_size),
+			max_batch_size=1000,
 		)
 
 		results, best_idx = self._optimize_acqf_discrete(
@@ -246,6 +289,87 @@ class GradientOptimizer(AcquisitionOptimizer):
 		)
 		return results, best_idx
 
+	def _stream_top_options(
+		self,
+		acq_function,
+		fca_constraint_callable,
+		num_shortlist,
+		max_batch_size,
+	):
+		""" streaming top-k over the chunks of unmeasured options. Returns the encoded
+		options and their Olympus representation for the num_shortlist options with the
+		highest acquisition function values, sorted by decreasing acquisition function
+		value. If the FCA constraint is used, only feasible options are kept, unless
+		there are none, in which case we resort back to the full set of options
+		"""
+		# shortlists of feasible options and of all options (for the fallback)
+		top = {"feas": None, "all": None}
+		num_feas, num_total = 0, 0
+
+		def merge(current, feat, cat, vals):
+			if current is not None:
+				feat = torch.cat([current[0], feat])
+				cat = np.concatenate([current[1], cat])
+				vals = torch.cat([current[2], vals])
+			top_ixs = torch.topk(vals, min(num_shortlist, vals.shape[0])).indices
+			return feat[top_ixs], cat[top_ixs.numpy()], vals[top_ixs]
+
+		if self.option_space is not None:
+			chunks = self.option_space.iter_available(
+				normalize=self.has_descriptors,
+				mins_x=self._mins_x,
+				maxs_x=self._maxs_x,
+				chunk_size=self.options_chunk_size,
+			)
+		else:
+			chunks = iter_available_options(
+				self.param_space,
+				self._params,
+				self.known_constraints,
+				normalize=self.has_descriptors,
+				mins_x=self._mins_x,
+				maxs_x=self._maxs_x,
+				has_descriptors=self.has_descriptors,
+				chunk_size=self.options_chunk_size,
+			)
+
+		for feat_chunk, cat_chunk in chunks:
+			with torch.no_grad():
+				acq_values = torch.cat(
+					[
+						acq_function(X_)
+						for X_ in feat_chunk.float().unsqueeze(-2).split(max_batch_size)
+					]
+				)
+			num_total += feat_chunk.shape[0]
+			top["all"] = merge(top["all"], feat_chunk, cat_chunk, acq_values)
+
+			if fca_constraint_callable is not None:
+				constraint_vals = fca_constraint_callable(feat_chunk.unsqueeze(1))
+				feas_mask = (constraint_vals >= 0.0).view(-1)
+				num_feas += int(feas_mask.sum())
+				if torch.any(feas_mask):
+					top["feas"] = merge(
+						top["feas"],
+						feat_chunk[feas_mask],
+						cat_chunk[feas_mask.numpy()],
+						acq_values[feas_mask],
+					)
+
+		if top["all"] is None:
+			msg = "No unmeasured options left in the parameter space"
+			Logger.log(msg, "FATAL")
+
+		if fca_constraint_callable is not None:
+			Logger.log(f"{num_feas}/{num_total} options are feasible", "INFO")
+			if top["feas"] is None:
+				msg = "No feasible samples after FCA constraint, resorting back to full space"
+				Logger.log(msg, "WARNING")
+			else:
+				return top["feas"][0], top["feas"][1]
+
+		return top["all"][0], top["all"][1]
+
 	def _optimize_acqf_discrete(
 		self,
 		acq_function,
@@ -256,58 +380,57 @@ class GradientOptimizer(AcquisitionOptimizer):
 	):
 		# this function assumes 'unique' argument is always set to True
 		# strategy can be set to 'greedy' or 'sequential'
-		original_choices_batched = torch.clone(choices)        
 		choices_batched = choices.unsqueeze(-2)
 
 		if q > 1:
 			if self.batched_strategy == "sequential":
-				candidate_list, acq_value_list = [], []
-				base_X_pending = acq_function.X_pending
+				candidate_list, acq_value_list, best_idxs = [], [], []
+				base_X_pending = getattr(acq_function, "X_pending", None)
+				# only Monte Carlo acquisition functions account for the pending
+				# points, the others are evaluated once on all the choices
+				update_pending = isinstance(acq_function, MCAcquisitionFunction)
+				# track the choices which remain available by masking
+				avail_mask = torch.ones(choices_batched.shape[0], dtype=torch.bool)
+				acq_values = None
 				for _ in range(q):
-					with torch.no_grad():
-						acq_values = torch.cat(
-							[
-								acq_function(X_)
-								for X_ in choices_batched.split(max_batch_size)
-							]
+					if acq_values is None or update_pending:
+						# only evaluate the choices which are still available
+						avail_ixs = torch.where(avail_mask)[0]
+						with torch.no_grad():
+							avail_acq_values = torch.cat(
+								[
+									acq_function(X_)
+									for X_ in choices_batched[avail_ixs].split(max_batch_size)
+								]
+							)
+						acq_values = torch.full(
+							(choices_batched.shape[0],),
+							-float("inf"),
+							dtype=avail_acq_values.dtype,
 						)
-					#best_idx = torch.argmax(acq_values)
-					best_idxs_ =  torch.argsort(acq_values, descending=True)
-					best_idx = best_idxs_[torch.randint(low=0, high=500, size=(1,))]
+						acq_values[avail_ixs] = avail_acq_values
+					# select randomly amongst the best available choices
+					num_avail = int(avail_mask.sum())
+					best_idxs_ = torch.argsort(acq_values, descending=True)[:num_avail]
+					best_idx = best_idxs_[torch.randint(low=0, high=min(500, num_avail), size=(1,))]
 					candidate_list.append(choices_batched[best_idx])
 					acq_value_list.append(acq_values[best_idx])
-					# set pending points
-					candidates = torch.cat(candidate_list, dim=-2)
-					acq_function.set_X_pending(
-						torch.cat([base_X_pending, candidates], dim=-2)
-						if base_X_pending is not None
-						else candidates
-					)
+					best_idxs.append(int(best_idx))
 					# need to remove choice from choice set if enforcing uniqueness
 					if unique:
-						choices_batched = torch.cat(
-							[
-								choices_batched[:best_idx],
-								choices_batched[best_idx + 1 :],
-							]
-						)
-				# Reset acq_func to previous X_pending state
-				acq_function.set_X_pending(base_X_pending)
-				# need to get and return the original indices of the selected candidates
-				best_idxs = []
-				for (
-					candidate
-				) in (
-					candidate_list
-				):  # each candidate is shape (1, num_features)
-					bools = [
-						torch.all(
-							candidate[0] == original_choices_batched[i, :]
+						avail_mask[best_idx] = False
+						acq_values[best_idx] = -float("inf")
+					if update_pending:
+						# set pending points
+						candidates = torch.cat(candidate_list, dim=-2)
+						acq_function.set_X_pending(
+							torch.cat([base_X_pending, candidates], dim=-2)
+							if base_X_pending is not None
+							else candidates
 						)
-						for i in range(original_choices_batched.shape[0])
-					]
-					assert bools.count(True) == 1
-					best_idxs.append(np.where(bools)[0][0])
+				if update_pending:
+					# Reset acq_func to previous X_pending state
+					acq_function.set_X_pending(base_X_pending)
 
 				return candidate_list, best_idxs
 
@@ -370,11 +493,49 @@ class GradientOptimizer(AcquisitionOptimizer):
 
 		# batch size of 1
 		if q == 1:
+			# indices of the fixed features combinations to optimize
+			ff_indices = list(range(len(fixed_features_list)))
+			if (
+				self.mixed_top_k is not None
+				and batch_initial_conditions is not None
+				and self.mixed_top_k < len(fixed_features_list)
+			):
+				ff_indices = self._screen_fixed_features(
+					acq_function,
+					fixed_features_list,
+					batch_initial_conditions,
+					self.mixed_top_k,
+				)
+
+			use_batched = (
+				self.mixed_strategy == "batched" and batch_initial_conditions is not None
+			)
+			if use_batched and any(
+				arg is not None for arg in [
+					inequality_constraints, equality_constraints, post_processing_func
+				]
+			):
+				# the batched L-BFGS run only handles the parameter bounds
+				msg = "Batched mixed optimization does not support constraints or post-processing, resorting to serial optimization"
+				Logger.log(msg, "WARNING")
+				use_batched = False
+
+			if use_batched:
+				return self._optimize_fixed_features_batched(
+					acq_function,
+					bounds,
+					fixed_features_list,
+					ff_indices,
+					batch_initial_conditions,
+					options=options,
+				)
+
 			ff_candidate_list, ff_acq_value_list = [], []
 			# iterate through all the fixed featutes and optimize the continuous
 			# part of the parameter space
 			# fixed features and cart_prod choices have the same ordering
-			for fixed_features in fixed_features_list:
+			for ff_idx in ff_indices:
+				fixed_features = fixed_features_list[ff_idx]
 				candidate, acq_value = optimize_acqf(
 					acq_function=acq_function,
 					bounds=bounds,
@@ -395,7 +556,7 @@ class GradientOptimizer(AcquisitionOptimizer):
 			ff_acq_values = torch.stack(ff_acq_value_list)
 			best_idx = torch.argmax(ff_acq_values)
 
-			return ff_candidate_list[best_idx], [best_idx.detach()]
+			return ff_candidate_list[best_idx], [torch.tensor(ff_indices[best_idx])]
 
 		# For batch optimization with q > 1 we do not want to enumerate all n_combos^n
 		# possible combinations of discrete choices. Instead, we use sequential greedy
@@ -437,6 +598,122 @@ class GradientOptimizer(AcquisitionOptimizer):
 
 		return candidates, acq_value
 
+	@staticmethod
+	def _fixed_features_values(fixed_features_list, ff_indices):
+		""" returns the dimensions fixed by the fixed features (common to all
+		combinations) and a (num_combinations x num_fixed_dims) tensor of their values
+		"""
+		fixed_dims = sorted(fixed_features_list[0].keys())
+		values = torch.tensor(
+			[
+				[float(fixed_features_list[ff_idx][dim]) for dim in fixed_dims]
+				for ff_idx in ff_indices
+			]
+		).double()
+		return fixed_dims, values
+
+	def _screen_fixed_features(
+		self,
+		acq_function,
+		fixed_features_list,
+		batch_initial_conditions,
+		top_k,
+		max_batch_size=5000,
+	):
+		""" cheaply score each combination of fixed features by the best acquisition
+		function value among the initial conditions, with the fixed dimensions
+		replaced by those of the combination. Returns the indices of the top_k
+		combinations
+		"""
+		fixed_dims, values = self._fixed_features_values(
+			fixed_features_list, range(len(fixed_features_list))
+		)
+		num_restarts = batch_initial_conditions.shape[0]
+		X = batch_initial_conditions.squeeze(1).double()
+
+		scores = []
+		# number of combinations scored at once
+		chunk_size = max(1, max_batch_size // num_restarts)
+		with torch.no_grad():
+			for values_chunk in values.split(chunk_size):
+				X_screen = X.repeat(values_chunk.shape[0], 1)
+				X_screen[:, fixed_dims] = values_chunk.repeat_interleave(
+					num_restarts, dim=0
+				)
+				acq_values = acq_function(X_screen.unsqueeze(1))
+				scores.append(
+					acq_values.view(values_chunk.shape[0], num_restarts).amax(dim=1)
+				)
+		scores = torch.cat(scores)
+
+		return torch.argsort(scores, descending=True)[:top_k].tolist()
+
+	def _optimize_fixed_features_batched(
+		self,
+		acq_function,
+		bounds,
+		fixed_features_list,
+		ff_indices,
+		batch_initial_conditions,
+		options=None,
+		max_batch_size=2000,
+	):
+		""" optimize the continuous dimensions for several combinations of fixed
+		features jointly. Each restart of each combination is an element of a batch
+		of initial conditions, such that a single batched L-BFGS run replaces one
+		optimize_acqf call per combination. Only the parameter bounds are enforced,
+		use the serial optimization for inequality/equality constraints or
+		post-processing functions
+		"""
+		fixed_dims, values = self._fixed_features_values(
+			fixed_features_list, ff_indices
+		)
+		free_dims = [
+			dim for dim in range(bounds.shape[-1]) if dim not in fixed_dims
+		]
+		num_restarts = batch_initial_conditions.shape[0]
+		X_init = batch_initial_conditions[..., free_dims].double()
+		options = {
+			"maxiter": 200,
+			**{
+				key: val for key, val in (options or {}).items()
+				if key in SCIPY_OPTIONS
+			},
+		}
+
+		candidates, acq_values = [], []
+		# number of combinations optimized at once
+		chunk_size = max(1, max_batch_size // num_restarts)
+		for values_chunk in values.split(chunk_size):
+			num_combs = values_chunk.shape[0]
+			ff_acq_function = FixedFeatureAcquisitionFunction(
+				acq_function,
+				d=bounds.shape[-1],
+				columns=fixed_dims,
+				values=values_chunk.repeat_interleave(num_restarts, dim=0).unsqueeze(1),
+			)
+			batch_candidates, batch_acq_values = gen_candidates_scipy(
+				initial_conditions=X_init.repeat(num_combs, 1, 1),
+				acquisition_function=ff_acq_function,
+				lower_bounds=bounds[0, free_dims],
+				upper_bounds=bounds[1, free_dims],
+				options=options,
+			)
+			# best restart for each combination
+			batch_acq_values = batch_acq_values.view(num_combs, num_restarts)
+			best_restarts = torch.argmax(batch_acq_values, dim=1)
+			best_ixs = torch.arange(num_combs) * num_restarts + best_restarts
+			candidates.append(
+				ff_acq_function._construct_X_full(batch_candidates)[best_ixs].detach()
+			)
+			acq_values.append(batch_acq_values.amax(dim=1).detach())
+
+		candidates = torch.cat(candidates)
+		acq_values = torch.cat(acq_values)
+		best_idx = torch.argmax(acq_values)
+
+		return candidates[best_idx], [torch.tensor(ff_indices[best_idx])]
+
 	def postprocess_results(self, results, best_idx=None):
 		# expects list as results
 
@@ -3,6 +3,7 @@
 import os
 import pickle
 import math
+from concurrent.futures import ProcessPoolExecutor
 import sys
 import time
 from copy import deepcopy
@@ -39,6 +40,7 @@ from atlas.optimizers.acqfs import (
     FeasibilityAwareEI,
     FeasibilityAwareGeneral,
     FeasibilityAwareQEI,
+    OptionSpace,
     create_available_options,
     get_batch_initial_conditions,
 )
@@ -50,8 +52,15 @@ from atlas.optimizers.gps import (
     ClassificationGPMatern,
 )
 from atlas.optimizers.params import Parameters
+from atlas.optimizers.samplers import (
+    SAMPLER_KINDS,
+    InitialDesignSampler,
+    sample_param_space,
+)
 from atlas.optimizers.utils import (
+    ParamEncoder,
     cat_param_to_feat,
+    evaluate_known_constraints,
     forward_normalize,
     forward_standardize,
     get_cat_dims,
@@ -91,6 +100,11 @@ class BasePlanner(CustomPlanner):
         moo_params: Dict[str, Union[str, float, int, bool, List]] = {},
         goals: Optional[List[str]] = None,
         golem_config: Optional[Dict[str, Any]] = None,
+        vgp_cv_num_workers: Optional[int] = None,
+        candidate_sampler: str = "random",
+        warm_start_cla: bool = False,
+        cla_cv_refresh_frac: float = 0.2,
+        max_option_space_bytes: int = 50000000,
         **kwargs: Any,
     ):
         """Base optimizer class containing higher-level operations.
@@ -112,6 +126,7 @@ class BasePlanner(CustomPlanner):
         else:
             self.random_seed = random_seed
         np.random.seed(self.random_seed)
+        self.rng = np.random.default_rng(self.random_seed)
         self.use_descriptors = use_descriptors
         self.num_init_design = num_init_design
         self.init_design_strategy = init_design_strategy
@@ -129,11 +144,32 @@ class BasePlanner(CustomPlanner):
         self.moo_params = moo_params
         self.goals = goals
         self.golem_config = golem_config
+        self.vgp_cv_num_workers = vgp_cv_num_workers
+        self.candidate_sampler = candidate_sampler
+        self.warm_start_cla = warm_start_cla
+        self.cla_cv_refresh_frac = cla_cv_refresh_frac
 
 
         # initial design point trackers
         self.num_init_design_attempted = 0
         self.num_init_design_completed = 0
+        self.init_design_sampler = None
+
+        # whether the regression surrogate is only updated (with frozen
+        # hyperparameters and output scaling) at the current iteration
+        self._reg_update_only = False
+
+        # number of epochs selected by the last cross-validation of the
+        # classification surrogate, and the number of observations it used
+        self._cla_cv_num_epochs = None
+        self._cla_cv_num_obs = None
+
+        # candidates shared by the surrogate evaluations of the current ask
+        self.candidate_pool = None
+
+        # precomputed options of parameter spaces without continuous parameters
+        self.max_option_space_bytes = max_option_space_bytes
+        self.option_space = None
 
         # check multiobjective stuff
         if self.is_moo:
@@ -154,19 +190,7 @@ class BasePlanner(CustomPlanner):
             )
 
         # treat the inital design arguments
-        if self.init_design_strategy == "random":
-            self.init_design_planner = olympus.planners.RandomSearch(
-                goal=self.goal
-            )
-        elif self.init_design_strategy == "sobol":
-            self.init_design_planner = olympus.planners.Sobol(
-                goal=self.goal, budget=self.num_init_design
-            )
-        elif self.init_design_strategy == "lhs":
-            self.init_design_planner = olympus.planners.LatinHypercube(
-                goal=self.goal, budget=self.num_init_design
-            )
-        else:
+        if self.init_design_strategy not in SAMPLER_KINDS:
             message = f"Initial design strategy {self.init_design_strategy} not implemented"
             Logger.log(message, "FATAL")
 
@@ -211,6 +235,28 @@ class BasePlanner(CustomPlanner):
             else:
                 self.has_descriptors = False
 
+            # vectorized encoder of the parameters
+            self.param_encoder = ParamEncoder(self.param_space, self.has_descriptors)
+
+            # enumerate and encode the options once if the space has no continuous
+            # parameters and is small enough to be held in memory. The options
+            # are enumerated on first use by the acquisition optimizer
+            self.option_space = None
+            if self.problem_type in [
+                "fully_categorical",
+                "fully_discrete",
+                "mixed_cat_disc",
+            ]:
+                nbytes = OptionSpace.estimate_nbytes(
+                    self.param_space, self.has_descriptors
+                )
+                if nbytes <= self.max_option_space_bytes:
+                    self.option_space = OptionSpace(
+                        self.param_space,
+                        self.known_constraints,
+                        self.has_descriptors,
+                    )
+
             # check general parameter config
             if self.general_parameters is not None:
                 # check types of general parameters
@@ -255,10 +301,69 @@ class BasePlanner(CustomPlanner):
             model = ClassificationGPMatern(train_x, train_y)
             likelihood = gpytorch.likelihoods.BernoulliLikelihood()
 
-            model, likelihood = self.train_vgp(model, likelihood, train_x, train_y)
+            num_epochs = None
+            if self.warm_start_cla and getattr(self, "cla_model", None) is not None:
+                # seed the model with the parameters of the previous iteration and,
+                # unless the data has grown substantially since the last cross-validation,
+                # reuse its epoch budget
+                self.load_cla_params(model, self.cla_model, train_x)
+                if (
+                    self._cla_cv_num_epochs is not None
+                    and train_y.shape[0] <= (1.+self.cla_cv_refresh_frac)*self._cla_cv_num_obs
+                ):
+                    num_epochs = self._cla_cv_num_epochs
+
+            model, likelihood = self.train_vgp(
+                model, likelihood, train_x, train_y, num_epochs=num_epochs,
+            )
 
             return model, likelihood
 
+    @staticmethod
+    def load_cla_params(
+        model: gpytorch.models.ApproximateGP,
+        prev_model: gpytorch.models.ApproximateGP,
+        train_x: torch.Tensor,
+    ) -> bool:
+        """seed a freshly built classification GP with the kernel hyperparameters
+        and the mean of a previously fitted one. If the training inputs of the previous
+        model (its inducing points) are a prefix of train_x, the variational distribution
+        of the previous inducing points is reused, and that of the new inducing points is
+        initialized with the predictive distribution of the previous model.
+        Returns True if the variational parameters could be reused
+        """
+        model.mean_module.load_state_dict(prev_model.mean_module.state_dict())
+        model.covar_module.load_state_dict(prev_model.covar_module.state_dict())
+
+        prev_x = prev_model.variational_strategy.inducing_points
+        num_prev = prev_x.shape[0]
+        if not (
+            num_prev <= train_x.shape[0]
+            and prev_x.shape[-1] == train_x.shape[-1]
+            and torch.allclose(prev_x, train_x[:num_prev])
+        ):
+            return False
+
+        prev_dist = prev_model.variational_strategy._variational_distribution
+        dist = model.variational_strategy._variational_distribution
+        with torch.no_grad():
+            mean = prev_dist.variational_mean.detach().clone()
+            chol = torch.zeros_like(dist.chol_variational_covar)
+            chol[:num_prev, :num_prev] = prev_dist.chol_variational_covar
+            if num_prev < train_x.shape[0]:
+                prev_model.eval()
+                pred = prev_model(train_x[num_prev:])
+                mean = torch.cat([mean, pred.mean])
+                chol[num_prev:, num_prev:] = torch.diag(
+                    pred.variance.clamp_min(1e-6).sqrt()
+                )
+            dist.variational_mean.copy_(mean)
+            dist.chol_variational_covar.copy_(chol)
+        # do not let the variational strategy reset the distribution to the prior
+        model.variational_strategy.variational_params_initialized.fill_(1)
+
+        return True
+
     def train_vgp(
         self,
         model: gpytorch.models.ApproximateGP,
@@ -266,10 +371,13 @@ class BasePlanner(CustomPlanner):
         train_x: torch.Tensor,
         train_y: torch.Tensor,
         cross_validate: str = True,
+        num_epochs: Optional[int] = None,
     ) -> Tuple[
         gpytorch.models.ApproximateGP, gpytorch.likelihoods.BernoulliLikelihood
     ]:
-
+        """train the classification VGP on all observations. The number of epochs is
+        selected by cross-validation with early stopping, unless num_epochs is provided
+        """
 
         model.train()
         likelihood.train()
@@ -284,7 +392,11 @@ class BasePlanner(CustomPlanner):
         count_after_iter = 50
 
 
-        if cross_validate and train_y.shape[0] >= min_obs:
+        start_time = time.time()
+        if num_epochs is not None:
+            num_iters_full = num_epochs
+
+        elif cross_validate and train_y.shape[0] >= min_obs:
 
             idx_0 = torch.where(train_y==0.)[0]
             idx_1 = torch.where(train_y==1.)[0]
@@ -303,95 +415,72 @@ class BasePlanner(CustomPlanner):
             train_x_infl = torch.cat([train_x, X_infl])
 
 
-            folds = []
-
             fold_size = math.ceil(train_y_infl.shape[0]/num_folds)
             indices = torch.randperm(train_y_infl.shape[0])#torch.arange(train_y_infl.shape[0])
 
-            # cross validation procedure
+            # create fold data, all folds have the same number of training
+            # and validation points
+            train_ix_folds, valid_ix_folds = [], []
             for fold_ix in range(num_folds):
-
-                # create fold data
-                train_x_fold, train_y_fold = train_x_infl[indices[fold_size:], :], train_y_infl[indices[fold_size:]]
-                valid_x_fold, valid_y_fold = train_x_infl[indices[:fold_size], :], train_y_infl[indices[:fold_size]]
-
-                # create new model and likelihood for fold
-                model_fold = ClassificationGPMatern(train_x_fold, train_y_fold)
-                likelihood_fold = gpytorch.likelihoods.BernoulliLikelihood()
-                optimizer_fold = torch.optim.Adam(model_fold.parameters(), lr=self.vgp_lr)
-                mll_fold = gpytorch.mlls.VariationalELBO(likelihood_fold, model_fold, train_y_fold.numel())
-
-                model_fold.train()
-                likelihood_fold.train()
-
-                folds.append({
-                    'model': model_fold, 'likelihood': likelihood_fold,
-                    'optimizer': optimizer_fold, 'mll': mll_fold,
-                    'train_x': train_x_fold, 'train_y': train_y_fold,
-                    'valid_x': valid_x_fold, 'valid_y': valid_y_fold,
-                })
-
+                train_ix_folds.append(indices[fold_size:])
+                valid_ix_folds.append(indices[:fold_size])
                 indices = torch.roll(indices, fold_size)
+            train_ix_folds = torch.stack(train_ix_folds)
+            valid_ix_folds = torch.stack(valid_ix_folds)
+
+            train_x_folds = train_x_infl[train_ix_folds]  # (num_folds, num_train, d)
+            train_y_folds = train_y_infl[train_ix_folds]
+            valid_x_folds = train_x_infl[valid_ix_folds]  # (num_folds, num_valid, d)
+            valid_y_folds = train_y_infl[valid_ix_folds]
+
+            if self.vgp_cv_num_workers is not None and self.vgp_cv_num_workers > 1:
+                # train the fold models in separate processes
+                with ProcessPoolExecutor(
+                    max_workers=min(self.vgp_cv_num_workers, num_folds)
+                ) as executor:
+                    num_epochs_fold = list(executor.map(
+                        _train_vgp_fold,
+                        train_x_folds, train_y_folds,
+                        valid_x_folds, valid_y_folds,
+                        [self.vgp_iters]*num_folds, [self.vgp_lr]*num_folds,
+                        [self.max_jitter]*num_folds,
+                        [count_after_iter]*num_folds, [es_patience]*num_folds,
+                    ))
+            else:
+                # train the fold models as a single batched model with early stopping
+                num_epochs_fold = _train_vgp_fold(
+                    train_x_folds, train_y_folds,
+                    valid_x_folds, valid_y_folds,
+                    self.vgp_iters, self.vgp_lr, self.max_jitter,
+                    count_after_iter, es_patience,
+                    batch_shape=torch.Size([num_folds]),
+                )
 
-            num_epochs_fold = []
-
-            # train model on folds with early stopping
-            for fold_ix, fold in enumerate(folds):
-                train_losses, valid_losses = [], []
-                start_time = time.time()
-                model_fold, likelihood_fold = fold['model'], fold['likelihood']
-                optimizer_fold, mll_fold = fold['optimizer'], fold['mll']
-                with gpytorch.settings.cholesky_jitter(self.max_jitter):
-
-                    best_loss = 1.e8
-                    patience_iter_ = 0
-                    for iter_ in track(
-                        range(self.vgp_iters), description=f'Training variational GP on fold {fold_ix+1}/{num_folds}'
-                    ):
-                        optimizer_fold.zero_grad()
-                        train_pred = model_fold(fold['train_x'])
-                        valid_pred = model_fold(fold['valid_x'])
-                        train_loss = -mll_fold(train_pred, fold['train_y'])
-                        valid_loss = -mll_fold(valid_pred, fold['valid_y'])
-
-                        if iter_ > count_after_iter:
-                            if valid_loss < best_loss:
-                                best_loss = valid_loss
-                                patience_iter_ = 0  # reset patience
-                            else:
-                                patience_iter_ += 1 # increment patience
-
-                            if patience_iter_ > es_patience:
-                                break  # early stopping criteria met
-
-                        train_losses.append(train_loss)
-                        valid_losses.append(valid_loss)
-
-                        train_loss.backward()
-                        optimizer_fold.step()
-
-
-                vgp_train_time = time.time() - start_time
-                msg = f" Classification surrogate VGP trained in {round(vgp_train_time,3)} sec ({iter_} epochs)\t Loss : {round(train_loss.item(), 3)} "
-                Logger.log(msg, "INFO")
-                # TODO: update this
-                num_epochs_fold.append(iter_)
-
-            # train model on all observations
-            num_iters_full = int(np.mean(num_epochs_fold))
-            with gpytorch.settings.cholesky_jitter(self.max_jitter):
-                for iter_ in track(
-                    range(num_iters_full), description=f"Training variational GP on all observations ..."
-                ):
-                    optimizer.zero_grad()
-                    output = model(train_x)
-                    loss = -mll(output, train_y)
-                    loss.backward()
-                    optimizer.step()
             vgp_train_time = time.time() - start_time
-            msg = f" Classification surrogate VGP trained in {round(vgp_train_time,3)} sec ({num_iters_full} epochs)\t Loss : {round(loss.item(), 3)} "
+            msg = f" Classification surrogate VGP trained on {num_folds} folds in {round(vgp_train_time,3)} sec ({num_epochs_fold} epochs)"
             Logger.log(msg, "INFO")
 
+            num_iters_full = int(np.mean(num_epochs_fold))
+            self._cla_cv_num_epochs = num_iters_full
+            self._cla_cv_num_obs = train_y.shape[0]
+
+        else:
+            return model, likelihood
+
+        # train model on all observations
+        with gpytorch.settings.cholesky_jitter(self.max_jitter):
+            for iter_ in track(
+                range(num_iters_full), description=f"Training variational GP on all observations ..."
+            ):
+                optimizer.zero_grad()
+                output = model(train_x)
+                loss = -mll(output, train_y)
+                loss.backward()
+                optimizer.step()
+        vgp_train_time = time.time() - start_time
+        msg = f" Classification surrogate VGP trained in {round(vgp_train_time,3)} sec ({num_iters_full} epochs)\t Loss : {round(loss.item(), 3)} "
+        Logger.log(msg, "INFO")
+
         return model, likelihood
 
     def build_train_data(self) -> Tuple[torch.Tensor, torch.tensor]:
@@ -427,28 +516,9 @@ class BasePlanner(CustomPlanner):
             params_reg = self._params[feas_ix].reshape(-1, 1)
             train_y_reg = self._values[feas_ix].reshape(-1, 1)
 
-        train_x_cla, train_x_reg = [], []
-
-        # adapt the data from olympus form to torch tensors
-        for ix in range(self._values.shape[0]):
-            sample_x = []
-            for param_ix, (space_true, element) in enumerate(
-                zip(self.param_space, params_cla[ix])
-            ):
-                if self.param_space[param_ix].type == "categorical":
-                    feat = cat_param_to_feat(
-                        space_true,
-                        element,
-                        has_descriptors=self.has_descriptors,
-                    )
-                    sample_x.extend(feat)
-                else:
-                    sample_x.append(float(element))
-            train_x_cla.append(sample_x)
-            if ix in feas_ix:
-                train_x_reg.append(sample_x)
-
-        train_x_cla, train_x_reg = np.array(train_x_cla), np.array(train_x_reg)
+        # adapt the data from olympus form to numerical features
+        train_x_cla = self.param_encoder.encode(params_cla)
+        train_x_reg = train_x_cla[feas_ix]
 
         # if we are using Golem, fit Golem to current regression training data,
         # and replace data with its predictions
@@ -460,10 +530,12 @@ class BasePlanner(CustomPlanner):
             ).reshape(-1, 1)
 
         # scale the training data - normalize inputs and standardize outputs
-        self._means_y, self._stds_y = np.mean(train_y_reg, axis=0), np.std(
-            train_y_reg, axis=0
-        )
-        self._stds_y = np.where(self._stds_y == 0.0, 1.0, self._stds_y)
+        # (the output scaling is kept fixed if the regression surrogate is only updated)
+        if not self._reg_update_only:
+            self._means_y, self._stds_y = np.mean(train_y_reg, axis=0), np.std(
+                train_y_reg, axis=0
+            )
+            self._stds_y = np.where(self._stds_y == 0.0, 1.0, self._stds_y)
 
         if (
             self.problem_type == "fully_categorical"
@@ -493,6 +565,28 @@ class BasePlanner(CustomPlanner):
             torch.tensor(train_y_reg).double(),
         )
 
+    def encode_params(self, X: Union[np.ndarray, List]) -> torch.Tensor:
+        """convert parameters from olympus form to (scaled) torch tensors
+
+        Args:
+                X (np.ndarray or list): 2d numpy array or nested list with input parameters
+        """
+        X_proc = torch.tensor(self.param_encoder.encode(X)).double()
+
+        if (
+            self.problem_type == "fully_categorical"
+            and not self.has_descriptors
+        ):
+            # we dont scale the parameters if we have a fully one-hot-encoded representation
+            pass
+        else:
+            # scale the parameters
+            X_proc = forward_normalize(
+                X_proc, self.params_obj._mins_x, self.params_obj._maxs_x
+            )
+
+        return X_proc
+
     def reg_surrogate(
         self,
         X: torch.Tensor,
@@ -510,37 +604,7 @@ class BasePlanner(CustomPlanner):
             msg = "Optimizer does not yet have regression surrogate model"
             Logger.log(msg, "FATAL")
 
-        X_proc = []
-        # adapt the data from olympus form to torch tensors
-        for ix in range(len(X)):
-            sample_x = []
-            for param_ix, (space_true, element) in enumerate(
-                zip(self.param_space, X[ix])
-            ):
-                if self.param_space[param_ix].type == "categorical":
-                    feat = cat_param_to_feat(
-                        space_true,
-                        element,
-                        has_descriptors=self.has_descriptors,
-                    )
-                    sample_x.extend(feat)
-                else:
-                    sample_x.append(float(element))
-            X_proc.append(sample_x)
-
-        X_proc = torch.tensor(np.array(X_proc)).double()
-
-        if (
-            self.problem_type == "fully_categorical"
-            and not self.has_descriptors
-        ):
-            # we dont scale the parameters if we have a fully one-hot-encoded representation
-            pass
-        else:
-            # scale the parameters
-            X_proc = forward_normalize(
-                X_proc, self.params_obj._mins_x, self.params_obj._maxs_x
-            )
+        X_proc = self.encode_params(X)
 
         posterior = self.reg_model.posterior(X=X_proc)
         pred_mu, pred_sigma = posterior.mean.detach(), torch.sqrt(
@@ -569,37 +633,7 @@ class BasePlanner(CustomPlanner):
             msg = "Optimizer does not yet have classification surrogate model"
             Logger.log(msg, "FATAL")
 
-        X_proc = []
-        # adapt the data from olympus form to torch tensors
-        for ix in range(len(X)):
-            sample_x = []
-            for param_ix, (space_true, element) in enumerate(
-                zip(self.param_space, X[ix])
-            ):
-                if self.param_space[param_ix].type == "categorical":
-                    feat = cat_param_to_feat(
-                        space_true,
-                        element,
-                        has_descriptors=self.has_descriptors,
-                    )
-                    sample_x.extend(feat)
-                else:
-                    sample_x.append(float(element))
-            X_proc.append(sample_x)
-
-        X_proc = torch.tensor(np.array(X_proc)).double()
-
-        if (
-            self.problem_type == "fully_categorical"
-            and not self.has_descriptors
-        ):
-            # we dont scale the parameters if we have a fully one-hot-encoded representation
-            pass
-        else:
-            # scale the parameters
-            X_proc = forward_normalize(
-                X_proc, self.params_obj._mins_x, self.params_obj._maxs_x
-            )
+        X_proc = self.encode_params(X)
 
         likelihood = self.cla_likelihood(self.cla_model(X_proc.float()))
         mean = likelihood.mean.detach()
@@ -623,37 +657,7 @@ class BasePlanner(CustomPlanner):
         unconstrained: bool = False,
     ) -> Union[torch.Tensor, np.ndarray]:
 
-        X_proc = []
-        # adapt the data from olympus form to torch tensors
-        for ix in range(len(X)):
-            sample_x = []
-            for param_ix, (space_true, element) in enumerate(
-                zip(self.param_space, X[ix])
-            ):
-                if self.param_space[param_ix].type == "categorical":
-                    feat = cat_param_to_feat(
-                        space_true,
-                        element,
-                        has_descriptors=self.has_descriptors,
-                    )
-                    sample_x.extend(feat)
-                else:
-                    sample_x.append(float(element))
-            X_proc.append(sample_x)
-
-        X_proc = torch.tensor(np.array(X_proc)).double()
-
-        if (
-            self.problem_type == "fully_categorical"
-            and not self.has_descriptors
-        ):
-            # we dont scale the parameters if we have a fully one-hot-encoded representation
-            pass
-        else:
-            # scale the parameters
-            X_proc = forward_normalize(
-                X_proc, self.params_obj._mins_x, self.params_obj._maxs_x
-            )
+        X_proc = self.encode_params(X)
 
         X_proc = X_proc.view(X_proc.shape[0], 1, X_proc.shape[-1])
         if unconstrained:
@@ -691,13 +695,24 @@ class BasePlanner(CustomPlanner):
         if len(np.array(self._values).shape) == 1:
             self._values = np.array(self._values).reshape(-1, 1)
 
-        # generate Parameters object
-        self.params_obj = Parameters(
-            olympus_param_space=self.param_space,
-            observations=observations,
-            has_descriptors=self.has_descriptors,
-            general_parameters=self.general_parameters,
-        )
+        # generate Parameters object, or update the existing one with the
+        # new observations only
+        if not (
+            hasattr(self, "params_obj")
+            and self.params_obj.param_space is self.param_space
+            and self.params_obj.has_descriptors == self.has_descriptors
+            and self.params_obj.update(observations)
+        ):
+            self.params_obj = Parameters(
+                olympus_param_space=self.param_space,
+                observations=observations,
+                has_descriptors=self.has_descriptors,
+                general_parameters=self.general_parameters,
+            )
+
+        # mark the options of the new observations as measured
+        if self.option_space is not None:
+            self.option_space.update(self._params)
 
 
     def fca_constraint(self, X: torch.Tensor) -> torch.Tensor:
@@ -759,48 +774,58 @@ class BasePlanner(CustomPlanner):
         else:
             Logger.log('Something is wrong', 'FATAL')
 
-        # set parameter space for the initial design planner
-        self.init_design_planner.set_param_space(self.param_space)
+        # the candidates are drawn in batches and screened with the known constraints
+        # at once, the sampler keeps the state of the design across batches
+        if (
+            self.init_design_sampler is None
+            or self.init_design_sampler.param_space is not self.param_space
+        ):
+            self.init_design_sampler = InitialDesignSampler(
+                self.param_space,
+                kind=self.init_design_strategy,
+                known_constraints=self.known_constraints,
+                rng=self.rng,
+                num_design=self.num_init_design,
+            )
+        samples, num_attempted = self.init_design_sampler.sample(num_gen)
+
         return_params = []
-        while len(return_params) < num_gen:
-            # TODO: this is pretty sloppy - consider standardizing this
-            if self.init_design_strategy == "random":
-                self.init_design_planner._tell(iteration=self.num_init_design_attempted)
-            else:
-                self.init_design_planner.tell()
-            rec_params = self.init_design_planner.ask()
-            if isinstance(rec_params, list):
-                rec_params = rec_params[0]
-            elif isinstance(rec_params, ParameterVector):
-                pass
-            else:
-                raise TypeError
-            
-            # check to see if the recommended parameters satisfy the 
-            # known constraints, if there are any
-            if self.known_constraints is not None:
-                # we have some known constraints 
-                kc_res = [kc(rec_params.to_array()) for kc in self.known_constraints]
-                if all(kc_res):
-                    return_params.append(rec_params)
-                    self.num_init_design_completed += 1  # batch_size always 1 for init design planner
-            else:
-                return_params.append(rec_params)
-                self.num_init_design_completed += 1
+        for sample in samples:
+            param_dict = {}
+            for param, val in zip(self.param_space, sample):
+                if param.type == "categorical":
+                    param_dict[param.name] = str(val)
+                else:
+                    param_dict[param.name] = float(val)
+            return_params.append(
+                ParameterVector().from_dict(param_dict, self.param_space)
+            )
 
-            self.num_init_design_attempted += 1
+        self.num_init_design_completed += len(return_params)
+        self.num_init_design_attempted += num_attempted
 
         return return_params
     
 
     def get_cla_surr_min_max(self, num_samples:int=5000) -> Tuple[int, int]:
-        """ estimate the max and min of the classification surrogate
+        """ estimate the max and min of the classification surrogate on the
+        candidate pool of the current ask if there is one, otherwise on
+        num_samples newly drawn candidates
         """
 
-        samples, _ = propose_randomly(
+        if self.candidate_pool is not None:
+            # evaluated once on the candidates shared within this ask
+            mean = self.candidate_pool.p_feas(self.cla_model, self.cla_likelihood)
+            mean = mean.view(mean.shape[0], 1)
+            return torch.amin(mean).item(), torch.amax(mean).item()
+
+        X, _ = sample_param_space(
             num_samples,
             self.param_space,
             self.has_descriptors,
+            kind=self.candidate_sampler,
+            rng=self.rng,
+            return_torch=True,
         )
         if (
             self.problem_type == "fully_categorical"
@@ -810,12 +835,10 @@ class BasePlanner(CustomPlanner):
             pass
         else:
             # scale the parameters
-            samples = forward_normalize(
-                samples, self.params_obj._mins_x, self.params_obj._maxs_x
+            X = forward_normalize(
+                X, self.params_obj._mins_x, self.params_obj._maxs_x
             )
 
-        X = torch.tensor(samples)
-
         likelihood = self.cla_likelihood(self.cla_model(X.float()))
         mean = 1.-likelihood.mean.detach() # convert p_infeas to p_feas
         mean = mean.view(mean.shape[0], 1)
@@ -823,4 +846,78 @@ class BasePlanner(CustomPlanner):
         min_  = torch.amin(mean).item()
         max_ = torch.amax(mean).item()
 
-        return min_, max_
\ No newline at end of file
+        return min_, max_
+
+
+def _train_vgp_fold(
+    train_x: torch.Tensor,
+    train_y: torch.Tensor,
+    valid_x: torch.Tensor,
+    valid_y: torch.Tensor,
+    vgp_iters: int,
+    vgp_lr: float,
+    max_jitter: float,
+    count_after_iter: int,
+    es_patience: int,
+    batch_shape: torch.Size = torch.Size([]),
+) -> Union[int, List[int]]:
+    """train a classification VGP on cross-validation fold(s) with early stopping
+    on the validation loss, and return the number of epochs trained. If batch_shape
+    is not empty, the leading dimension of the data indexes the folds, which are
+    trained at once as a batched model, and a list with the number of epochs of each
+    fold is returned
+    """
+    model = ClassificationGPMatern(train_x, train_y, batch_shape=batch_shape)
+    likelihood = gpytorch.likelihoods.BernoulliLikelihood()
+    optimizer = torch.optim.Adam(model.parameters(), lr=vgp_lr)
+    mll = gpytorch.mlls.VariationalELBO(likelihood, model, train_y.shape[-1])
+
+    model.train()
+    likelihood.train()
+
+    num_folds = int(np.prod(batch_shape))
+    best_loss = torch.full((num_folds,), 1.e8)
+    patience_iter_ = torch.zeros(num_folds, dtype=torch.long)
+    num_epochs = torch.full((num_folds,), vgp_iters-1, dtype=torch.long)
+    active = torch.ones(num_folds, dtype=torch.bool)
+    # parameters of the folds at the iteration they were stopped
+    params = list(model.parameters())
+    stopped_params = [param.detach().clone() for param in params]
+
+    with gpytorch.settings.cholesky_jitter(max_jitter):
+        for iter_ in range(vgp_iters):
+            optimizer.zero_grad()
+            train_pred = model(train_x)
+            train_loss = -mll(train_pred, train_y).view(num_folds)
+            with torch.no_grad():
+                valid_pred = model(valid_x)
+                valid_loss = -mll(valid_pred, valid_y).view(num_folds)
+
+            if iter_ > count_after_iter:
+                improved = valid_loss < best_loss
+                best_loss = torch.where(improved, valid_loss, best_loss)
+                # reset or increment patience
+                patience_iter_ = torch.where(improved, 0, patience_iter_+1)
+
+                # early stopping criteria met
+                stopped = active & (patience_iter_ > es_patience)
+                num_epochs[stopped] = iter_
+                active = active & ~stopped
+                if not active.any():
+                    break
+                with torch.no_grad():
+                    for param, stopped_param in zip(params, stopped_params):
+                        stopped_param[stopped] = param[stopped]
+
+            # the parameters of the stopped folds do not contribute to the loss,
+            # but Adam keeps moving them with its momentum, restore them
+            (train_loss * active).sum().backward()
+            optimizer.step()
+            if not active.all():
+                with torch.no_grad():
+                    for param, stopped_param in zip(params, stopped_params):
+                        param[~active] = stopped_param[~active]
+
+    if len(batch_shape) == 0:
+        return num_epochs.item()
+    return num_epochs.tolist()
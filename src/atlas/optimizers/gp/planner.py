@@ -19,14 +19,19 @@ from botorch.acquisition import (
     qUpperConfidenceBound,
 )
 from botorch.fit import fit_gpytorch_model
-from botorch.models import MixedSingleTaskGP, SingleTaskGP
+from botorch.models import (
+    MixedSingleTaskGP,
+    SingleTaskGP,
+    SingleTaskVariationalGP,
+)
 from botorch.models.kernels.categorical import CategoricalKernel
 from botorch.optim import (
     optimize_acqf,
     optimize_acqf_discrete,
     optimize_acqf_mixed,
 )
-from gpytorch.mlls import ExactMarginalLogLikelihood
+from gpytorch.kernels import ScaleKernel
+from gpytorch.mlls import ExactMarginalLogLikelihood, VariationalELBO
 from olympus import ParameterVector
 from olympus.campaigns import ParameterSpace
 from olympus.planners import AbstractPlanner, CustomPlanner, Planner
@@ -40,6 +45,7 @@ from atlas.optimizers.acqfs import (
     FeasibilityAwareQEI,
     FeasibilityAwareUCB,
     FeasibilityAwareVarainceBased,
+    GeneralOptions,
     LowerConfidenceBound,
     VarianceBased,
     create_available_options,
@@ -54,6 +60,8 @@ from atlas.optimizers.gps import (
     ClassificationGPMatern,
 )
 from atlas.optimizers.params import Parameters
+from atlas.optimizers.samplers import CandidatePool, sample_param_space
+from atlas.optimizers.surrogate_cache import SurrogateCache
 from atlas.optimizers.utils import (
     cat_param_to_feat,
     forward_normalize,
@@ -80,6 +88,18 @@ class BoTorchPlanner(BasePlanner):
             init_design_strategy (str): the inital design strategy, "random" or "sobol"
             vgp_iters (int): number of training iterations for the variational GP
             vgp_lr (float): learning rate for the variational optimization procedure
+            vgp_cv_num_workers (int): number of processes used to train the cross-validation
+                    folds of the classification VGP. By default, the folds are trained together
+                    as a single batched model in the current process
+            candidate_sampler (str): strategy used to draw the candidates which estimate the
+                    extrema of the acquisition function and of the feasibility surrogate, and to
+                    seed the acquisition optimization, "random", "sobol" or "lhs"
+            warm_start_cla (bool): whether to seed the classification VGP with the kernel
+                    hyperparameters and variational parameters fitted at the previous ask() call,
+                    and reuse the number of epochs selected by its last cross-validation
+            cla_cv_refresh_frac (float): with warm_start_cla, the classification VGP is
+                    cross-validated again once the number of observations has grown by more
+                    than this fraction since the last cross-validation
             max_jitter (float):
             cla_threshold (float): classification threshold for the predictions of the
                     feasibilty surrogate
@@ -88,6 +108,46 @@ class BoTorchPlanner(BasePlanner):
             general_parameters (list): list of parameter indices for which we average the objective
                     function over
             is_moo (bool): whether or not we have a multiobjective optimization problem
+            warm_start_reg (bool): whether to seed the hyperparameters of the regression GP
+                    with those fitted at the previous ask() call
+            warm_start_max_iter (int): maximum number of optimizer iterations used to refit
+                    a warm-started regression GP
+            reg_refit_every (int): refit the regression GP hyperparameters every reg_refit_every
+                    asks. In between, the hyperparameters are frozen and the previous model is
+                    conditioned on the new observations (exact regression GP only)
+            surrogate_kind (str): the regression surrogate model, "exact" for an exact GP or
+                    "sparse" for a variational GP with inducing points, which scales to
+                    large numbers of observations
+            num_inducing_points (int): number of inducing points of the sparse regression GP
+            sparse_iters (int): number of training iterations for the sparse regression GP
+            sparse_lr (float): learning rate for the sparse regression GP
+            sparse_batch_size (int): size of the minibatches used to train the sparse
+                    regression GP
+            use_surrogate_cache (bool): whether to cache the fitted surrogate models, such that
+                    repeated asks with identical observations do not retrain them
+            surrogate_cache_dir (str): directory in which the surrogate cache is stored on disk.
+                    Providing a directory enables the surrogate cache
+            share_candidate_pool (bool): whether to draw a single pool of candidates per ask() call,
+                    on which the surrogates are evaluated once to estimate the extrema of the
+                    feasibility surrogate and acquisition function, and from which the starting
+                    points of the acquisition optimization are selected. The pool is only drawn
+                    if one of these steps uses it. Off by default
+            candidate_pool_size (int): number of candidates in the shared pool
+            acqf_mixed_strategy (str): how the gradient acquisition optimizer handles the
+                    combinations of categorical/discrete options on mixed parameter spaces,
+                    "serial" (one optimization per combination) or "batched" (the restarts of
+                    all combinations are optimized jointly in a batched L-BFGS run)
+            acqf_mixed_top_k (int): if provided, only the acqf_mixed_top_k combinations of
+                    categorical/discrete options with the highest acquisition function values
+                    on the initial conditions are fully optimized
+            max_option_space_bytes (int): parameter spaces without continuous parameters whose
+                    enumerated and encoded options take at most this many bytes are enumerated
+                    once, on their first use by the gradient acquisition optimizer, rather than at
+                    each ask() call
+            exact_general_posterior (bool): for the general acquisition function, whether to use
+                    the exact posterior of the average over the general parameter options, or to
+                    approximate it by averaging the means and standard deviations of the options
+                    (default, as in previous versions)
     """
 
     def __init__(
@@ -106,6 +166,10 @@ class BoTorchPlanner(BasePlanner):
         acquisition_optimizer_kind: str = "gradient",  # gradient, genetic
         vgp_iters: int = 2000,
         vgp_lr: float = 0.1,
+        vgp_cv_num_workers: Optional[int] = None,
+        candidate_sampler: str = "random",
+        warm_start_cla: bool = False,
+        cla_cv_refresh_frac: float = 0.2,
         max_jitter: float = 1e-1,
         cla_threshold: float = 0.5,
         known_constraints: Optional[List[Callable]] = None,
@@ -116,6 +180,22 @@ class BoTorchPlanner(BasePlanner):
         moo_params: Dict[str, Union[str, float, int, bool, List]] = {},
         goals: Optional[List[str]] = None,
         golem_config: Optional[Dict[str, Any]] = None,
+        warm_start_reg: bool = False,
+        warm_start_max_iter: int = 50,
+        reg_refit_every: int = 1,
+        surrogate_kind: str = "exact",  # exact, sparse
+        num_inducing_points: int = 128,
+        sparse_iters: int = 300,
+        sparse_lr: float = 0.1,
+        sparse_batch_size: int = 512,
+        use_surrogate_cache: bool = False,
+        surrogate_cache_dir: Optional[str] = None,
+        share_candidate_pool: bool = False,
+        candidate_pool_size: int = 5000,
+        acqf_mixed_strategy: str = "serial",  # serial, batched
+        acqf_mixed_top_k: Optional[int] = None,
+        max_option_space_bytes: int = 50000000,
+        exact_general_posterior: bool = False,
         **kwargs: Any,
     ):
         local_args = {
@@ -123,6 +203,30 @@ class BoTorchPlanner(BasePlanner):
         }
         super().__init__(**local_args)
 
+        self.warm_start_reg = warm_start_reg
+        self.warm_start_max_iter = warm_start_max_iter
+        self.reg_refit_every = reg_refit_every
+        self._reg_asks_since_refit = 0
+        self.surrogate_kind = surrogate_kind
+        self.num_inducing_points = num_inducing_points
+        self.sparse_iters = sparse_iters
+        self.sparse_lr = sparse_lr
+        self.sparse_batch_size = sparse_batch_size
+        self.share_candidate_pool = share_candidate_pool
+        self.candidate_pool_size = candidate_pool_size
+        self.acqf_mixed_strategy = acqf_mixed_strategy
+        self.acqf_mixed_top_k = acqf_mixed_top_k
+        self.exact_general_posterior = exact_general_posterior
+
+        if self.surrogate_kind not in ["exact", "sparse"]:
+            msg = f"Surrogate kind {self.surrogate_kind} not understood"
+            Logger.log(msg, "FATAL")
+
+        if use_surrogate_cache or surrogate_cache_dir is not None:
+            self.surrogate_cache = SurrogateCache(cache_dir=surrogate_cache_dir)
+        else:
+            self.surrogate_cache = None
+
         # check that we are using the 'general' parameter acquisition
         if self.general_parameters is not None:
             if not self.acquisition_type == 'general':
@@ -131,10 +235,13 @@ class BoTorchPlanner(BasePlanner):
 
                 self.acquisition_type = 'general'
 
-    def build_train_regression_gp(
+    def build_regression_gp(
         self, train_x: torch.Tensor, train_y: torch.Tensor
     ) -> gpytorch.models.ExactGP:
-        """Build the regression GP model and likelihood"""
+        """Build the (untrained) regression GP model and likelihood"""
+        if self.surrogate_kind == "sparse":
+            return self.build_sparse_regression_gp(train_x, train_y)
+
         # infer the model based on the parameter types
         if self.problem_type in [
             "fully_continuous",
@@ -161,19 +268,250 @@ class BoTorchPlanner(BasePlanner):
         else:
             raise NotImplementedError
 
-        mll = ExactMarginalLogLikelihood(model.likelihood, model)
+        return model
+
+    def build_sparse_regression_gp(
+        self, train_x: torch.Tensor, train_y: torch.Tensor
+    ) -> SingleTaskVariationalGP:
+        """Build the (untrained) sparse variational regression GP. The inducing
+        points are initialized on a subset of the training inputs
+        """
+        num_inducing_points = min(self.num_inducing_points, train_x.shape[0])
+        if self.problem_type == "fully_categorical" and not self.has_descriptors:
+            # use a Categorical kernel based on the HammingDistance, and keep
+            # the inducing points on the one-hot encoded training inputs
+            covar_module = ScaleKernel(
+                CategoricalKernel(ard_num_dims=train_x.shape[-1])
+            )
+            model = SingleTaskVariationalGP(
+                train_x,
+                train_y,
+                covar_module=covar_module,
+                inducing_points=num_inducing_points,
+                learn_inducing_points=False,
+            )
+        else:
+            # Matern kernel on all other (encoded) parameter spaces
+            model = SingleTaskVariationalGP(
+                train_x,
+                train_y,
+                inducing_points=num_inducing_points,
+            )
+
+        return model
+
+    def train_sparse_regression_gp(
+        self,
+        model: SingleTaskVariationalGP,
+        train_x: torch.Tensor,
+        train_y: torch.Tensor,
+        num_iters: int,
+    ) -> SingleTaskVariationalGP:
+        """Train the sparse variational regression GP by maximizing the ELBO
+        with minibatches of the training data
+        """
+        model.train()
+        optimizer = torch.optim.Adam(model.parameters(), lr=self.sparse_lr)
+        mll = VariationalELBO(
+            model.likelihood, model.model, num_data=train_y.shape[0]
+        )
+        train_y = train_y.squeeze(-1)
+        batch_size = min(self.sparse_batch_size, train_y.shape[0])
+
+        for _ in range(num_iters):
+            batch_ix = torch.randperm(train_y.shape[0])[:batch_size]
+            optimizer.zero_grad()
+            output = model.model(train_x[batch_ix])
+            loss = -mll(output, train_y[batch_ix])
+            loss.backward()
+            optimizer.step()
+
+        model.eval()
+
+        return model
+
+    def build_train_regression_gp(
+        self, train_x: torch.Tensor, train_y: torch.Tensor
+    ) -> gpytorch.models.ExactGP:
+        """Build the regression GP model and likelihood and train the model"""
+        if self._reg_update_only:
+            # hyperparameters are frozen at this iteration, update the
+            # previous model with the current observations instead
+            model = self.update_regression_gp(train_x, train_y)
+            if model is not None:
+                self._reg_asks_since_refit += 1
+                return model
+
+        model = self.build_regression_gp(train_x, train_y)
+
+        fit_kwargs = {}
+        num_iters = self.sparse_iters
+        if self.warm_start_reg and hasattr(self, "reg_model"):
+            # seed the hyperparameters with those of the previous iteration
+            # and cap the number of optimizer iterations
+            if self.load_reg_hyperparams(model, self.reg_model):
+                fit_kwargs["options"] = {"maxiter": self.warm_start_max_iter}
+                num_iters = self.warm_start_max_iter
+
         # fit the GP
         start_time = time.time()
         with gpytorch.settings.cholesky_jitter(self.max_jitter):
-            fit_gpytorch_model(mll)
+            if self.surrogate_kind == "sparse":
+                model = self.train_sparse_regression_gp(
+                    model, train_x, train_y, num_iters
+                )
+            else:
+                mll = ExactMarginalLogLikelihood(model.likelihood, model)
+                fit_gpytorch_model(mll, **fit_kwargs)
         gp_train_time = time.time() - start_time
         Logger.log(
             f"Regression surrogate GP trained in {round(gp_train_time,3)} sec",
             "INFO",
         )
+        self._reg_asks_since_refit = 0
+
+        return model
+
+    def update_regression_gp(
+        self, train_x: torch.Tensor, train_y: torch.Tensor
+    ) -> Optional[gpytorch.models.ExactGP]:
+        """update the previously fitted regression GP with the current training
+        data while keeping its hyperparameters frozen. If the training data of the
+        previous model is a prefix of the current training data, the model is
+        conditioned on the new rows only, which extends the cached Cholesky factor
+        rather than refactorizing the full kernel matrix. Otherwise, the model is
+        rebuilt on the current data with the previous hyperparameters. Returns None
+        if the previous model cannot be reused
+        """
+        prev_x = self.reg_model.train_inputs[0]
+        prev_y = self.reg_model.train_targets
+        num_prev = prev_x.shape[0]
+
+        start_time = time.time()
+        if (
+            num_prev <= train_x.shape[0]
+            and prev_x.shape[-1] == train_x.shape[-1]
+            and torch.allclose(prev_x, train_x[:num_prev])
+            and torch.allclose(prev_y, train_y[:num_prev].squeeze(-1))
+        ):
+            if num_prev == train_x.shape[0]:
+                # no new observations
+                return self.reg_model
+            # the test caches of the previous model need to exist before
+            # conditioning on new observations
+            self.reg_model.eval()
+            with gpytorch.settings.cholesky_jitter(self.max_jitter):
+                self.reg_model.posterior(train_x[:1])
+                model = self.reg_model.condition_on_observations(
+                    train_x[num_prev:], train_y[num_prev:]
+                )
+            update_kind = "conditioned on new observations"
+        else:
+            model = self.build_regression_gp(train_x, train_y)
+            if not self.load_reg_hyperparams(model, self.reg_model):
+                return None
+            model.eval()
+            update_kind = "rebuilt with frozen hyperparameters"
+
+        gp_update_time = time.time() - start_time
+        Logger.log(
+            f"Regression surrogate GP {update_kind} in {round(gp_update_time,3)} sec",
+            "INFO",
+        )
 
         return model
 
+    def get_surrogate_cache_key(self) -> str:
+        """hash the parameter space, the observations, the current training
+        data and the planner configuration into a surrogate cache key
+        """
+        config = {
+            attr: getattr(self, attr, None)
+            for attr in [
+                "goal",
+                "feas_strategy",
+                "feas_param",
+                "use_descriptors",
+                "acquisition_type",
+                "vgp_iters",
+                "vgp_lr",
+                "max_jitter",
+                "general_parameters",
+                "is_moo",
+                "goals",
+                "surrogate_kind",
+                "num_inducing_points",
+                "sparse_iters",
+                "sparse_lr",
+                "sparse_batch_size",
+                "batch_size",
+                "candidate_sampler",
+                "candidate_pool_size",
+                "share_candidate_pool",
+                "exact_general_posterior",
+            ]
+        }
+        return SurrogateCache.hash_key(
+            self.param_space,
+            [
+                self._params,
+                self._values,
+                self.train_x_scaled_cla,
+                self.train_y_scaled_cla,
+                self.train_x_scaled_reg,
+                self.train_y_scaled_reg,
+            ],
+            config,
+        )
+
+    def cache_surrogates(
+        self,
+        cache_key: str,
+        acqf_min_max: Tuple[float, float],
+        use_reg_only: bool,
+    ) -> None:
+        """store the state dicts of the fitted surrogate models, and the
+        quantities derived from them, in the surrogate cache
+        """
+        entry = {
+            "reg_state_dict": deepcopy(self.reg_model.state_dict()),
+            "acqf_min_max": acqf_min_max,
+        }
+        if not use_reg_only:
+            entry.update(
+                {
+                    "cla_state_dict": deepcopy(self.cla_model.state_dict()),
+                    "cla_likelihood_state_dict": deepcopy(
+                        self.cla_likelihood.state_dict()
+                    ),
+                    "cla_surr_min_": self.cla_surr_min_,
+                    "cla_surr_max_": self.cla_surr_max_,
+                    "fca_cutoff": self.fca_cutoff,
+                }
+            )
+        self.surrogate_cache.set(cache_key, entry)
+
+    @staticmethod
+    def load_reg_hyperparams(
+        model: gpytorch.models.ExactGP, prev_model: gpytorch.models.ExactGP
+    ) -> bool:
+        """seed the hyperparameters (lengthscales, outputscale, noise and mean)
+        of a freshly built regression GP with those of a previously fitted one.
+        Returns True if the previous hyperparameters could be loaded, i.e. both
+        models have the same type and matching parameter shapes
+        """
+        if type(model) != type(prev_model):
+            return False
+        state_dict = model.state_dict()
+        prev_state_dict = prev_model.state_dict()
+        for key, val in state_dict.items():
+            if key not in prev_state_dict:
+                return False
+            if prev_state_dict[key].shape != val.shape:
+                return False
+        model.load_state_dict({key: prev_state_dict[key] for key in state_dict})
+        return True
+
     def _ask(self) -> List[ParameterVector]:
         """query the planner for a batch of new parameter points to measure"""
         # if we have all nan values, just continue with initial design
@@ -187,6 +525,14 @@ class BoTorchPlanner(BasePlanner):
             # timings dictionary for analysis
             self.timings_dict = {}
 
+            # the regression GP hyperparameters are refit every reg_refit_every
+            # asks, and frozen in between (exact GPs only)
+            self._reg_update_only = (
+                self.surrogate_kind == "exact"
+                and hasattr(self, "reg_model")
+                and self._reg_asks_since_refit + 1 < self.reg_refit_every
+            )
+
             # use GP surrogate to propose the samples
             # get the scaled parameters and values for both the regression and classification data
             (
@@ -272,36 +618,100 @@ class BoTorchPlanner(BasePlanner):
                     # do nothing at all and use the feasibilty surrogate as the acquisition
                     use_p_feas_only = True
 
-            # builds and fits the regression surrogate model
-            self.reg_model = self.build_train_regression_gp(
-                self.train_x_scaled_reg, self.train_y_scaled_reg
-            )
+            # candidates shared by all surrogate evaluations of this ask, they
+            # are drawn on first use
+            if self.share_candidate_pool:
+                self.candidate_pool = CandidatePool(
+                    self.candidate_pool_size,
+                    self.param_space,
+                    self.has_descriptors,
+                    self.params_obj._mins_x,
+                    self.params_obj._maxs_x,
+                    batch_size=self.batch_size,
+                    # we dont scale the parameters if we have a fully one-hot-encoded representation
+                    normalize=not (
+                        self.problem_type == "fully_categorical"
+                        and not self.has_descriptors
+                    ),
+                    kind=self.candidate_sampler,
+                    rng=self.rng,
+                )
+
+            # look up previously fitted surrogates for the current training data
+            cache_key, cache_entry = None, None
+            if self.surrogate_cache is not None:
+                cache_key = self.get_surrogate_cache_key()
+                cache_entry = self.surrogate_cache.get(cache_key)
+
+            if cache_entry is not None:
+                Logger.log("Loading cached surrogate models", "INFO")
+                self.reg_model = self.build_regression_gp(
+                    self.train_x_scaled_reg, self.train_y_scaled_reg
+                )
+                self.reg_model.load_state_dict(cache_entry["reg_state_dict"])
+                self.reg_model.eval()
+                self._reg_asks_since_refit = 0
+            else:
+                # builds and fits the regression surrogate model
+                self.reg_model = self.build_train_regression_gp(
+                    self.train_x_scaled_reg, self.train_y_scaled_reg
+                )
 
             if (
                 not "naive-" in self.feas_strategy
                 and torch.sum(self.train_y_scaled_cla).item() != 0.0
             ):
-                # build and train the classification surrogate model
-                (
-                    self.cla_model,
-                    self.cla_likelihood,
-                ) = self.build_train_classification_gp(
-                    self.train_x_scaled_cla, self.train_y_scaled_cla
-                )
+                if cache_entry is not None:
+                    self.cla_model = ClassificationGPMatern(
+                        self.train_x_scaled_cla, self.train_y_scaled_cla
+                    )
+                    self.cla_likelihood = (
+                        gpytorch.likelihoods.BernoulliLikelihood()
+                    )
+                    self.cla_model.load_state_dict(
+                        cache_entry["cla_state_dict"]
+                    )
+                    self.cla_likelihood.load_state_dict(
+                        cache_entry["cla_likelihood_state_dict"]
+                    )
+                else:
+                    # build and train the classification surrogate model
+                    (
+                        self.cla_model,
+                        self.cla_likelihood,
+                    ) = self.build_train_classification_gp(
+                        self.train_x_scaled_cla, self.train_y_scaled_cla
+                    )
 
                 self.cla_model.eval()
                 self.cla_likelihood.eval()
 
                 use_reg_only = False
 
-                # estimate the max and min of the cla surrogate
-                (
-                    self.cla_surr_min_,
-                    self.cla_surr_max_,
-                ) = self.get_cla_surr_min_max(num_samples=5000)
-                self.fca_cutoff = (
-                    self.cla_surr_max_ - self.cla_surr_min_
-                ) * self.feas_param + self.cla_surr_min_
+                if cache_entry is not None:
+                    self.cla_surr_min_ = cache_entry["cla_surr_min_"]
+                    self.cla_surr_max_ = cache_entry["cla_surr_max_"]
+                    self.fca_cutoff = cache_entry["fca_cutoff"]
+                else:
+                    # estimate the max and min of the cla surrogate
+                    (
+                        self.cla_surr_min_,
+                        self.cla_surr_max_,
+                    ) = self.get_cla_surr_min_max(num_samples=5000)
+                    self.fca_cutoff = (
+                        self.cla_surr_max_ - self.cla_surr_min_
+                    ) * self.feas_param + self.cla_surr_min_
+
+                if self.candidate_pool is not None:
+                    # the fca constraint on the pool follows from the memoized
+                    # feasibility surrogate predictions
+                    self.candidate_pool.set_constraint_values(
+                        self.fca_constraint,
+                        self.candidate_pool.p_feas(
+                            self.cla_model, self.cla_likelihood
+                        )
+                        - self.fca_cutoff,
+                    )
 
             else:
                 use_reg_only = True
@@ -319,7 +729,15 @@ class BoTorchPlanner(BasePlanner):
                 / self.train_x_scaled_cla.size(0)
             ).item()
             # get the approximate max and min of the acquisition function without the feasibility contribution
-            acqf_min_max = self.get_aqcf_min_max(self.reg_model, f_best_scaled)
+            if cache_entry is not None:
+                acqf_min_max = cache_entry["acqf_min_max"]
+            else:
+                acqf_min_max = self.get_aqcf_min_max(
+                    self.reg_model, f_best_scaled
+                )
+
+            if cache_key is not None and cache_entry is None:
+                self.cache_surrogates(cache_key, acqf_min_max, use_reg_only)
 
             if self.acquisition_type == "ei":
                 if (
@@ -415,6 +833,10 @@ class BoTorchPlanner(BasePlanner):
                 )
 
             elif self.acquisition_type == "general":
+                # encodings of the general parameter options for this ask
+                self.general_options = GeneralOptions(
+                    self.params_obj, self.param_space
+                )
                 self.acqf = FeasibilityAwareGeneral(
                     self.reg_model,
                     self.cla_model,
@@ -429,6 +851,8 @@ class BoTorchPlanner(BasePlanner):
                     acqf_min_max,
                     use_min_filter=self.use_min_filter,
                     use_reg_only=use_reg_only,
+                    exact_posterior=self.exact_general_posterior,
+                    general_options=self.general_options,
                 )
 
             else:
@@ -448,6 +872,11 @@ class BoTorchPlanner(BasePlanner):
                     self.batched_strategy,
                     self.timings_dict,
                     use_reg_only=use_reg_only,
+                    sampler=self.candidate_sampler,
+                    candidate_pool=self.candidate_pool,
+                    mixed_strategy=self.acqf_mixed_strategy,
+                    mixed_top_k=self.acqf_mixed_top_k,
+                    option_space=self.option_space,
                 )
             elif self.acquisition_optimizer_kind == "genetic":
                 acquisition_optimizer = GeneticOptimizer(
@@ -461,6 +890,8 @@ class BoTorchPlanner(BasePlanner):
                     self._params,
                     self.timings_dict,
                     use_reg_only=use_reg_only,
+                    sampler=self.candidate_sampler,
+                    candidate_pool=self.candidate_pool,
                 )
 
             return_params = acquisition_optimizer.optimize()
@@ -526,28 +957,33 @@ class BoTorchPlanner(BasePlanner):
             # TODO is this OK?
             return 0.0, 1.0
 
-        samples, _ = propose_randomly(
-            num_samples,
-            self.param_space,
-            self.has_descriptors,
-        )
-
-        if (
-            self.problem_type == "fully_categorical"
-            and not self.has_descriptors
-        ):
-            # we dont scale the parameters if we have a fully one-hot-encoded representation
-            pass
+        if self.candidate_pool is not None:
+            # candidates shared within this ask, already scaled
+            samples = self.candidate_pool.samples
         else:
-            # scale the parameters
-            samples = forward_normalize(
-                samples, self.params_obj._mins_x, self.params_obj._maxs_x
+            samples, _ = sample_param_space(
+                num_samples,
+                self.param_space,
+                self.has_descriptors,
+                kind=self.candidate_sampler,
+                rng=self.rng,
+                return_torch=True,
             )
 
+            if (
+                self.problem_type == "fully_categorical"
+                and not self.has_descriptors
+            ):
+                # we dont scale the parameters if we have a fully one-hot-encoded representation
+                pass
+            else:
+                # scale the parameters
+                samples = forward_normalize(
+                    samples, self.params_obj._mins_x, self.params_obj._maxs_x
+                )
+
         acqf_vals = acqf(
-            torch.tensor(samples)
-            .view(samples.shape[0], 1, samples.shape[-1])
-            .double()
+            samples.view(samples.shape[0], 1, samples.shape[-1])
         )
 
         if not self.acquisition_type == "ucbv2":
@@ -24,13 +24,17 @@ class ClassificationGPMatern(ApproximateGP):
     likelihood to give the binary class probabilities,
     i.e. prob = BernoulliLikelihood(model(inputs))
     Args:
-            train_x (torch.tensor): 2D tensor with training inputs
+            train_x (torch.tensor): 2D tensor with training inputs, or 3D tensor with
+                a leading batch dimension to train several independent models at once
+            train_y (torch.tensor): training targets
+            batch_shape (torch.Size): batch shape of the model, must match the leading
+                dimensions of train_x
     """
 
-    def __init__(self, train_x, train_y):
+    def __init__(self, train_x, train_y, batch_shape=torch.Size([])):
         self.train_y = train_y
         variational_distribution = CholeskyVariationalDistribution(
-            train_x.size(0)
+            train_x.size(-2), batch_shape=batch_shape
         )
         # using this variational strategy because we use directly the training points
         # as inducing points for the GP
@@ -41,13 +45,15 @@ class ClassificationGPMatern(ApproximateGP):
             learn_inducing_locations=False,
         )
         super(ClassificationGPMatern, self).__init__(variational_strategy)
-        self.mean_module = gpytorch.means.ConstantMean()
+        self.mean_module = gpytorch.means.ConstantMean(batch_shape=batch_shape)
         lambda_=100.
         #scale=1.*np.exp(-train_y.shape[0]/lambda_)
         # self.covar_module = ScaleKernel(MaternKernel(
         #     lengthscale_prior=NormalPrior(loc=0., scale=scale)
         #     ))  # RBFKernel())
-        self.covar_module = ScaleKernel(MaternKernel())
+        self.covar_module = ScaleKernel(
+            MaternKernel(batch_shape=batch_shape), batch_shape=batch_shape
+        )
 
     def forward(self, x):
         mean_x = self.mean_module(x)
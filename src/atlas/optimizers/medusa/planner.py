@@ -2,14 +2,15 @@
 
 import os
 import pickle
+import random
 import sys
 import time
+from concurrent.futures import ProcessPoolExecutor
 from copy import deepcopy
 from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 
 import gpytorch
 import numpy as np
-import itertools
 import olympus
 import torch
 from botorch.acquisition import (
@@ -40,8 +41,12 @@ from atlas import Logger
 from atlas.optimizers.acqfs import (
     MedusaAcquisition,
     create_available_options,
+    generate_X_sns,
+)
+from atlas.optimizers.acquisition_optimizers import (
+    FitnessCache,
+    GeneticGeneralOptimizer,
 )
-from atlas.optimizers.acquisition_optimizers import GeneticGeneralOptimizer
 from atlas.optimizers.base import BasePlanner
 from atlas.optimizers.gps import (
     CategoricalSingleTaskGP,
@@ -49,6 +54,7 @@ from atlas.optimizers.gps import (
 )
 from atlas.optimizers.params import Parameters
 from atlas.optimizers.utils import (
+    ParamEncoder,
     cat_param_to_feat,
     forward_normalize,
     forward_standardize,
@@ -94,6 +100,7 @@ class MedusaPlanner(BasePlanner):
         general_parameters: List[int] = None, # indices of general parameters in param space
         max_Ng: Optional[int] = None,
         use_random_acqf: bool = False, # random sampling acquisition function (for baseline)
+        proposal_num_workers: Optional[int] = None, # processes used to optimize the proposals for each Ng
         **kwargs: Any,
     ):
         local_args = {
@@ -104,6 +111,7 @@ class MedusaPlanner(BasePlanner):
         self.acquisition_type = 'medusa'
         self.max_Ng = max_Ng
         self.use_random_acqf = use_random_acqf
+        self.proposal_num_workers = proposal_num_workers
 
 
         # check that we have some general parameters
@@ -155,6 +163,9 @@ class MedusaPlanner(BasePlanner):
         else:
             self.has_descriptors = False
 
+        # vectorized encoder of the parameters
+        self.param_encoder = ParamEncoder(self.param_space, self.has_descriptors)
+
         # check general parameter config
         if self.general_parameters is not None:
             # check types of general parameters
@@ -204,31 +215,9 @@ class MedusaPlanner(BasePlanner):
         self, train_x: torch.Tensor, train_y: torch.Tensor
     ) -> gpytorch.models.ExactGP:
         """Build the regression GP model and likelihood"""
-        # infer the model based on the parameter types
-        if self.problem_type in [
-            "fully_continuous",
-            "fully_discrete",
-            "mixed_disc_cont",
-        ]:
-            model = SingleTaskGP(train_x, train_y)
-        elif self.problem_type == "fully_categorical":
-            if self.has_descriptors:
-                # we have some descriptors, use the Matern kernel
-                model = SingleTaskGP(train_x, train_y)
-            else:
-                # if we have no descriptors, use a Categorical kernel
-                # based on the HammingDistance
-                model = CategoricalSingleTaskGP(train_x, train_y)
-        elif "mixed_cat_" in self.problem_type:
-            if self.has_descriptors:
-                # we have some descriptors, use the Matern kernel
-                model = SingleTaskGP(train_x, train_y)
-            else:
-                cat_dims = get_cat_dims(self.param_space)
-                model = MixedSingleTaskGP(train_x, train_y, cat_dims=cat_dims)
-
-        else:
-            raise NotImplementedError
+        model = _build_regression_gp(
+            self.problem_type, self.has_descriptors, self.param_space, train_x, train_y,
+        )
 
         mll = ExactMarginalLogLikelihood(model.likelihood, model)
         # fit the GP
@@ -439,47 +428,7 @@ class MedusaPlanner(BasePlanner):
 
     def generate_X_sns(self):
         # generate Cartesian product space of the general parameter options
-        param_options = []
-        for ix in self.params_obj.general_dims:
-            param_options.append(self.param_space[ix].options)
-
-        cart_product = list(itertools.product(*param_options))
-        cart_product = [list(elem) for elem in cart_product]
-
-        X_sns_empty = torch.empty(
-            size=(len(cart_product), self.params_obj.expanded_dims)
-        ).double()
-        general_expanded = []
-        general_raw = []
-        for elem in cart_product:
-            # convert to ohe and add to currently available options
-            ohe, raw = [], []
-            for val, obj in zip(elem, self.param_space):
-                if obj.type == "categorical":
-                    ohe.append(
-                        cat_param_to_feat(
-                            obj, val, self.params_obj.has_descriptors
-                        )
-                    )
-                    raw.append(val)
-                else:
-                    ohe.append([val])
-            general_expanded.append(np.concatenate(ohe))
-            general_raw.append(raw)
-
-        general_expanded = torch.tensor(np.array(general_expanded))
-
-        X_sns_empty[:, self.params_obj.exp_general_mask] = general_expanded
-        # forward normalize
-        X_sns_empty = forward_normalize(
-            X_sns_empty,
-            self.params_obj._mins_x,
-            self.params_obj._maxs_x,
-        )
-        # TODO: careful of the batch size, will need to change this
-        X_sns_empty = torch.unsqueeze(X_sns_empty, 1)
-
-        return X_sns_empty, general_raw
+        return generate_X_sns(self.params_obj, self.param_space)
 
 
     def optimize_proposals(self):
@@ -493,36 +442,192 @@ class MedusaPlanner(BasePlanner):
             len(self.param_space[self.general_parameters[0]].options)
         )+1
 
-        best_proposals = {}
-
-        for Ng in poss_Ngs:
-            proposal_optimizer = GeneticGeneralOptimizer(
-                params_obj=self.params_obj,
-                acquisition_type=self.acquisition_type,
-                acqf=self.acqf,
-                known_constraints=self.known_constraints,
-                batch_size=self.batch_size,
-                feas_strategy=self.feas_strategy,
-                fca_constraint=self.fca_constraint,
-                params=self._params,
-                timings_dict=self.timings_dict,
-                max_Ng=self.max_Ng,
-                func_param_space=self.func_param_space,
-                fix_Ng=Ng,
-                mode='proposal',
-            )
-
-            # TODO: need to somehow fix Ng here???
-            X_func, G = proposal_optimizer.optimize()
+        # the runs for each Ng are seeded independently of the order in which
+        # they are executed, such that serial and parallel runs give the same results
+        seeds = np.random.randint(0, 2**31 - 1, size=len(poss_Ngs))
+
+        optimizer_kwargs = {
+            'params_obj': self.params_obj,
+            'acquisition_type': self.acquisition_type,
+            'batch_size': self.batch_size,
+            'feas_strategy': self.feas_strategy,
+            'params': self._params,
+            'max_Ng': self.max_Ng,
+            'func_param_space': self.func_param_space,
+        }
 
-            # print('='*50)
-            # print('')
-            # print(Ng)
-            # print(X_func)
-            # print(G)
-            # print('')
+        if self.proposal_num_workers is not None and self.proposal_num_workers > 1:
+            # the surrogate model is rebuilt from its state dict once per worker.
+            # The known and FCA constraints are not shipped, the proposal GA does
+            # not evaluate them (fca_constraint is a bound method of the planner,
+            # pickling it would serialize the whole planner)
+            payload = {
+                'problem_type': self.problem_type,
+                'has_descriptors': self.has_descriptors,
+                'param_space': self.param_space,
+                'train_x': self.train_x_scaled_reg,
+                'train_y': self.train_y_scaled_reg,
+                'reg_state_dict': self.reg_model.state_dict(),
+                'X_sns_empty': self.acqf.X_sns_empty,
+                'functional_dims': self.acqf.functional_dims,
+                'maximize': self.acqf.maximize,
+                'beta': self.acqf.beta,
+                'optimizer_kwargs': optimizer_kwargs,
+            }
+            with ProcessPoolExecutor(
+                max_workers=min(self.proposal_num_workers, len(poss_Ngs)),
+                initializer=_init_proposal_worker,
+                initargs=(payload,),
+            ) as executor:
+                results = []
+                for result, timings_dict in executor.map(
+                    _optimize_proposal_worker, poss_Ngs, seeds
+                ):
+                    # timings of the runs are recorded in Ng order, as in serial
+                    self.timings_dict.update(timings_dict)
+                    results.append(result)
+        else:
+            # the fitness values are shared between the runs for each Ng
+            fitness_cache = FitnessCache()
+            results = [
+                _optimize_proposal(
+                    self.acqf, fitness_cache, optimizer_kwargs, Ng, seed,
+                    known_constraints=self.known_constraints,
+                    fca_constraint=self.fca_constraint,
+                    timings_dict=self.timings_dict,
+                )
+                for Ng, seed in zip(poss_Ngs, seeds)
+            ]
 
+        best_proposals = {}
+        for Ng, (X_func, G) in zip(poss_Ngs, results):
             best_proposals[Ng] = {'X_func': X_func, 'G': G}
 
-
-        return best_proposals
\ No newline at end of file
+        return best_proposals
+
+
+def _build_regression_gp(
+    problem_type: str,
+    has_descriptors: bool,
+    param_space: ParameterSpace,
+    train_x: torch.Tensor,
+    train_y: torch.Tensor,
+) -> gpytorch.models.ExactGP:
+    """build the (untrained) regression GP model for the problem type"""
+    # infer the model based on the parameter types
+    if problem_type in [
+        "fully_continuous",
+        "fully_discrete",
+        "mixed_disc_cont",
+    ]:
+        model = SingleTaskGP(train_x, train_y)
+    elif problem_type == "fully_categorical":
+        if has_descriptors:
+            # we have some descriptors, use the Matern kernel
+            model = SingleTaskGP(train_x, train_y)
+        else:
+            # if we have no descriptors, use a Categorical kernel
+            # based on the HammingDistance
+            model = CategoricalSingleTaskGP(train_x, train_y)
+    elif "mixed_cat_" in problem_type:
+        if has_descriptors:
+            # we have some descriptors, use the Matern kernel
+            model = SingleTaskGP(train_x, train_y)
+        else:
+            cat_dims = get_cat_dims(param_space)
+            model = MixedSingleTaskGP(train_x, train_y, cat_dims=cat_dims)
+
+    else:
+        raise NotImplementedError
+
+    return model
+
+
+def _optimize_proposal(
+    acqf: MedusaAcquisition,
+    fitness_cache: FitnessCache,
+    optimizer_kwargs: Dict[str, Any],
+    Ng: int,
+    seed: int,
+    known_constraints: Optional[List[Callable]] = None,
+    fca_constraint: Optional[Callable] = None,
+    timings_dict: Optional[Dict] = None,
+) -> Tuple[Any, List[List[int]]]:
+    """optimize the X_func and G proposal with a fixed number of subsets Ng. The
+    run is seeded with seed, the global random states are restored afterwards
+    """
+    np_state = np.random.get_state()
+    torch_state = torch.get_rng_state()
+    random_state = random.getstate()
+    np.random.seed(seed)
+    torch.manual_seed(seed)
+    # used by the DEAP selection operators
+    random.seed(seed)
+    try:
+        proposal_optimizer = GeneticGeneralOptimizer(
+            acqf=acqf,
+            known_constraints=known_constraints,
+            fca_constraint=fca_constraint,
+            timings_dict=timings_dict if timings_dict is not None else {},
+            fix_Ng=Ng,
+            mode='proposal',
+            fitness_cache=fitness_cache,
+            **optimizer_kwargs,
+        )
+        return proposal_optimizer.optimize()
+    finally:
+        np.random.set_state(np_state)
+        torch.set_rng_state(torch_state)
+        random.setstate(random_state)
+
+
+# state of the proposal optimization worker processes
+_proposal_worker = {}
+
+
+def _init_proposal_worker(payload: Dict[str, Any]) -> None:
+    """rebuild the fitted regression surrogate and the MEDUSA acquisition
+    function once per worker process
+    """
+    # the workers already run in parallel
+    torch.set_num_threads(1)
+
+    reg_model = _build_regression_gp(
+        payload['problem_type'],
+        payload['has_descriptors'],
+        payload['param_space'],
+        payload['train_x'],
+        payload['train_y'],
+    )
+    reg_model.load_state_dict(payload['reg_state_dict'])
+    reg_model.eval()
+
+    _proposal_worker['acqf'] = MedusaAcquisition(
+        reg_model=reg_model,
+        params_obj=payload['optimizer_kwargs']['params_obj'],
+        X_sns_empty=payload['X_sns_empty'],
+        functional_dims=payload['functional_dims'],
+        maximize=payload['maximize'],
+        beta=payload['beta'],
+    )
+    _proposal_worker['optimizer_kwargs'] = payload['optimizer_kwargs']
+    # shared between the runs executed by this worker
+    _proposal_worker['fitness_cache'] = FitnessCache()
+
+
+def _optimize_proposal_worker(
+    Ng: int, seed: int
+) -> Tuple[Tuple[Any, List[List[int]]], Dict]:
+    """optimize the proposal for Ng, returns the timings of the run along with
+    the proposal
+    """
+    timings_dict = {}
+    result = _optimize_proposal(
+        _proposal_worker['acqf'],
+        _proposal_worker['fitness_cache'],
+        _proposal_worker['optimizer_kwargs'],
+        int(Ng),
+        int(seed),
+        timings_dict=timings_dict,
+    )
+    return result, timings_dict
\ No newline at end of file
@@ -67,23 +67,98 @@ class Parameters():
 			self._mins_x = np.amin(self.expanded_raw, axis=0)
 			self._maxs_x = np.amax(self.expanded_raw, axis=0)
 
-			# scale the expanded representation
-			self.expanded_scaled = forward_normalize(self.expanded_raw,self._mins_x,self._maxs_x)
+			self._scale()
 
-			# scale the indexed representation (only the continuous dims)
-			disc_cat_indexed = self.indexed_raw[:,self.disc_dims+self.cat_dims]
-			indexed_masked = self.indexed_raw.copy()
-			indexed_masked[:, self.disc_dims+self.cat_dims] = 1.
+		else:
+			pass
 
-			self.indexed_scaled = forward_normalize(
-				indexed_masked , np.amin(indexed_masked,axis=0), np.amax(indexed_masked,axis=0)
-			)
-			self.indexed_scaled[:, self.disc_dims+self.cat_dims] = disc_cat_indexed
 
+	def _scale(self, num_prev: int = 0) -> None:
+		''' Scale the expanded and indexed representations with the current min/max.
+		If num_prev > 0, only the rows after the num_prev first ones are scaled and
+		appended to the previous scaled representations
+		'''
+		# scale the expanded representation
+		expanded_scaled = forward_normalize(self.expanded_raw[num_prev:],self._mins_x,self._maxs_x)
+
+		# scale the indexed representation (only the continuous dims)
+		indexed_masked = self.indexed_raw[num_prev:].copy()
+		indexed_masked[:, self.disc_dims+self.cat_dims] = 1.
+		if num_prev == 0:
+			self._mins_indexed = np.amin(indexed_masked,axis=0)
+			self._maxs_indexed = np.amax(indexed_masked,axis=0)
+
+		indexed_scaled = forward_normalize(
+			indexed_masked , self._mins_indexed, self._maxs_indexed
+		)
+		indexed_scaled[:, self.disc_dims+self.cat_dims] = self.indexed_raw[num_prev:, self.disc_dims+self.cat_dims]
+
+		if num_prev == 0:
+			self.expanded_scaled = expanded_scaled
+			self.indexed_scaled = indexed_scaled
 			self.bounds = self.get_bounds()
+		else:
+			self.expanded_scaled = np.concatenate([self.expanded_scaled, expanded_scaled])
+			self.indexed_scaled = np.concatenate([self.indexed_scaled, indexed_scaled])
 
+
+	def update(self, observations: Observations) -> bool:
+		''' Update the parameters with the observations appended since the last update.
+		Only the new observations are converted, and the min/max are updated incrementally.
+		The scaled representations are recomputed in full only if the min/max change.
+		Returns False if the observations are not an extension of the current ones (e.g. if
+		any previously seen observation was removed or edited), in which case the Parameters
+		object should be rebuilt
+		'''
+		olympus = observations.get_params()
+		num_prev = len(self.olympus)
+		if len(olympus) < num_prev:
+			return False
+		if num_prev > 0 and not np.array_equal(
+			np.asarray(olympus[:num_prev]).astype(str), np.asarray(self.olympus).astype(str)
+		):
+			# some previously seen observations have changed
+			return False
+		if len(olympus) == num_prev:
+			return True
+
+		new_olympus = olympus[num_prev:]
+		self.olympus = olympus
+		self.param_vectors.extend(
+			[ParameterVector().from_array(sample, self.param_space) for sample in new_olympus]
+		)
+
+		expanded_new, indexed_new = self._get_expanded_indexed(new_olympus)
+		if num_prev == 0:
+			self.expanded_raw, self.indexed_raw = expanded_new, indexed_new
+			self._mins_x = np.amin(self.expanded_raw, axis=0)
+			self._maxs_x = np.amax(self.expanded_raw, axis=0)
+			self._scale()
+			return True
+
+		self.expanded_raw = np.concatenate([self.expanded_raw, expanded_new])
+		self.indexed_raw = np.concatenate([self.indexed_raw, indexed_new])
+
+		# update the running min max
+		mins_x = np.minimum(self._mins_x, np.amin(expanded_new, axis=0))
+		maxs_x = np.maximum(self._maxs_x, np.amax(expanded_new, axis=0))
+		indexed_masked = indexed_new.copy()
+		indexed_masked[:, self.disc_dims+self.cat_dims] = 1.
+		mins_indexed = np.minimum(self._mins_indexed, np.amin(indexed_masked, axis=0))
+		maxs_indexed = np.maximum(self._maxs_indexed, np.amax(indexed_masked, axis=0))
+
+		if (
+			np.array_equal(mins_x, self._mins_x) and np.array_equal(maxs_x, self._maxs_x)
+			and np.array_equal(mins_indexed, self._mins_indexed)
+			and np.array_equal(maxs_indexed, self._maxs_indexed)
+		):
+			# scaling is unchanged, only scale the new observations
+			self._scale(num_prev=num_prev)
 		else:
-			pass
+			self._mins_x, self._maxs_x = mins_x, maxs_x
+			self._scale()
+
+		return True
 
 
 	@property
@@ -157,9 +232,11 @@ class Parameters():
 
 
 
-	def _get_expanded_indexed(self):
+	def _get_expanded_indexed(self, olympus=None):
+		if olympus is None:
+			olympus = self.olympus
 		expanded, indexed = [], []
-		for sample_ix, sample in enumerate(self.olympus):
+		for sample_ix, sample in enumerate(olympus):
 			exp, ind = [], []
 			counter = 0
 			for elem, param in zip(sample, self.param_space):
@@ -145,28 +145,9 @@ class qNEHVIPlanner(BasePlanner):
             params_reg = self._params[feas_ix].reshape(-1, 1)
             train_y_reg = self._values[feas_ix].reshape(-1, 1)
 
-        train_x_cla, train_x_reg = [], []
-
-        # adapt the data from olympus form to torch tensors
-        for ix in range(self._values.shape[0]):
-            sample_x = []
-            for param_ix, (space_true, element) in enumerate(
-                zip(self.param_space, params_cla[ix])
-            ):
-                if self.param_space[param_ix].type == "categorical":
-                    feat = cat_param_to_feat(
-                        space_true,
-                        element,
-                        has_descriptors=self.has_descriptors,
-                    )
-                    sample_x.extend(feat)
-                else:
-                    sample_x.append(float(element))
-            train_x_cla.append(sample_x)
-            if ix in feas_ix:
-                train_x_reg.append(sample_x)
-
-        train_x_cla, train_x_reg = np.array(train_x_cla), np.array(train_x_reg)
+        # adapt the data from olympus form to numerical features
+        train_x_cla = self.param_encoder.encode(params_cla)
+        train_x_reg = train_x_cla[feas_ix]
 
         # if we are using Golem, fit Golem to current regression training data,
         # and replace data with its predictions
@@ -279,13 +260,20 @@ class qNEHVIPlanner(BasePlanner):
         if len(np.array(self._values).shape) == 1:
             self._values = np.array(self._values).reshape(-1, 1)
 
-        # generate Parameters object
-        self.params_obj = Parameters(
-            olympus_param_space=self.param_space,
-            observations=observations,
-            has_descriptors=self.has_descriptors,
-            general_parameters=self.general_parameters,
-        )
+        # generate Parameters object, or update the existing one with the
+        # new observations only
+        if not (
+            hasattr(self, "params_obj")
+            and self.params_obj.param_space is self.param_space
+            and self.params_obj.has_descriptors == self.has_descriptors
+            and self.params_obj.update(observations)
+        ):
+            self.params_obj = Parameters(
+                olympus_param_space=self.param_space,
+                observations=observations,
+                has_descriptors=self.has_descriptors,
+                general_parameters=self.general_parameters,
+            )
 
     def _ask(self) -> List[ParameterVector]:
         """ query the planner for a batch of new parameter points to measure
@@ -514,6 +502,8 @@ class qNEHVIPlanner(BasePlanner):
             num_samples,
             self.param_space,
             self.has_descriptors,
+            rng=self.rng,
+            return_torch=True,
         )
 
         if (
@@ -529,9 +519,7 @@ class qNEHVIPlanner(BasePlanner):
             )
 
         acqf_vals = acqf(
-            torch.tensor(samples)
-            .view(samples.shape[0], 1, samples.shape[-1])
-            .double()
+            samples.view(samples.shape[0], 1, samples.shape[-1])
         )
 
 
@@ -0,0 +1,504 @@
+#!/usr/bin/env python
+
+from typing import Callable, List, Optional, Tuple, Union
+
+import gpytorch
+import numpy as np
+import sobol_seq
+import torch
+from olympus.campaigns import ParameterSpace
+from pyDOE import lhs
+
+from atlas import Logger
+from atlas.optimizers.utils import (
+    ParamEncoder,
+    evaluate_known_constraints,
+    forward_normalize,
+    propose_randomly,
+)
+
+SAMPLER_KINDS = ["random", "sobol", "lhs"]
+
+# maximum dimension supported by the sobol_seq generator
+SOBOL_MAX_DIM = 40
+
+
+def sobol_unit_samples(
+    num_samples: int, dim: int, rng: np.random.Generator
+) -> np.ndarray:
+    """generate a randomly shifted (Cranley-Patterson rotation) Sobol sequence
+    in the unit hypercube
+    """
+    samples = sobol_seq.i4_sobol_generate(dim, num_samples)
+    shift = rng.uniform(size=dim)
+    return np.mod(samples + shift, 1.0)
+
+
+def lhs_unit_samples(
+    num_samples: int, dim: int, rng: np.random.Generator
+) -> np.ndarray:
+    """generate a Latin hypercube design in the unit hypercube"""
+    samples = lhs(dim, samples=num_samples)
+    # decorrelate the design from the global random state
+    return samples[rng.permutation(num_samples)]
+
+
+def unit_to_param_space(
+    unit_samples: np.ndarray,
+    param_space: ParameterSpace,
+    has_descriptors: bool,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """map samples from the unit hypercube, with one dimension per parameter, to the
+    parameter space. Returns the numerical representation of the samples as well as
+    the string based representation for the categorical variables
+    """
+    encoder = ParamEncoder(param_space, has_descriptors)
+
+    proposals, raw_proposals = [], []
+    for param_ix, param in enumerate(param_space):
+        u = unit_samples[:, param_ix]
+        if param.type == "continuous":
+            column = param.low + u * (param.high - param.low)
+            proposals.append(column.reshape(-1, 1))
+            raw_proposals.append(column)
+        else:
+            # split the unit interval evenly between the options
+            num_options = len(param.options)
+            option_ixs = np.minimum(
+                np.floor(u * num_options).astype(int), num_options - 1
+            )
+            if param.type == "discrete":
+                column = np.asarray(param.options, dtype=float)[option_ixs]
+                proposals.append(column.reshape(-1, 1))
+                raw_proposals.append(column)
+            elif param.type == "categorical":
+                proposals.append(encoder.feat_tables[param_ix][option_ixs])
+                raw_proposals.append(
+                    np.asarray(param.options, dtype=object)[option_ixs]
+                )
+
+    proposals = np.concatenate(proposals, axis=1)
+    raw_proposals = np.stack(raw_proposals, axis=1)
+    if any(param.type == "categorical" for param in param_space):
+        raw_proposals = raw_proposals.astype(str)
+    else:
+        raw_proposals = raw_proposals.astype(float)
+
+    return proposals, raw_proposals
+
+
+def sample_param_space(
+    num_samples: int,
+    param_space: ParameterSpace,
+    has_descriptors: bool,
+    kind: str = "random",
+    rng: Optional[np.random.Generator] = None,
+    return_torch: bool = False,
+) -> Tuple[Union[np.ndarray, torch.Tensor], np.ndarray]:
+    """Generate num_samples candidates spread over the parameter space. Has the
+    same outputs as propose_randomly.
+    Args:
+            num_samples (int): the number of samples to generate
+            param_space (obj): Olympus parameter space object
+            has_descriptors (bool): whether to use descriptors as features for the
+                categorical parameters
+            kind (str): the sampling strategy, "random" (uniform), "sobol" (randomly
+                shifted Sobol sequence) or "lhs" (Latin hypercube)
+            rng (np.random.Generator): random number generator
+            return_torch (bool): whether to return the numerical representation of
+                the samples as a (double) torch tensor
+    """
+    if kind not in SAMPLER_KINDS:
+        msg = f"Sampler kind {kind} not understood. Choose from {SAMPLER_KINDS}"
+        Logger.log(msg, "FATAL")
+
+    if kind == "sobol" and len(param_space) > SOBOL_MAX_DIM:
+        msg = f"Sobol sampling supports at most {SOBOL_MAX_DIM} parameters. Resorting to random sampling"
+        Logger.log(msg, "WARNING")
+        kind = "random"
+
+    if kind == "random":
+        return propose_randomly(
+            num_samples,
+            param_space,
+            has_descriptors,
+            rng=rng,
+            return_torch=return_torch,
+        )
+
+    if rng is None:
+        rng = np.random.default_rng(np.random.randint(0, 2**31 - 1))
+
+    if kind == "sobol":
+        unit_samples = sobol_unit_samples(num_samples, len(param_space), rng)
+    elif kind == "lhs":
+        unit_samples = lhs_unit_samples(num_samples, len(param_space), rng)
+
+    proposals, raw_proposals = unit_to_param_space(
+        unit_samples, param_space, has_descriptors
+    )
+
+    if return_torch:
+        proposals = torch.tensor(proposals).double()
+
+    return proposals, raw_proposals
+
+
+class CandidatePool:
+    """Pool of candidates drawn once per ask() call and shared between the
+    estimation of the surrogate/acquisition function extrema and the seeding
+    of the acquisition function optimization. The candidates are only drawn
+    when they are first used. Surrogate and constraint evaluations on the pool
+    are memoized, such that each model is evaluated at most once on the
+    candidates. A new pool should be generated whenever the surrogate models
+    are refit
+
+    Args:
+            num_samples (int): the number of candidates in the pool, rounded up
+                to a multiple of the batch size
+            param_space (obj): Olympus parameter space object
+            has_descriptors (bool): whether to use descriptors as features for the
+                categorical parameters
+            mins_x (np.array): minimum values of each parameter space dimension
+            maxs_x (np.array): maximum values of each parameter space dimension
+            batch_size (int): number of samples recommended per ask/tell call
+            normalize (bool): whether to normalize the candidates with mins_x and maxs_x
+            kind (str): the sampling strategy, "random", "sobol" or "lhs"
+            rng (np.random.Generator): random number generator
+    """
+
+    def __init__(
+        self,
+        num_samples: int,
+        param_space: ParameterSpace,
+        has_descriptors: bool,
+        mins_x: np.ndarray,
+        maxs_x: np.ndarray,
+        batch_size: int = 1,
+        normalize: bool = True,
+        kind: str = "random",
+        rng: Optional[np.random.Generator] = None,
+    ):
+        self.batch_size = batch_size
+        self.num_samples = int(np.ceil(num_samples / batch_size)) * batch_size
+        self.param_space = param_space
+        self.has_descriptors = has_descriptors
+        self.mins_x = mins_x
+        self.maxs_x = maxs_x
+        self.normalize = normalize
+        self.kind = kind
+        self.rng = rng
+
+        self._samples, self._raw_samples = None, None
+        self._p_feas = {}
+        self._constraint_vals = {}
+
+    def _draw(self) -> None:
+        """draw the candidates of the pool"""
+        samples, raw_samples = sample_param_space(
+            self.num_samples,
+            self.param_space,
+            self.has_descriptors,
+            kind=self.kind,
+            rng=self.rng,
+            return_torch=True,
+        )
+        if self.normalize:
+            samples = forward_normalize(samples, self.mins_x, self.maxs_x)
+        if self.batch_size > 1:
+            # consecutive quasi-random samples are strongly anti-correlated,
+            # shuffle them before grouping them in batches
+            rng = self.rng
+            if rng is None:
+                rng = np.random.default_rng(np.random.randint(0, 2**31 - 1))
+            perm = rng.permutation(self.num_samples)
+            samples, raw_samples = samples[perm], raw_samples[perm]
+        self._samples, self._raw_samples = samples, raw_samples
+
+    @property
+    def is_drawn(self) -> bool:
+        """whether the candidates have been drawn"""
+        return self._samples is not None
+
+    @property
+    def samples(self) -> torch.Tensor:
+        """candidates in the (scaled) expanded representation, num_samples x d"""
+        if self._samples is None:
+            self._draw()
+        return self._samples
+
+    @property
+    def raw_samples(self) -> np.ndarray:
+        """string based representation of the candidates"""
+        if self._raw_samples is None:
+            self._draw()
+        return self._raw_samples
+
+    def __len__(self) -> int:
+        return self.num_samples
+
+    @property
+    def batched_samples(self) -> torch.Tensor:
+        """candidates grouped in batches, (num_samples // batch_size) x batch_size x d"""
+        return self.samples.view(
+            -1, self.batch_size, self.samples.shape[-1]
+        )
+
+    @property
+    def batched_raw_samples(self) -> np.ndarray:
+        """string based representation of the first candidate of each batch"""
+        return self.raw_samples[:: self.batch_size]
+
+    def p_feas(
+        self,
+        cla_model: gpytorch.models.ApproximateGP,
+        cla_likelihood: gpytorch.likelihoods.Likelihood,
+    ) -> torch.Tensor:
+        """probability of feasibility predicted by the classification surrogate
+        for each candidate
+        """
+        key = id(cla_model)
+        if key not in self._p_feas:
+            likelihood = cla_likelihood(cla_model(self.samples.float()))
+            # convert p_infeas to p_feas
+            self._p_feas[key] = 1.0 - likelihood.mean.detach()
+        return self._p_feas[key]
+
+    def set_constraint_values(
+        self, constraint: Callable, constraint_vals: torch.Tensor
+    ) -> None:
+        """record the values of a constraint on each candidate, e.g. when they
+        can be derived from a surrogate evaluation that is already memoized
+        """
+        self._constraint_vals[constraint] = (
+            constraint_vals.view(-1, self.batch_size)
+            .amin(dim=1, keepdim=True)
+            .double()
+        )
+
+    def constraint_values(self, constraint: Callable) -> torch.Tensor:
+        """values of constraint for each batch of candidates. A batch is feasible
+        (>= 0) only if all of its candidates are feasible
+        """
+        if constraint not in self._constraint_vals:
+            constraint_vals = constraint(self.batched_samples)
+            self._constraint_vals[constraint] = constraint_vals.reshape(
+                self.batched_samples.shape[0], -1
+            ).amin(dim=1, keepdim=True)
+        return self._constraint_vals[constraint]
+
+
+class InitialDesignSampler:
+    """Constrained initial design engine. Candidates are drawn in large batches
+    from the unit hypercube, mapped to the parameter space and screened with
+    the (vectorized) known constraints, instead of being proposed and checked
+    one at a time. The state of the design is kept across calls to sample, such
+    that consecutive batches of initial design points remain space filling
+
+        - random: uniform samples, survivors are used in the order they are drawn
+        - sobol: randomly shifted Sobol sequence, the survivors are used in sequence
+          order and the sequence index is advanced past the last consumed point
+        - lhs: without known constraints, the points are taken in order from a
+          single Latin hypercube design of num_design points, such that the whole
+          initial design is stratified. Otherwise, Latin hypercube designs are
+          oversampled and the points are picked from the survivors by greedy
+          maximin selection w.r.t. all previously selected points
+
+    Args:
+            param_space (obj): Olympus parameter space object
+            kind (str): the sampling strategy, "random", "sobol" or "lhs"
+            known_constraints (callable or list): known constraint function(s)
+            rng (np.random.Generator): random number generator
+            max_draw_size (int): maximum number of candidates drawn at once
+            max_attempts (int): maximum number of candidates drawn for a single call
+                to sample before giving up
+            num_design (int): number of points of the whole initial design, i.e.
+                the size of the Latin hypercube designs
+    """
+
+    def __init__(
+        self,
+        param_space: ParameterSpace,
+        kind: str = "random",
+        known_constraints: Optional[Union[Callable, List[Callable]]] = None,
+        rng: Optional[np.random.Generator] = None,
+        max_draw_size: int = 100000,
+        max_attempts: int = 10000000,
+        num_design: Optional[int] = None,
+    ):
+        if kind not in SAMPLER_KINDS:
+            msg = f"Initial design strategy {kind} not understood. Choose from {SAMPLER_KINDS}"
+            Logger.log(msg, "FATAL")
+        if kind == "sobol" and len(param_space) > SOBOL_MAX_DIM:
+            msg = f"Sobol sampling supports at most {SOBOL_MAX_DIM} parameters. Resorting to random sampling"
+            Logger.log(msg, "WARNING")
+            kind = "random"
+
+        self.param_space = param_space
+        self.kind = kind
+        self.known_constraints = known_constraints
+        if rng is None:
+            rng = np.random.default_rng(np.random.randint(0, 2**31 - 1))
+        self.rng = rng
+        self.max_draw_size = max_draw_size
+        self.max_attempts = max_attempts
+        self.num_design = num_design
+
+        self.dim = len(param_space)
+        # index of the next point of the Sobol sequence, and the shift which
+        # is shared by all the points of the sequence
+        self.sobol_index = 0
+        self.sobol_shift = self.rng.uniform(size=self.dim)
+        # Latin hypercube design which is consumed in order, and the index of
+        # its next point
+        self.design = None
+        self.design_index = 0
+        # unit hypercube coordinates of the points selected so far
+        self.selected = np.empty((0, self.dim))
+        # running estimate of the fraction of feasible candidates
+        self.num_drawn = 0
+        self.num_feasible = 0
+        # points of spaces without continuous parameters are not repeated,
+        # unless all the options have already been selected
+        if all(param.type != "continuous" for param in param_space):
+            self.num_options = int(
+                np.prod([len(param.options) for param in param_space], dtype=object)
+            )
+        else:
+            self.num_options = None
+        self.seen = set()
+
+    def _draw_unit(self, num_samples: int) -> np.ndarray:
+        if self.kind == "sobol":
+            samples = sobol_seq.i4_sobol_generate(
+                self.dim, num_samples, skip=self.sobol_index
+            )
+            return np.mod(samples + self.sobol_shift, 1.0)
+        elif self.kind == "lhs":
+            return lhs_unit_samples(num_samples, self.dim, self.rng)
+        return self.rng.uniform(size=(num_samples, self.dim))
+
+    def _draw_design(self, num_samples: int) -> np.ndarray:
+        """take the next num_samples points of the Latin hypercube design, a new
+        design is generated once all of its points have been used
+        """
+        unit = []
+        while num_samples > 0:
+            if self.design is None or self.design_index == self.design.shape[0]:
+                num_design = max(self.num_design or num_samples, num_samples)
+                self.design = lhs_unit_samples(num_design, self.dim, self.rng)
+                self.design_index = 0
+            points = self.design[
+                self.design_index : self.design_index + num_samples
+            ]
+            self.design_index += points.shape[0]
+            num_samples -= points.shape[0]
+            unit.append(points)
+        return np.concatenate(unit, axis=0)
+
+    def _draw_size(self, num_needed: int) -> int:
+        if self.known_constraints is None:
+            return num_needed
+        if self.num_feasible == 0:
+            # no estimate of the feasible fraction yet (or a very small one)
+            num_draw = 64 * num_needed * max(1, self.num_drawn // 1024)
+        else:
+            accept = self.num_feasible / self.num_drawn
+            num_draw = int(np.ceil(2.0 * num_needed / accept))
+        if self.kind == "lhs":
+            # leave some room for the maximin selection
+            num_draw = max(num_draw, 32 * num_needed)
+        return int(min(max(num_draw, num_needed), self.max_draw_size))
+
+    def _maximin_select(self, unit: np.ndarray, num_select: int) -> np.ndarray:
+        """greedily select num_select rows of unit, each maximizing its minimum
+        distance to the previously selected points
+        """
+        if unit.shape[0] <= num_select:
+            return np.arange(unit.shape[0])
+        if self.selected.shape[0] > 0:
+            min_dists = np.min(
+                np.linalg.norm(
+                    unit[:, None, :] - self.selected[None, :, :], axis=-1
+                ),
+                axis=1,
+            )
+        else:
+            min_dists = np.full(unit.shape[0], np.inf)
+        ixs = []
+        for _ in range(num_select):
+            if np.all(np.isinf(min_dists)):
+                ix = int(self.rng.integers(unit.shape[0]))
+            else:
+                ix = int(np.argmax(min_dists))
+            ixs.append(ix)
+            min_dists = np.minimum(
+                min_dists, np.linalg.norm(unit - unit[ix], axis=-1)
+            )
+            min_dists[ixs] = -np.inf
+        return np.array(ixs, dtype=int)
+
+    def _drop_duplicates(self, raw: np.ndarray, ixs: np.ndarray) -> np.ndarray:
+        """indices of the first occurrence of each point which has not been selected
+        before
+        """
+        _, first_ixs = np.unique(raw[ixs], axis=0, return_index=True)
+        ixs = ixs[np.sort(first_ixs)]
+        is_new = [tuple(row) not in self.seen for row in raw[ixs]]
+        return ixs[np.array(is_new, dtype=bool)]
+
+    def sample(self, num_samples: int) -> Tuple[np.ndarray, int]:
+        """draw num_samples initial design points which satisfy the known constraints
+        Returns:
+                (np.ndarray): the points in their Olympus representation, num_samples x d
+                (int): the number of candidates consumed to produce the points
+        """
+        raw_samples = []
+        num_found, num_attempted = 0, 0
+        while num_found < num_samples:
+            if num_attempted >= self.max_attempts:
+                msg = f"Could not find {num_samples} initial design points satisfying the known constraints in {num_attempted} attempts"
+                Logger.log(msg, "FATAL")
+            num_needed = num_samples - num_found
+            use_design = self.kind == "lhs" and self.known_constraints is None
+            if use_design:
+                num_draw = num_needed
+                unit = self._draw_design(num_draw)
+            else:
+                num_draw = self._draw_size(num_needed)
+                unit = self._draw_unit(num_draw)
+            _, raw = unit_to_param_space(unit, self.param_space, False)
+            feas_ixs = np.where(
+                evaluate_known_constraints(
+                    self.known_constraints, raw, self.param_space
+                )
+            )[0]
+            self.num_drawn += num_draw
+            self.num_feasible += feas_ixs.shape[0]
+
+            if self.num_options is not None and len(self.seen) < self.num_options:
+                feas_ixs = self._drop_duplicates(raw, feas_ixs)
+
+            if self.kind == "lhs" and not use_design:
+                sel_ixs = feas_ixs[
+                    self._maximin_select(unit[feas_ixs], num_needed)
+                ]
+                num_consumed = num_draw
+            else:
+                sel_ixs = feas_ixs[:num_needed]
+                if sel_ixs.shape[0] == num_needed:
+                    # the remaining candidates are drawn again in the next call
+                    num_consumed = sel_ixs[-1] + 1
+                else:
+                    num_consumed = num_draw
+                if self.kind == "sobol":
+                    self.sobol_index += num_consumed
+
+            self.selected = np.concatenate([self.selected, unit[sel_ixs]])
+            if self.num_options is not None:
+                self.seen.update(tuple(row) for row in raw[sel_ixs])
+            raw_samples.append(raw[sel_ixs])
+            num_found += sel_ixs.shape[0]
+            num_attempted += int(num_consumed)
+
+        return np.concatenate(raw_samples, axis=0), num_attempted
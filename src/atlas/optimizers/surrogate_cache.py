@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+
+import hashlib
+import os
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import torch
+from olympus.campaigns import ParameterSpace
+
+from atlas import Logger
+
+
+class SurrogateCache:
+    """Cache of fitted surrogate models, keyed by a hash of the parameter space,
+    the observations and the planner configuration. Each entry stores the state
+    dicts of the fitted regression and classification surrogates, along with
+    the quantities derived from them (feasibility cutoff, acquisition function
+    min/max), such that a planner queried twice with identical observations
+    does not need to retrain its surrogates.
+
+    Entries are kept in memory (least recently used entries are evicted) and,
+    if cache_dir is provided, also written to disk so they survive restarts
+    and can be shared by several planners working on the same campaign
+
+    Args:
+            cache_dir (str): directory in which the entries are stored on disk
+            max_entries (int): maximum number of entries kept in memory
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None, max_entries: int = 16):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+
+        if self.cache_dir is not None:
+            os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def hash_key(
+        param_space: ParameterSpace,
+        observations: List[np.ndarray],
+        config: Dict[str, Any],
+    ) -> str:
+        """compute the cache key from the parameter space, the observations
+        (arrays of parameters and values, or any derived training tensors)
+        and the planner configuration
+        """
+        hasher = hashlib.sha256()
+        for param in param_space:
+            param_attrs = [
+                getattr(param, attr, None)
+                for attr in ["name", "type", "low", "high", "options", "descriptors"]
+            ]
+            hasher.update(repr(param_attrs).encode())
+        for arr in observations:
+            if isinstance(arr, torch.Tensor):
+                arr = arr.detach().cpu().numpy()
+            arr = np.asarray(arr)
+            if arr.dtype == object:
+                arr = arr.astype(str)
+            hasher.update(repr(arr.shape).encode())
+            hasher.update(np.ascontiguousarray(arr).tobytes())
+        hasher.update(repr(sorted(config.items())).encode())
+        return hasher.hexdigest()
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.pt")
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """return the cache entry for key, or None in case of a miss"""
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+        if self.cache_dir is not None and os.path.isfile(self._entry_path(key)):
+            try:
+                entry = torch.load(self._entry_path(key))
+            except Exception as e:
+                Logger.log(f"Could not load cached surrogates: {e}", "WARNING")
+                return None
+            self._store(key, entry)
+            return entry
+
+        return None
+
+    def set(self, key: str, entry: Dict[str, Any]) -> None:
+        """add an entry to the cache"""
+        self._store(key, entry)
+        if self.cache_dir is not None:
+            # write to a temporary file first so that concurrent readers
+            # never see a partially written entry
+            tmp_path = f"{self._entry_path(key)}.{os.getpid()}.tmp"
+            torch.save(entry, tmp_path)
+            os.replace(tmp_path, self._entry_path(key))
+
+    def _store(self, key: str, entry: Dict[str, Any]) -> None:
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """remove all entries held in memory"""
+        self._entries.clear()
@@ -4,6 +4,7 @@ import itertools
 from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 
 import numpy as np
+import pandas as pd
 import torch
 from olympus.campaigns import ParameterSpace
 from olympus.objects import (
@@ -13,6 +14,8 @@ from olympus.objects import (
     ParameterVector,
 )
 
+from atlas import Logger
+
 
 def infer_problem_type(param_space: ParameterSpace) -> str:
     """infer the parameter space from Olympus. The three possibilities are
@@ -149,42 +152,200 @@ def cat_param_to_feat(
     return feat
 
 
+class ParamEncoder:
+    """vectorized encoder which converts arrays of parameters in their Olympus
+    representation (categorical options encoded as strings) to their numerical
+    representation (one-hot encodings or descriptors for categorical parameters).
+    The option to index maps and the feature lookup tables of the categorical
+    parameters are computed once, such that a whole array of parameters is encoded
+    with a few numpy operations
+    Args:
+            param_space (obj): Olympus parameter space object
+            has_descriptors (bool): whether to use descriptors as features for the
+                categorical parameters
+    """
+
+    def __init__(self, param_space: ParameterSpace, has_descriptors: bool):
+        self.param_space = param_space
+        self.has_descriptors = has_descriptors
+
+        self.option_to_index = []
+        self.feat_tables = []
+        for param in self.param_space:
+            if param.type == "categorical":
+                self.option_to_index.append(
+                    {str(option): ix for ix, option in enumerate(param.options)}
+                )
+                if not self.has_descriptors:
+                    table = np.eye(len(param.options))
+                else:
+                    table = np.array(param.descriptors, dtype=float)
+                self.feat_tables.append(table)
+            else:
+                self.option_to_index.append(None)
+                self.feat_tables.append(None)
+
+        self.num_feats = sum(
+            1 if table is None else table.shape[1] for table in self.feat_tables
+        )
+
+    def option_indices(self, param_ix: int, column: np.ndarray) -> np.ndarray:
+        """get the indices of the categorical options in column"""
+        uniques, inverse = np.unique(column.astype(str), return_inverse=True)
+        try:
+            unique_ixs = np.array(
+                [self.option_to_index[param_ix][val] for val in uniques],
+                dtype=int,
+            )
+        except KeyError as e:
+            raise ValueError(
+                f"{e.args[0]} is not an option of parameter {self.param_space[param_ix].name}"
+            )
+        return unique_ixs[inverse]
+
+    def encode(self, X: Union[np.ndarray, List]) -> np.ndarray:
+        """encode a 2d array (or nested list) of parameters
+        Args:
+                X (np.ndarray): array of parameters with shape (num_samples, num_params)
+        Returns:
+                (np.ndarray): encoded parameters with shape (num_samples, num_feats)
+        """
+        X = np.asarray(X, dtype=object).reshape(-1, len(self.feat_tables))
+        feats = []
+        for param_ix, table in enumerate(self.feat_tables):
+            column = X[:, param_ix]
+            if table is None:
+                feats.append(column.astype(float).reshape(-1, 1))
+            else:
+                feats.append(table[self.option_indices(param_ix, column)])
+        if len(feats) == 0:
+            return np.zeros((X.shape[0], 0))
+        return np.concatenate(feats, axis=1)
+
+
+def batched_constraint(
+    func: Optional[Callable] = None, as_dataframe: bool = False
+) -> Callable:
+    """mark a known constraint as batched. Batched constraints are called once
+    with all the parameters to check, as a 2d array with one row per sample
+    (or a pandas DataFrame with the parameter names as columns if as_dataframe
+    is True), and return a boolean mask with one entry per sample
+    (True-->feasible, False-->infeasible). Can be used as @batched_constraint
+    or @batched_constraint(as_dataframe=True)
+    """
+
+    def decorator(f: Callable) -> Callable:
+        f.is_batched = True
+        f.as_dataframe = as_dataframe
+        return f
+
+    if func is None:
+        return decorator
+    return decorator(func)
+
+
+def evaluate_known_constraints(
+    known_constraints: Union[Callable, List[Callable]],
+    params: Union[np.ndarray, List],
+    param_space: ParameterSpace,
+) -> np.ndarray:
+    """evaluate the known constraints on a 2d array of parameters in their Olympus
+    representation. Batched constraints (see batched_constraint) are evaluated
+    once on all the samples, other constraints on each sample separately
+    Returns:
+            (np.ndarray): boolean mask of the samples which satisfy all the constraints
+    """
+    params = np.asarray(params)
+    if params.ndim == 1:
+        params = params.reshape(1, -1)
+    mask = np.ones(params.shape[0], dtype=bool)
+    if known_constraints is None or params.shape[0] == 0:
+        return mask
+    if callable(known_constraints):
+        known_constraints = [known_constraints]
+
+    for kc in known_constraints:
+        if getattr(kc, "is_batched", False):
+            if getattr(kc, "as_dataframe", False):
+                kc_input = pd.DataFrame(
+                    params, columns=[param.name for param in param_space]
+                )
+            else:
+                kc_input = params
+            kc_mask = np.asarray(kc(kc_input), dtype=bool).reshape(-1)
+            if kc_mask.shape[0] != params.shape[0]:
+                msg = f"Batched known constraint returned {kc_mask.shape[0]} values for {params.shape[0]} samples"
+                Logger.log(msg, "FATAL")
+        else:
+            # only check the samples which are still feasible
+            kc_mask = np.zeros(params.shape[0], dtype=bool)
+            for ix in np.where(mask)[0]:
+                kc_mask[ix] = bool(kc(params[ix]))
+        mask &= kc_mask
+
+    return mask
+
+
 def propose_randomly(
     num_proposals: int,
     param_space: ParameterSpace,
     has_descriptors: bool,
-) -> Tuple[np.ndarray, np.ndarray]:
+    rng: Optional[np.random.Generator] = None,
+    return_torch: bool = False,
+) -> Tuple[Union[np.ndarray, torch.Tensor], np.ndarray]:
     """Randomly generate num_proposals proposals. Returns the numerical
     representation of the proposals as well as the string based representation
-    for the categorical variables
+    for the categorical variables. The proposals are drawn column-wise, i.e. all
+    the values of a parameter are sampled at once, and the categorical options
+    are expanded to their features using lookup tables
     Args:
             num_proposals (int): the number of random proposals to generate
+            param_space (obj): Olympus parameter space object
+            has_descriptors (bool): whether to use descriptors as features for the
+                categorical parameters
+            rng (np.random.Generator): random number generator. If not provided, a
+                generator is seeded from the global numpy random state
+            return_torch (bool): whether to return the numerical representation of
+                the proposals as a (double) torch tensor
     """
-    proposals = []
-    raw_proposals = []
-    for propsal_ix in range(num_proposals):
-        sample = []
-        raw_sample = []
-        for param_ix, param in enumerate(param_space):
-            if param.type == "continuous":
-                p = np.random.uniform(param.low, param.high, size=None)
-                sample.append(p)
-                raw_sample.append(p)
-            elif param.type == "discrete":
-                options = param.options
-                p = np.random.choice(options, size=None, replace=False)
-                sample.append(p)
-                raw_sample.append(p)
-            elif param.type == "categorical":
-                options = param.options
-                p = np.random.choice(options, size=None, replace=False)
-                feat = cat_param_to_feat(param, p, has_descriptors)
-                sample.extend(feat)  # extend because feat is vector
-                raw_sample.append(p)
-        proposals.append(sample)
-        raw_proposals.append(raw_sample)
-    proposals = np.array(proposals)
-    raw_proposals = np.array(raw_proposals)
+    if rng is None:
+        rng = np.random.default_rng(np.random.randint(0, 2**31 - 1))
+
+    encoder = ParamEncoder(param_space, has_descriptors)
+
+    # draw all the continuous parameters at once
+    cont_ixs = [ix for ix, param in enumerate(param_space) if param.type == "continuous"]
+    cont_samples = rng.uniform(
+        [param_space[ix].low for ix in cont_ixs],
+        [param_space[ix].high for ix in cont_ixs],
+        size=(num_proposals, len(cont_ixs)),
+    )
+
+    proposals, raw_proposals = [], []
+    for param_ix, param in enumerate(param_space):
+        if param.type == "continuous":
+            column = cont_samples[:, cont_ixs.index(param_ix)]
+            proposals.append(column.reshape(-1, 1))
+            raw_proposals.append(column)
+        elif param.type == "discrete":
+            option_ixs = rng.integers(len(param.options), size=num_proposals)
+            column = np.asarray(param.options, dtype=float)[option_ixs]
+            proposals.append(column.reshape(-1, 1))
+            raw_proposals.append(column)
+        elif param.type == "categorical":
+            option_ixs = rng.integers(len(param.options), size=num_proposals)
+            proposals.append(encoder.feat_tables[param_ix][option_ixs])
+            raw_proposals.append(np.asarray(param.options, dtype=object)[option_ixs])
+
+    proposals = np.concatenate(proposals, axis=1)
+    raw_proposals = np.stack(raw_proposals, axis=1)
+    if any(param.type == "categorical" for param in param_space):
+        raw_proposals = raw_proposals.astype(str)
+    else:
+        raw_proposals = raw_proposals.astype(float)
+
+    if return_torch:
+        proposals = torch.tensor(proposals).double()
 
     return proposals, raw_proposals
 
@@ -297,6 +458,131 @@ def gen_partitions(S):
     return [p for _, p in enumerate(partition(S),1)]
 
 
+class PartitionSampler:
+    """Sample set partitions of S uniformly at random without enumerating them.
+    Partitions are encoded as restricted growth strings (the block index of each
+    element of S, with blocks numbered in order of their first element), which
+    are ranked lexicographically. The rank of a partition is an integer in
+    [0, num_partitions) which can be used to hash and deduplicate partitions.
+    Partitions are returned in the format of gen_partitions, i.e. a list of blocks
+    ordered by their first element
+
+    Args:
+            S (list): list of non-functional parameters S
+            num_blocks (int): if provided, only the partitions with exactly num_blocks
+                blocks (subsets) are considered
+    """
+
+    def __init__(self, S: List[Any], num_blocks: Optional[int] = None):
+        self.S = list(S)
+        self.num_blocks = num_blocks
+        self.pos = {elem: ix for ix, elem in enumerate(self.S)}
+        self._counts = self._count_completions()
+
+    def _count_completions(self) -> List[List[int]]:
+        """counts[i][m]: number of ways to assign elements i,...,n-1 when m blocks
+        are already in use (Bell / Stirling numbers of the second kind)
+        """
+        n = len(self.S)
+        max_blocks = n if self.num_blocks is None else self.num_blocks
+        counts = [[0] * (n + 2) for _ in range(n + 1)]
+        for m in range(n + 2):
+            if self.num_blocks is None:
+                counts[n][m] = 1
+            else:
+                counts[n][m] = int(m == self.num_blocks)
+        for i in range(n - 1, -1, -1):
+            for m in range(min(i, max_blocks) + 1):
+                counts[i][m] = m * counts[i + 1][m]
+                if m < max_blocks:
+                    counts[i][m] += counts[i + 1][m + 1]
+        return counts
+
+    @property
+    def num_partitions(self) -> int:
+        if len(self.S) == 0:
+            return 0
+        return self._counts[0][0]
+
+    def rank(self, G: List[List[Any]]) -> int:
+        """rank of the partition G"""
+        rgs = [0] * len(self.S)
+        for block in G:
+            block_ix = min(self.pos[elem] for elem in block)
+            for elem in block:
+                rgs[self.pos[elem]] = block_ix
+        r, m, block_ixs = 0, 0, {}
+        for i, first_ix in enumerate(rgs):
+            if first_ix not in block_ixs:
+                block_ixs[first_ix] = m
+            a = block_ixs[first_ix]
+            # every choice smaller than a precedes the partition
+            r += min(a, m) * self._counts[i + 1][m]
+            if a == m:
+                m += 1
+        return r
+
+    def unrank(self, r: int) -> List[List[Any]]:
+        """partition with rank r"""
+        if not 0 <= r < self.num_partitions:
+            msg = f"Partition rank {r} out of range [0, {self.num_partitions})"
+            Logger.log(msg, "FATAL")
+        G, m = [], 0
+        for i, elem in enumerate(self.S):
+            num_existing = m * self._counts[i + 1][m]
+            if r < num_existing:
+                a, r = divmod(r, self._counts[i + 1][m])
+                G[a].append(elem)
+            else:
+                r -= num_existing
+                G.append([elem])
+                m += 1
+        return G
+
+    def _random_rank(self, rng: np.random.Generator) -> int:
+        """uniform random integer in [0, num_partitions), exact for arbitrarily
+        large numbers of partitions
+        """
+        num_bits = (self.num_partitions - 1).bit_length()
+        num_bytes = max(1, (num_bits + 7) // 8)
+        while True:
+            r = int.from_bytes(rng.bytes(num_bytes), "little")
+            r >>= 8 * num_bytes - num_bits
+            if r < self.num_partitions:
+                return r
+
+    def sample_ranks(
+        self, num_samples: int, rng: Optional[np.random.Generator] = None
+    ) -> List[int]:
+        """draw the ranks of min(num_samples, num_partitions) distinct partitions
+        uniformly at random
+        """
+        if rng is None:
+            rng = np.random.default_rng(np.random.randint(0, 2**31 - 1))
+        num_samples = min(num_samples, self.num_partitions)
+        if 4 * num_samples >= self.num_partitions:
+            # small number of partitions, sample without replacement directly
+            return [
+                int(r)
+                for r in rng.permutation(self.num_partitions)[:num_samples]
+            ]
+        ranks, seen = [], set()
+        while len(ranks) < num_samples:
+            r = self._random_rank(rng)
+            if r not in seen:
+                seen.add(r)
+                ranks.append(r)
+        return ranks
+
+    def sample(
+        self, num_samples: int, rng: Optional[np.random.Generator] = None
+    ) -> List[List[List[Any]]]:
+        """draw min(num_samples, num_partitions) distinct partitions uniformly
+        at random
+        """
+        return [self.unrank(r) for r in self.sample_ranks(num_samples, rng)]
+
+
 class Scaler:
 
     SUPP_TYPES = ["standardization", "normalization", "identity"]
@@ -0,0 +1,351 @@
+#!/usr/bin/env python
+
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+import torch
+from botorch.acquisition import UpperConfidenceBound
+from botorch.models import SingleTaskGP
+from olympus.campaigns import ParameterSpace
+from olympus.objects import (
+    ParameterCategorical,
+    ParameterContinuous,
+    ParameterDiscrete,
+)
+
+from atlas.optimizers.acqfs import MedusaAcquisition
+from atlas.optimizers.acquisition_optimizers.genetic_general_optimizer import (
+    FitnessCache,
+    GeneticGeneralOptimizer,
+)
+from atlas.optimizers.acquisition_optimizers.genetic_optimizer import (
+    GeneticOptimizer,
+)
+from atlas.optimizers.utils import (
+    ParamEncoder,
+    batched_constraint,
+    cat_param_to_feat,
+    evaluate_known_constraints,
+)
+
+
+def mixed_param_space():
+    param_space = ParameterSpace()
+    param_space.add(ParameterContinuous(name="param_0", low=0.0, high=1.0))
+    param_space.add(
+        ParameterCategorical(
+            name="param_1",
+            options=["x0", "x1", "x2"],
+            descriptors=[[0.0, 1.0], [1.0, 0.0], [0.5, 0.5]],
+        )
+    )
+    param_space.add(
+        ParameterDiscrete(name="param_2", options=[0.0, 0.25, 0.5, 1.0])
+    )
+    return param_space
+
+
+def random_individuals(param_space, num_individuals):
+    """individuals with the categorical and discrete parameters represented by
+    the indices of their options
+    """
+    columns = []
+    for param in param_space:
+        if param.type == "continuous":
+            columns.append(np.random.uniform(size=num_individuals))
+        else:
+            columns.append(
+                np.random.randint(len(param.options), size=num_individuals)
+            )
+    return np.stack(columns, axis=1).astype(float)
+
+
+def genetic_optimizer(param_space, has_descriptors, acqf):
+    optimizer = GeneticOptimizer.__new__(GeneticOptimizer)
+    optimizer.param_space = param_space
+    optimizer.has_descriptors = has_descriptors
+    optimizer.param_encoder = ParamEncoder(param_space, has_descriptors)
+    optimizer._fitness_cache = {}
+    optimizer.acqf = acqf
+    return optimizer
+
+
+def deindexify_reference(param_space, has_descriptors, x):
+    # per-individual conversion to the expanded representation
+    samples = []
+    for x_ in x:
+        sample = []
+        for elem, param in zip(x_, param_space):
+            if param.type == "continuous":
+                sample.append(float(elem))
+            elif param.type == "discrete":
+                sample.append(float(param.options[int(elem)]))
+            elif param.type == "categorical":
+                sample.extend(
+                    cat_param_to_feat(
+                        param, param.options[int(elem)], has_descriptors
+                    )
+                )
+        samples.append(sample)
+    return np.array(samples)
+
+
+@pytest.mark.parametrize("has_descriptors", [False, True])
+def test_genetic_batch_acquisition(has_descriptors):
+    np.random.seed(100700)
+    torch.manual_seed(100700)
+    param_space = mixed_param_space()
+    num_feats = ParamEncoder(param_space, has_descriptors).num_feats
+    model = SingleTaskGP(
+        torch.rand(20, num_feats).double(), torch.rand(20, 1).double()
+    )
+    model.eval()
+
+    num_evaluated = []
+
+    class CountingUCB(UpperConfidenceBound):
+        def forward(self, X):
+            num_evaluated.append(X.shape[0])
+            return super().forward(X)
+
+    acqf = CountingUCB(model, beta=0.2)
+    optimizer = genetic_optimizer(param_space, has_descriptors, acqf)
+
+    # population with duplicated individuals
+    population = random_individuals(param_space, 30)
+    population = np.concatenate([population, population[:10]])
+
+    expanded = optimizer.deindexify(population)
+    assert np.allclose(
+        expanded,
+        deindexify_reference(param_space, has_descriptors, population),
+    )
+
+    fitnesses = optimizer.batch_acquisition(population)
+    # each distinct individual is evaluated once
+    assert sum(num_evaluated) == 30
+
+    # reference: one acquisition function call per individual
+    with torch.no_grad():
+        ref_fitnesses = np.array(
+            [-acqf(torch.tensor(x).view(1, 1, -1)).item() for x in expanded]
+        )
+    assert np.allclose(fitnesses, ref_fitnesses)
+    assert np.isclose(optimizer.acquisition(population[0])[0], fitnesses[0])
+
+
+@pytest.mark.parametrize("has_descriptors", [False, True])
+def test_genetic_batched_constraint(has_descriptors):
+    np.random.seed(100700)
+    param_space = mixed_param_space()
+    num_feats = ParamEncoder(param_space, has_descriptors).num_feats
+
+    @batched_constraint
+    def known_constraint(params):
+        params = np.asarray(params, dtype=object)
+        return (params[:, 0].astype(float) > 3.0) & (params[:, 1] != "x1")
+
+    optimizer = genetic_optimizer(param_space, has_descriptors, None)
+    optimizer.nonlinear_inequality_constraints = [known_constraint]
+    # the continuous parameter is measured between 2. and 4., the individuals
+    # of the genetic optimizer carry its scaled value
+    optimizer._mins_x = np.zeros(num_feats)
+    optimizer._maxs_x = np.ones(num_feats)
+    optimizer._mins_x[0], optimizer._maxs_x[0] = 2.0, 4.0
+
+    population = random_individuals(param_space, 50)
+    feasible = optimizer._evaluate_feasibility_batch(population)
+
+    raw_params = []
+    for individual in population:
+        raw_params.append(
+            [
+                2.0 + 2.0 * individual[0],
+                param_space[1].options[int(individual[1])],
+                param_space[2].options[int(individual[2])],
+            ]
+        )
+    ref_feasible = evaluate_known_constraints(
+        [known_constraint], np.array(raw_params, dtype=object), param_space
+    )
+    assert 0 < np.sum(ref_feasible) < len(population)
+    assert np.all(feasible == ref_feasible)
+
+
+def medusa_reference(acqf, X_func, G, mu_only=False):
+    # per-individual evaluation, one posterior per individual
+    all_options = []
+    for X, S in zip(X_func, G):
+        for si in S:
+            opt = acqf.X_sns_empty[si].clone()
+            opt[:, acqf.functional_dims] = torch.tensor(X)
+            all_options.append(opt)
+    all_options = torch.cat(all_options)
+    with torch.no_grad():
+        posterior = acqf.reg_model.posterior(all_options.double())
+    mu_sum = torch.sum(posterior.mean)
+    if not acqf.maximize:
+        mu_sum = -mu_sum
+    if mu_only:
+        return mu_sum
+    sigma_sum = torch.sum(posterior.variance.clamp_min(1e-9).sqrt())
+    return mu_sum + acqf.beta.sqrt() * sigma_sum
+
+
+def medusa_var_reference(acqf, X_funcs, G):
+    # one posterior per option
+    sigmas, all_options = [], []
+    for X, S in zip(X_funcs, G):
+        for si in S:
+            opt = acqf.X_sns_empty[si].clone()
+            opt[:, acqf.functional_dims] = torch.tensor(X)
+            with torch.no_grad():
+                posterior = acqf.reg_model.posterior(opt.double())
+            sigmas.append(posterior.variance.clamp_min(1e-9).sqrt().item())
+            all_options.append([X, si])
+    return all_options[int(np.argmax(sigmas))]
+
+
+@pytest.mark.parametrize("maximize", [False, True])
+def test_medusa_population_acquisition(maximize):
+    np.random.seed(100700)
+    torch.manual_seed(100700)
+    num_si, num_groups, func_dims = 6, 2, 2
+    functional_dims = np.arange(func_dims)
+    model = SingleTaskGP(
+        torch.rand(20, func_dims + 2).double(), torch.rand(20, 1).double()
+    )
+    model.eval()
+
+    # non-functional parameter options, empty functional parameters
+    X_sns_empty = torch.zeros(num_si, 1, func_dims + 2).double()
+    X_sns_empty[:, 0, func_dims:] = torch.rand(num_si, 2).double()
+
+    # only the parameter space of the parameters object is used
+    params_obj = SimpleNamespace(param_space=mixed_param_space())
+    acqf = MedusaAcquisition(
+        model,
+        params_obj,
+        X_sns_empty,
+        functional_dims,
+        maximize=maximize,
+        beta=torch.tensor(0.5),
+    )
+
+    X_funcs, Gs = [], []
+    for _ in range(25):
+        X_funcs.append(np.random.uniform(size=(num_groups, func_dims)))
+        assignment = np.random.randint(num_groups, size=num_si)
+        assignment[:num_groups] = np.arange(num_groups)
+        Gs.append(
+            [list(np.where(assignment == g)[0]) for g in range(num_groups)]
+        )
+
+    values = acqf.evaluate_population(X_funcs, Gs)
+    mu_values = acqf.evaluate_population(X_funcs, Gs, mu_only=True)
+    for ix, (X_func, G) in enumerate(zip(X_funcs, Gs)):
+        ref_value = medusa_reference(acqf, X_func, G)
+        ref_mu_value = medusa_reference(acqf, X_func, G, mu_only=True)
+        assert torch.isclose(values[ix], ref_value)
+        assert torch.isclose(mu_values[ix], ref_mu_value)
+        assert torch.isclose(acqf(X_func, G), ref_value)
+        assert torch.isclose(acqf.run_mu_only(X_func, G), ref_mu_value)
+
+        select_X_func, select_si = acqf.acqf_var(X_func, G, None)
+        ref_X_func, ref_si = medusa_var_reference(acqf, X_func, G)
+        assert np.allclose(select_X_func, ref_X_func)
+        assert select_si == ref_si
+
+
+def func_param_space():
+    param_space = ParameterSpace()
+    param_space.add(ParameterContinuous(name="param_0", low=0.0, high=1.0))
+    param_space.add(ParameterContinuous(name="param_1", low=0.0, high=1.0))
+    return param_space
+
+
+def test_fitness_cache_eviction():
+    cache = FitnessCache(max_entries=2)
+    key_0 = cache.key([[0.1, 0.2]], [[0, 1]])
+    key_1 = cache.key([[0.3, 0.4]], [[0, 1]])
+    key_2 = cache.key([[0.5, 0.6]], [[0, 1]])
+    # equivalent assignments share their key
+    assert cache.key([[0.1, 0.2], [0.3, 0.4]], [[1, 0], [2]]) == cache.key(
+        [[0.3, 0.4], [0.1, 0.2]], [[2], [0, 1]]
+    )
+
+    cache.set(key_0, 0.0)
+    cache.set(key_1, 1.0)
+    # key_0 is the most recently used entry, key_1 is evicted
+    assert cache.get(key_0) == 0.0
+    cache.set(key_2, 2.0)
+    assert cache.get(key_1) is None
+    assert cache.get(key_0) == 0.0
+    assert cache.get(key_2) == 2.0
+    assert cache.hits == 3
+    assert cache.misses == 1
+    assert cache.hit_rate == 0.75
+
+
+def test_fitness_cache_bind():
+    cache = FitnessCache()
+    acqf_0, acqf_1 = object(), object()
+    key = cache.key([[0.1, 0.2]], [[0, 1]])
+
+    cache.bind(acqf_0)
+    cache.set(key, 1.0)
+    assert cache.get(key) == 1.0
+    # binding the same acquisition function again keeps the entries
+    cache.bind(acqf_0)
+    assert cache.get(key) == 1.0
+    assert cache.hits == 2
+
+    # another acquisition function resets the entries and the counters
+    cache.bind(acqf_1)
+    assert cache.hits == 0
+    assert cache.misses == 0
+    assert cache.get(key) is None
+    assert cache.hit_rate == 0.0
+
+
+def test_fitness_cache_hit_rate():
+    num_evaluated = []
+
+    class CountingAcquisition:
+        def evaluate_population(self, X_funcs, Gs):
+            num_evaluated.append(len(Gs))
+            return torch.tensor(
+                [float(np.sum(X_func)) for X_func in X_funcs]
+            ).double()
+
+    optimizer = GeneticGeneralOptimizer.__new__(GeneticGeneralOptimizer)
+    optimizer.func_param_space = func_param_space()
+    optimizer.acqf = CountingAcquisition()
+    optimizer.fitness_cache = FitnessCache()
+    optimizer.fitness_cache.bind(optimizer.acqf)
+
+    individuals = [
+        {"X_func": [[0.1, 0.2], [0.3, 0.4]], "G": [[0, 1], [2]]},
+        {"X_func": [[0.5, 0.6]], "G": [[0, 1, 2]]},
+    ]
+    # duplicates within a population are evaluated once, they are not
+    # counted as cache lookups
+    population = individuals + individuals[:1]
+    fitnesses = optimizer.evaluate_population(population)
+    assert np.allclose(fitnesses, [-1.0, -1.1, -1.0])
+    assert num_evaluated == [2]
+    assert optimizer.fitness_cache.hits == 0
+    assert optimizer.fitness_cache.misses == 2
+
+    # an equivalent assignment of the first individual is cached
+    population = [
+        {"X_func": [[0.3, 0.4], [0.1, 0.2]], "G": [[2], [1, 0]]},
+        {"X_func": [[0.7, 0.8]], "G": [[0, 1, 2]]},
+    ]
+    fitnesses = optimizer.evaluate_population(population)
+    assert np.allclose(fitnesses, [-1.0, -1.5])
+    assert num_evaluated == [2, 1]
+    assert optimizer.fitness_cache.hits == 1
+    assert optimizer.fitness_cache.misses == 3
+    assert optimizer.fitness_cache.hit_rate == 0.25
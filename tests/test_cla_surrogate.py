@@ -0,0 +1,172 @@
+#!/usr/bin/env python
+
+import pytest
+import torch
+
+from atlas.optimizers import base as base_module
+from atlas.optimizers.gp.planner import BoTorchPlanner
+
+
+def feas_data(num_obs=20):
+    torch.manual_seed(100700)
+    train_x = torch.rand(num_obs, 2)
+    train_y = (train_x[:, 0] + train_x[:, 1] > 1.2).float()
+    return train_x, train_y
+
+
+@pytest.mark.parametrize("vgp_cv_num_workers", [None, 3])
+def test_train_vgp_cross_validation(vgp_cv_num_workers):
+    train_x, train_y = feas_data()
+
+    planner = BoTorchPlanner(
+        goal="minimize",
+        feas_strategy="fwa",
+        vgp_iters=100,
+        vgp_cv_num_workers=vgp_cv_num_workers,
+    )
+    model, likelihood = planner.build_train_classification_gp(
+        train_x, train_y
+    )
+    model.eval()
+    likelihood.eval()
+
+    with torch.no_grad():
+        probs = likelihood(model(train_x)).mean
+    assert probs.shape == (train_x.shape[0],)
+    assert torch.all((probs >= 0.0) & (probs <= 1.0))
+
+
+def test_warm_start_cla(monkeypatch):
+    train_x, train_y = feas_data(num_obs=26)
+
+    planner = BoTorchPlanner(
+        goal="minimize",
+        feas_strategy="fwa",
+        vgp_iters=100,
+        warm_start_cla=True,
+        cla_cv_refresh_frac=0.2,
+    )
+
+    # record the cross-validation runs, and the epoch budget and starting
+    # variational parameters of each training on all observations
+    cv_runs, vgp_runs = [], []
+    train_vgp_fold = base_module._train_vgp_fold
+
+    def train_vgp_fold_spy(*args, **kwargs):
+        cv_runs.append(args[0].shape)
+        return train_vgp_fold(*args, **kwargs)
+
+    train_vgp = planner.train_vgp
+
+    def train_vgp_spy(model, likelihood, train_x, train_y, **kwargs):
+        dist = model.variational_strategy._variational_distribution
+        vgp_runs.append(
+            {
+                "num_epochs": kwargs.get("num_epochs"),
+                "variational_mean": dist.variational_mean.detach().clone(),
+                "chol_variational_covar": (
+                    dist.chol_variational_covar.detach().clone()
+                ),
+                "covar_module": {
+                    key: val.detach().clone()
+                    for key, val in model.covar_module.state_dict().items()
+                },
+            }
+        )
+        return train_vgp(model, likelihood, train_x, train_y, **kwargs)
+
+    monkeypatch.setattr(base_module, "_train_vgp_fold", train_vgp_fold_spy)
+    monkeypatch.setattr(planner, "train_vgp", train_vgp_spy)
+
+    planner.cla_model, planner.cla_likelihood = (
+        planner.build_train_classification_gp(train_x[:20], train_y[:20])
+    )
+    planner.cla_model.eval()
+    num_epochs = planner._cla_cv_num_epochs
+    assert planner._cla_cv_num_obs == 20
+    assert len(cv_runs) == 1
+    assert vgp_runs[0]["num_epochs"] is None
+
+    # within cla_cv_refresh_frac of the last cross-validation, the
+    # cross-validated epoch budget is reused
+    planner.build_train_classification_gp(train_x[:24], train_y[:24])
+    assert len(cv_runs) == 1
+    assert vgp_runs[1]["num_epochs"] == num_epochs
+    assert planner._cla_cv_num_epochs == num_epochs
+    assert planner._cla_cv_num_obs == 20
+
+    # the previous inducing points are a prefix of the new training inputs,
+    # their variational distribution is reused and that of the new inducing
+    # points is initialized with the predictive distribution of the previous
+    # model
+    prev_dist = (
+        planner.cla_model.variational_strategy._variational_distribution
+    )
+    with torch.no_grad():
+        pred = planner.cla_model(train_x[20:24])
+    seed = vgp_runs[1]
+    assert torch.allclose(
+        seed["variational_mean"][:20], prev_dist.variational_mean
+    )
+    assert torch.allclose(seed["variational_mean"][20:], pred.mean)
+    assert torch.allclose(
+        seed["chol_variational_covar"][:20, :20],
+        prev_dist.chol_variational_covar,
+    )
+    assert torch.allclose(
+        seed["chol_variational_covar"][20:, 20:].diagonal(),
+        pred.variance.clamp_min(1e-6).sqrt(),
+    )
+    prev_covar_module = planner.cla_model.covar_module.state_dict()
+    for key, val in seed["covar_module"].items():
+        assert torch.equal(val, prev_covar_module[key])
+
+    # beyond cla_cv_refresh_frac, the epoch budget is cross-validated again
+    planner.build_train_classification_gp(train_x, train_y)
+    assert len(cv_runs) == 2
+    assert vgp_runs[2]["num_epochs"] is None
+    assert planner._cla_cv_num_obs == 26
+
+
+def test_train_vgp_fold_early_stopping(monkeypatch):
+    torch.manual_seed(100700)
+    num_folds = 3
+    train_x = torch.rand(num_folds, 12, 2)
+    train_y = (train_x.sum(-1) > 1.0).float()
+    valid_x = torch.rand(num_folds, 5, 2)
+    valid_y = (valid_x.sum(-1) > 1.0).float()
+
+    # record the parameters at the start of each iteration
+    params, snapshots = [], []
+
+    zero_grad = torch.optim.Adam.zero_grad
+
+    def zero_grad_spy(self, *args, **kwargs):
+        if not params:
+            for group in self.param_groups:
+                params.extend(group["params"])
+        snapshots.append([param.detach().clone() for param in params])
+        return zero_grad(self, *args, **kwargs)
+
+    monkeypatch.setattr(torch.optim.Adam, "zero_grad", zero_grad_spy)
+
+    num_epochs = base_module._train_vgp_fold(
+        train_x,
+        train_y,
+        valid_x,
+        valid_y,
+        vgp_iters=300,
+        vgp_lr=0.1,
+        max_jitter=1e-1,
+        count_after_iter=5,
+        es_patience=3,
+        batch_shape=torch.Size([num_folds]),
+    )
+    assert len(num_epochs) == num_folds
+    assert min(num_epochs) < max(num_epochs)
+
+    # the folds keep the parameters they had when they were stopped, while
+    # the other folds are still being trained
+    for fold_ix, fold_num_epochs in enumerate(num_epochs):
+        for param, snapshot in zip(params, snapshots[fold_num_epochs]):
+            assert torch.equal(param[fold_ix], snapshot[fold_ix])
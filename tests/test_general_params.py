@@ -277,3 +277,55 @@ if __name__ == '__main__':
     #test_general_cat_moo(batch_size=1, use_descriptors=False)
 
     test_general_cat(batch_size=1, use_descriptors=True)
+
+
+@pytest.mark.parametrize("acquisition_optimizer_kind", ["gradient", "genetic"])
+def test_general_cat_last(acquisition_optimizer_kind):
+    """ single categorical general parameter placed after the functional
+    parameters, the selected general option is indexed by its position among
+    the general parameters
+    """
+    param_space = ParameterSpace()
+
+    # functional parameters
+    param_space.add(ParameterContinuous(name='x_1',low=0.,high=1.))
+    param_space.add(ParameterContinuous(name='x_2',low=0.,high=1.))
+    param_space.add(ParameterContinuous(name='x_3',low=0.,high=1.))
+    # general parameter
+    param_space.add(
+        ParameterCategorical(
+            name='s',
+            options=[str(i) for i in range(3)],
+            descriptors=[[float(i),float(i)] for i in range(3)],
+        )
+    )
+
+    campaign = Campaign()
+    campaign.set_param_space(param_space)
+
+    planner = BoTorchPlanner(
+        goal='minimize',
+        init_design_strategy='random',
+        num_init_design=5,
+        batch_size=1,
+        acquisition_type='general',
+        acquisition_optimizer_kind=acquisition_optimizer_kind,
+        general_parameters=[3],
+    )
+    planner.set_param_space(param_space)
+
+    BUDGET = 5 + 3
+
+    while len(campaign.observations.get_values()) < BUDGET:
+
+        samples = planner.recommend(campaign.observations)
+        for sample in samples:
+            assert sample.s in param_space[3].options
+            measurement = surface_cat(
+                [float(sample.x_1), float(sample.x_2), float(sample.x_3)],
+                sample.s,
+            )
+            campaign.add_observation(sample, measurement)
+
+    assert len(campaign.observations.get_params()) == BUDGET
+    assert len(campaign.observations.get_values()) == BUDGET
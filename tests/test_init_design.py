@@ -134,6 +134,24 @@ def test_init_design_lhs(param_type, batch_size, num_init_design):
 def test_init_design_sobol(param_type, batch_size, num_init_design):
     run_sobol(param_type, batch_size, num_init_design)
 
+@pytest.mark.parametrize("batch_size", [1, 5])
+def test_init_design_lhs_strata(batch_size):
+    num_init_design = 5
+    planner, campaign = set_cont('lhs', batch_size, num_init_design)
+
+    while len(campaign.observations.get_values()) < num_init_design:
+        samples = planner.recommend(campaign.observations)
+        for sample in samples:
+            campaign.add_observation(sample.to_array(), np.random.uniform())
+
+    params_ = campaign.observations.get_params().astype(float)
+    assert params_.shape == (num_init_design, 3)
+    # each stratum of each dimension contains exactly one point, also when
+    # the design is proposed over several batches
+    strata = np.floor(params_ * num_init_design).astype(int)
+    for dim in range(params_.shape[1]):
+        assert np.all(np.sort(strata[:, dim]) == np.arange(num_init_design))
+
 
 
 def run_random(param_type, batch_size, num_init_design):
@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+
+import numpy as np
+import pytest
+import torch
+from olympus.campaigns import Campaign, ParameterSpace
+from olympus.objects import ParameterCategorical, ParameterContinuous
+
+from atlas.optimizers.acqfs import MedusaAcquisition
+from atlas.optimizers.medusa.planner import MedusaPlanner
+
+
+def surface(x, s):
+    if s == "0":
+        return np.sin(x[0]) + 12 * np.cos(x[1])
+    elif s == "1":
+        return 3 * np.sin(x[0]) + 0.01 * np.cos(x[1])
+    elif s == "2":
+        return 5 * np.cos(x[0]) + 2.0 * x[1] ** 3
+
+
+def known_constraint(params):
+    # the proposals must not depend on whether the (unused) constraints are
+    # available in the proposal workers
+    return float(params[1]) + float(params[2]) < 1.5
+
+
+def set_planner(proposal_num_workers):
+    param_space = ParameterSpace()
+    param_space.add(
+        ParameterCategorical(
+            name="s",
+            options=["0", "1", "2"],
+            descriptors=[None, None, None],
+        )
+    )
+    param_space.add(ParameterContinuous(name="x_0", low=0.0, high=1.0))
+    param_space.add(ParameterContinuous(name="x_1", low=0.0, high=1.0))
+
+    planner = MedusaPlanner(
+        goal="minimize",
+        general_parameters=[0],
+        num_init_design=5,
+        use_descriptors=False,
+        known_constraints=[known_constraint],
+        proposal_num_workers=proposal_num_workers,
+        random_seed=100700,
+    )
+    planner.set_param_space(param_space)
+
+    campaign = Campaign()
+    campaign.set_param_space(param_space)
+
+    return planner, campaign
+
+
+def fit_acqf(planner):
+    """fit the regression surrogate and build the MEDUSA acquisition function,
+    as in MedusaPlanner._ask
+    """
+    planner.timings_dict = {}
+    (
+        planner.train_x_scaled_cla,
+        planner.train_y_scaled_cla,
+        planner.train_x_scaled_reg,
+        planner.train_y_scaled_reg,
+    ) = planner.build_train_data()
+    planner.reg_model = planner.build_train_regression_gp(
+        planner.train_x_scaled_reg, planner.train_y_scaled_reg
+    )
+    X_sns_empty, _ = planner.generate_X_sns()
+    planner.acqf = MedusaAcquisition(
+        reg_model=planner.reg_model,
+        params_obj=planner.params_obj,
+        X_sns_empty=X_sns_empty,
+        functional_dims=np.logical_not(planner.params_obj.exp_general_mask),
+    )
+
+
+def test_proposals_serial_parallel():
+    np.random.seed(100700)
+    torch.manual_seed(100700)
+    planner, campaign = set_planner(proposal_num_workers=None)
+
+    while len(campaign.observations.get_values()) < planner.num_init_design:
+        samples = planner.recommend(campaign.observations)
+        for sample in samples:
+            sample_dict = sample.to_dict()
+            measurement = surface(
+                [sample_dict["x_0"], sample_dict["x_1"]], sample_dict["s"]
+            )
+            campaign.add_observation(sample.to_array(), measurement)
+    planner.tell(campaign.observations)
+    fit_acqf(planner)
+
+    proposals = {}
+    for proposal_num_workers in [None, 2]:
+        planner.proposal_num_workers = proposal_num_workers
+        np.random.seed(100700)
+        proposals[proposal_num_workers] = planner.optimize_proposals()
+        # the runs for each Ng do not alter the global random state
+        next_val = np.random.uniform()
+        np.random.seed(100700)
+        np.random.randint(0, 2**31 - 1, size=len(proposals[None]))
+        assert next_val == np.random.uniform()
+
+    assert proposals[None].keys() == proposals[2].keys()
+    for Ng, proposal in proposals[None].items():
+        assert [list(S) for S in proposal["G"]] == [
+            list(S) for S in proposals[2][Ng]["G"]
+        ]
+        assert np.allclose(proposal["X_func"], proposals[2][Ng]["X_func"])
+    assert "acquisition_opt" in planner.timings_dict
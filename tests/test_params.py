@@ -156,6 +156,54 @@ def run_init_parameters_general(
 
 
 
+@pytest.mark.parametrize("problem_type", DESC_TESTS['problem_type'])
+@pytest.mark.parametrize("has_descriptors", DESC_TESTS['has_descriptors'])
+def test_params_update(problem_type, has_descriptors):
+    run_update_parameters(problem_type, has_descriptors)
+
+
+def run_update_parameters(
+    problem_type, has_descriptors,
+):
+    param_space, observations = param_space_factory(problem_type, has_descriptors)
+
+    params = Parameters(
+        olympus_param_space=param_space,
+        observations=observations,
+        has_descriptors=has_descriptors,
+    )
+
+    # add some new observations
+    planner = RandomSearch()
+    planner.set_param_space(param_space)
+    for _ in range(5):
+        sample = planner.recommend(observations)[0]
+        observations.add_observation(sample, np.random.uniform())
+
+    assert params.update(observations)
+
+    new_params = Parameters(
+        olympus_param_space=param_space,
+        observations=observations,
+        has_descriptors=has_descriptors,
+    )
+
+    assert len(params.param_vectors) == len(new_params.param_vectors)
+    for attr in [
+        'expanded_raw', 'indexed_raw', '_mins_x', '_maxs_x',
+        'expanded_scaled', 'indexed_scaled',
+    ]:
+        assert np.allclose(getattr(params, attr), getattr(new_params, attr))
+    assert np.allclose(params.bounds, new_params.bounds)
+
+    # an in-place edit of an earlier observation is not an extension
+    edited = observations.params[-1].copy()
+    if not np.array_equal(edited.astype(str), observations.params[0].astype(str)):
+        observations.params[0] = edited
+        assert not params.update(observations)
+
+
+
 
 
 
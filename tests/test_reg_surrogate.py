@@ -0,0 +1,433 @@
+#!/usr/bin/env python
+
+import gc
+import weakref
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+import torch
+from botorch.fit import fit_gpytorch_model
+from botorch.models import SingleTaskGP
+from gpytorch.kernels import RBFKernel, ScaleKernel
+from olympus.campaigns import Campaign, ParameterSpace
+from olympus.objects import (
+    ParameterCategorical,
+    ParameterContinuous,
+    ParameterDiscrete,
+)
+
+from atlas.optimizers.acqfs import (
+    FeasibilityAwareGeneral,
+    GeneralOptionAverage,
+    GeneralOptions,
+    get_general_option_average,
+)
+from atlas.optimizers.gp import planner as planner_module
+from atlas.optimizers.gp.planner import BoTorchPlanner
+
+
+def surface(x):
+    return np.sin(8 * x[0]) - 2 * np.cos(6 * x[1]) + np.exp(-2.0 * x[2])
+
+
+def cont_param_space():
+    param_space = ParameterSpace()
+    param_0 = ParameterContinuous(name="param_0", low=0.0, high=1.0)
+    param_1 = ParameterContinuous(name="param_1", low=0.0, high=1.0)
+    param_2 = ParameterContinuous(name="param_2", low=0.0, high=1.0)
+    param_space.add(param_0)
+    param_space.add(param_1)
+    param_space.add(param_2)
+    return param_space
+
+
+def run_campaign(planner, param_space, budget):
+    planner.set_param_space(param_space)
+
+    campaign = Campaign()
+    campaign.set_param_space(param_space)
+
+    while len(campaign.observations.get_values()) < budget:
+        samples = planner.recommend(campaign.observations)
+        for sample in samples:
+            sample_arr = sample.to_array()
+            measurement = surface(sample_arr)
+            campaign.add_observation(sample_arr, measurement)
+
+    return campaign
+
+
+def test_warm_start_reg(monkeypatch):
+    param_space = cont_param_space()
+
+    planner = BoTorchPlanner(
+        goal="minimize",
+        feas_strategy="naive-0",
+        init_design_strategy="random",
+        num_init_design=5,
+        batch_size=1,
+        warm_start_reg=True,
+        warm_start_max_iter=20,
+    )
+
+    BUDGET = 10
+    campaign = run_campaign(planner, param_space, BUDGET)
+
+    assert len(campaign.observations.get_values()) == BUDGET
+
+    # record the options and the starting hyperparameters of each fit
+    fits = []
+
+    def fit_spy(mll, **kwargs):
+        state_dict = {
+            key: val.detach().clone()
+            for key, val in mll.model.state_dict().items()
+        }
+        fits.append((kwargs, state_dict))
+        return fit_gpytorch_model(mll, **kwargs)
+
+    monkeypatch.setattr(planner_module, "fit_gpytorch_model", fit_spy)
+
+    # the hyperparameters of the current model seed a new one, and the
+    # number of optimizer iterations is capped
+    prev_state_dict = {
+        key: val.detach().clone()
+        for key, val in planner.reg_model.state_dict().items()
+    }
+    planner.build_train_regression_gp(
+        planner.train_x_scaled_reg, planner.train_y_scaled_reg
+    )
+    assert len(fits) == 1
+    kwargs, state_dict = fits[0]
+    assert kwargs == {"options": {"maxiter": 20}}
+    assert state_dict.keys() == prev_state_dict.keys()
+    for key, val in state_dict.items():
+        assert torch.equal(val, prev_state_dict[key])
+
+    # without warm starting, the fit starts from the default hyperparameters
+    # and is not capped
+    planner.warm_start_reg = False
+    planner.build_train_regression_gp(
+        planner.train_x_scaled_reg, planner.train_y_scaled_reg
+    )
+    assert len(fits) == 2
+    kwargs, state_dict = fits[1]
+    assert kwargs == {}
+    assert not all(
+        torch.equal(val, prev_state_dict[key])
+        for key, val in state_dict.items()
+    )
+
+
+def test_reg_refit_every(monkeypatch):
+    param_space = cont_param_space()
+
+    planner = BoTorchPlanner(
+        goal="minimize",
+        feas_strategy="naive-0",
+        init_design_strategy="random",
+        num_init_design=5,
+        batch_size=1,
+        reg_refit_every=3,
+    )
+
+    # count the hyperparameter fits and the updates with frozen hyperparameters
+    calls = {"fit": 0, "update": 0}
+
+    def fit_spy(mll, **kwargs):
+        calls["fit"] += 1
+        return fit_gpytorch_model(mll, **kwargs)
+
+    update_regression_gp = planner.update_regression_gp
+
+    def update_spy(train_x, train_y):
+        calls["update"] += 1
+        return update_regression_gp(train_x, train_y)
+
+    monkeypatch.setattr(planner_module, "fit_gpytorch_model", fit_spy)
+    monkeypatch.setattr(planner, "update_regression_gp", update_spy)
+
+    BUDGET = 11
+    campaign = run_campaign(planner, param_space, BUDGET)
+
+    assert len(campaign.observations.get_values()) == BUDGET
+    # the surrogate proposes the last 6 samples, its hyperparameters are
+    # refit on the 1st and 4th of those asks and frozen in between
+    assert calls == {"fit": 2, "update": 4}
+    assert planner._reg_asks_since_refit == 2
+
+    # the regression surrogate is trained on all feasible observations
+    assert planner.reg_model.train_inputs[0].shape[0] == BUDGET - 1
+
+    # new observations are added to the frozen model by conditioning on them
+    conditioned = []
+    model_cls = type(planner.reg_model)
+    condition_on_observations = model_cls.condition_on_observations
+
+    def condition_spy(self, X, Y, **kwargs):
+        conditioned.append(X.shape[0])
+        return condition_on_observations(self, X, Y, **kwargs)
+
+    monkeypatch.setattr(model_cls, "condition_on_observations", condition_spy)
+
+    train_x, train_y = planner.train_x_scaled_reg, planner.train_y_scaled_reg
+    torch.manual_seed(100700)
+    new_x = torch.rand(3, train_x.shape[-1], dtype=train_x.dtype)
+    new_y = torch.randn(3, 1, dtype=train_y.dtype)
+    full_x, full_y = torch.cat([train_x, new_x]), torch.cat([train_y, new_y])
+    model = planner.update_regression_gp(full_x, full_y)
+    assert conditioned == [3]
+    assert calls == {"fit": 2, "update": 5}
+
+    # which matches a GP rebuilt on all observations with the same
+    # hyperparameters
+    rebuilt = planner.build_regression_gp(full_x, full_y)
+    assert planner.load_reg_hyperparams(rebuilt, planner.reg_model)
+    rebuilt.eval()
+    test_x = torch.rand(20, train_x.shape[-1], dtype=train_x.dtype)
+    with torch.no_grad():
+        posterior = model.posterior(test_x)
+        ref_posterior = rebuilt.posterior(test_x)
+    assert torch.allclose(posterior.mean, ref_posterior.mean, atol=1e-6)
+    assert torch.allclose(
+        posterior.variance, ref_posterior.variance, atol=1e-6
+    )
+
+
+def test_sparse_reg_surrogate():
+    param_space = cont_param_space()
+
+    planner = BoTorchPlanner(
+        goal="minimize",
+        feas_strategy="naive-0",
+        init_design_strategy="random",
+        num_init_design=5,
+        batch_size=1,
+        surrogate_kind="sparse",
+        num_inducing_points=4,
+        sparse_iters=50,
+    )
+
+    BUDGET = 10
+    campaign = run_campaign(planner, param_space, BUDGET)
+
+    assert len(campaign.observations.get_values()) == BUDGET
+
+    # the number of inducing points is capped by the number of observations
+    inducing_points = planner.reg_model.model.variational_strategy.inducing_points
+    assert inducing_points.shape == (4, 3)
+
+
+@pytest.mark.parametrize("q", [1, 2])
+def test_general_option_average(q):
+    num_options, num_func_dims = 4, 2
+    num_dims = num_options + num_func_dims
+    train_x = torch.rand(20, num_dims).double()
+    train_y = torch.rand(20, 1).double()
+    model = SingleTaskGP(train_x, train_y)
+    model.eval()
+
+    # one-hot encoded general parameter options, shared functional parameters
+    X_sns = torch.zeros(8, num_options, q, num_dims).double()
+    X_sns[..., :num_options] = torch.eye(num_options).double().view(
+        1, num_options, 1, num_options
+    )
+    X_sns[..., num_options:] = torch.rand(8, 1, q, num_func_dims).double()
+
+    option_average = GeneralOptionAverage(model)
+    assert option_average.is_exact_gp
+    mean, var = option_average(X_sns)
+    assert mean.shape == var.shape == (8, q)
+
+    # reference: joint posterior of the options of each point
+    for j in range(q):
+        mvn = model.posterior(X_sns[:, :, j, :]).mvn
+        assert torch.allclose(mean[:, j], mvn.mean.mean(dim=-1))
+        assert torch.allclose(
+            var[:, j], mvn.covariance_matrix.mean(dim=(-1, -2)).clamp_min(1e-9)
+        )
+
+
+@pytest.mark.parametrize("kernel", ["matern", "rbf"])
+def test_general_option_average_cached(kernel):
+    num_options, num_func_dims, q = 4, 2, 2
+    num_dims = num_options + num_func_dims
+    train_x = torch.rand(20, num_dims).double()
+    train_y = torch.rand(20, 1).double()
+    covar_module = None
+    if kernel == "rbf":
+        covar_module = ScaleKernel(RBFKernel(ard_num_dims=num_dims))
+    model = SingleTaskGP(train_x, train_y, covar_module=covar_module)
+    model.eval()
+
+    # stand-in for the GeneralOptions of an ask() call, one-hot encoded options
+    X_sns_empty = torch.zeros(num_options, 1, num_dims).double()
+    X_sns_empty[:, 0, :num_options] = torch.eye(num_options).double()
+    factors = {}
+    general_options = SimpleNamespace(
+        X_sns_empty=X_sns_empty,
+        general_idx=torch.arange(num_options),
+        functional_idx=torch.arange(num_options, num_dims),
+        kernel_factors=lambda reg_model: factors,
+    )
+    X_sns = X_sns_empty.unsqueeze(0).repeat(8, 1, q, 1)
+    X_sns[..., num_options:] = torch.rand(8, 1, q, num_func_dims).double()
+
+    option_average = GeneralOptionAverage(model)
+    assert option_average.is_stationary
+    mean, var = option_average(X_sns, general_options)
+    assert "prior_var" in factors
+    # the Matern kernel over all the dimensions does not factorize
+    assert (factors["cross_general"] is not None) == (kernel == "rbf")
+
+    # same results as without the cached kernel factors
+    ref_mean, ref_var = option_average(X_sns)
+    assert torch.allclose(mean, ref_mean)
+    assert torch.allclose(var, ref_var)
+
+
+@pytest.mark.parametrize("use_descriptors", [False, True])
+def test_general_option_average_planner_model(use_descriptors):
+    # categorical general parameter, continuous functional parameters
+    param_space = ParameterSpace()
+    param_space.add(
+        ParameterCategorical(
+            name="s",
+            options=["0", "1", "2"],
+            descriptors=[[0.0, 1.0], [1.0, 0.0], [0.5, 0.5]],
+        )
+    )
+    param_space.add(ParameterContinuous(name="x_0", low=0.0, high=1.0))
+    param_space.add(ParameterContinuous(name="x_1", low=0.0, high=1.0))
+
+    planner = BoTorchPlanner(
+        goal="minimize",
+        init_design_strategy="random",
+        num_init_design=5,
+        batch_size=1,
+        acquisition_type="general",
+        general_parameters=[0],
+        exact_general_posterior=True,
+        use_descriptors=use_descriptors,
+    )
+    planner.set_param_space(param_space)
+    campaign = Campaign()
+    campaign.set_param_space(param_space)
+    while len(campaign.observations.get_values()) < 6:
+        samples = planner.recommend(campaign.observations)
+        for sample in samples:
+            measurement = surface(
+                [float(sample.x_0), float(sample.x_1), float(sample.s)]
+            )
+            campaign.add_observation(sample, measurement)
+
+    # MixedSingleTaskGP without descriptors, Matern SingleTaskGP otherwise
+    model = planner.reg_model
+    general_options = GeneralOptions(planner.params_obj, param_space)
+    num_dims = general_options.X_sns_empty.shape[-1]
+    X_sns = general_options.expand(torch.rand(8, 2, num_dims).double())
+
+    option_average = GeneralOptionAverage(model)
+    mean, var = option_average(X_sns, general_options)
+    factors = general_options.kernel_factors(model)
+    assert (factors["cross_general"] is not None) == (not use_descriptors)
+
+    # same results as without the cached kernel factors
+    ref_mean, ref_var = option_average(X_sns)
+    assert torch.allclose(mean, ref_mean)
+    assert torch.allclose(var, ref_var)
+
+
+def test_general_option_average_released():
+    model = SingleTaskGP(
+        torch.rand(20, 4).double(), torch.rand(20, 1).double()
+    )
+    model.eval()
+    option_average = get_general_option_average(model)
+    assert get_general_option_average(model) is option_average
+    assert option_average.reg_model is model
+
+    # the cached option average does not keep the fitted model alive
+    model_ref = weakref.ref(model)
+    del model, option_average
+    gc.collect()
+    assert model_ref() is None
+
+
+def general_ei_reference(
+    model, X_sns_empty, functional_dims, X, best_f, exact
+):
+    # one posterior per sample, over the general options of each point
+    ei = []
+    for x in X:
+        X_sn = X_sns_empty.clone().repeat(1, x.shape[0], 1)
+        X_sn[:, :, functional_dims] = x[:, functional_dims]
+        ei_x = 0.0
+        for j in range(x.shape[0]):
+            posterior = model.posterior(X_sn[:, j, :])
+            if exact:
+                mvn = posterior.mvn
+                mu = mvn.mean.mean()
+                sigma = mvn.covariance_matrix.mean().clamp_min(1e-9).sqrt()
+            else:
+                mu = posterior.mean.mean()
+                sigma = posterior.variance.clamp_min(1e-9).sqrt().mean()
+            u = -(mu - best_f) / sigma
+            normal = torch.distributions.Normal(0.0, 1.0)
+            ucdf = normal.cdf(u)
+            updf = torch.exp(normal.log_prob(u))
+            ei_x = ei_x + sigma * (updf + u * ucdf)
+        ei.append(ei_x)
+    return torch.stack(ei)
+
+
+@pytest.mark.parametrize("q", [1, 2])
+@pytest.mark.parametrize("exact_posterior", [False, True])
+def test_general_acqf_forward(q, exact_posterior):
+    num_options, num_func_dims = 4, 2
+    num_dims = num_options + num_func_dims
+    train_x = torch.rand(20, num_dims).double()
+    train_y = torch.rand(20, 1).double()
+    model = SingleTaskGP(train_x, train_y)
+    model.eval()
+
+    # stand-in for the GeneralOptions of an ask() call, one-hot encoded options
+    X_sns_empty = torch.zeros(num_options, 1, num_dims).double()
+    X_sns_empty[:, 0, :num_options] = torch.eye(num_options).double()
+    functional_dims = np.arange(num_dims) >= num_options
+    general_options = GeneralOptions.__new__(GeneralOptions)
+    general_options.X_sns_empty = X_sns_empty
+    general_options.functional_dims = functional_dims
+    general_options.functional_idx = torch.arange(num_options, num_dims)
+    general_options.general_idx = torch.arange(num_options)
+    general_options._kernel_factors = weakref.WeakKeyDictionary()
+
+    best_f = torch.tensor(0.2).double()
+    acqf = FeasibilityAwareGeneral(
+        model,
+        None,
+        None,
+        None,
+        None,
+        best_f,
+        "naive-0",
+        0.2,
+        0.0,
+        None,
+        use_reg_only=True,
+        exact_posterior=exact_posterior,
+        general_options=general_options,
+    )
+
+    X = torch.rand(16, q, num_dims).double()
+    with torch.no_grad():
+        ei = acqf(X)
+        # only the functional dimensions, as in the mixed general optimization
+        ei_func = acqf(X[..., functional_dims])
+        ref_ei = general_ei_reference(
+            model, X_sns_empty, functional_dims, X, best_f, exact_posterior
+        )
+    assert ei.shape == (16,)
+    assert torch.allclose(ei, ref_ei)
+    assert torch.allclose(ei_func, ref_ei)
@@ -1,7 +1,17 @@
 #!/usr/bin/env python
 
+import warnings
+
 import numpy as np
 import pytest
+import torch
+from botorch.acquisition import (
+    MCAcquisitionFunction,
+    UpperConfidenceBound,
+    qUpperConfidenceBound,
+)
+from botorch.models import SingleTaskGP
+from botorch.sampling import SobolQMCNormalSampler
 from olympus.campaigns import Campaign, ParameterSpace
 from olympus.objects import (
     ParameterCategorical,
@@ -9,7 +19,11 @@ from olympus.objects import (
     ParameterDiscrete,
 )
 from olympus.surfaces import Surface
+from scipy.optimize import OptimizeWarning
 
+from atlas.optimizers.acquisition_optimizers.gradient_optimizer import (
+    GradientOptimizer,
+)
 from atlas.optimizers.gp.planner import BoTorchPlanner
 
 CONT = {
@@ -114,6 +128,173 @@ def test_init_design_mixed_cat_cont(
     run_mixed_cat_cont(init_design_strategy, batch_size, use_descriptors, acquisition_type, acquisition_optimizer)
 
 
+@pytest.mark.parametrize("acqf_mixed_strategy", ["serial", "batched"])
+@pytest.mark.parametrize("acqf_mixed_top_k", [None, 3])
+def test_acqf_mixed_strategy_mixed_cat_cont(acqf_mixed_strategy, acqf_mixed_top_k):
+    run_mixed_cat_cont(
+        "random",
+        1,
+        False,
+        "ei",
+        "gradient",
+        acqf_mixed_strategy=acqf_mixed_strategy,
+        acqf_mixed_top_k=acqf_mixed_top_k,
+    )
+
+
+def optimize_acqf_mixed(mixed_strategy, mixed_top_k=None, **kwargs):
+    # one-hot encoded categorical parameter followed by continuous parameters
+    torch.manual_seed(100700)
+    num_options, num_cont = 4, 2
+    num_dims = num_options + num_cont
+    train_x = torch.rand(20, num_dims).double()
+    train_x[:, :num_options] = torch.eye(num_options).double()[
+        torch.randint(num_options, (20,))
+    ]
+    model = SingleTaskGP(train_x, torch.rand(20, 1).double())
+    model.eval()
+    acqf = UpperConfidenceBound(model, beta=0.2)
+
+    bounds = torch.stack([torch.zeros(num_dims), torch.ones(num_dims)])
+    bounds = bounds.double()
+    fixed_features_list = [
+        {dim: float(dim == option) for dim in range(num_options)}
+        for option in range(num_options)
+    ]
+    batch_initial_conditions = torch.rand(6, 1, num_dims).double()
+
+    optimizer = GradientOptimizer.__new__(GradientOptimizer)
+    optimizer.mixed_strategy = mixed_strategy
+    optimizer.mixed_top_k = mixed_top_k
+    candidate, best_idx = optimizer._optimize_acqf_mixed(
+        acqf,
+        bounds,
+        num_restarts=6,
+        q=1,
+        fixed_features_list=fixed_features_list,
+        cart_prod_choices=None,
+        batch_initial_conditions=batch_initial_conditions,
+        **kwargs,
+    )
+    with torch.no_grad():
+        acq_value = acqf(candidate.view(1, 1, -1)).item()
+    return candidate.view(-1), int(best_idx[0]), acq_value
+
+
+@pytest.mark.parametrize("mixed_top_k", [None, 4])
+def test_acqf_mixed_batched_matches_serial(mixed_top_k):
+    serial_candidate, serial_idx, serial_value = optimize_acqf_mixed("serial")
+    candidate, best_idx, acq_value = optimize_acqf_mixed(
+        "batched", mixed_top_k=mixed_top_k
+    )
+    assert best_idx == serial_idx
+    assert np.isclose(acq_value, serial_value, atol=1e-4)
+    assert torch.allclose(candidate, serial_candidate, atol=1e-3)
+
+    # pruning to the top combination keeps the best one on this problem
+    _, best_idx, _ = optimize_acqf_mixed("batched", mixed_top_k=1)
+    assert best_idx == serial_idx
+
+
+def test_acqf_mixed_batched_options():
+    # options of optimize_acqf which scipy does not understand are dropped for
+    # the batched run
+    options = {"batch_limit": 5, "init_batch_limit": 10, "maxiter": 200}
+    serial_candidate, serial_idx, _ = optimize_acqf_mixed(
+        "serial", options=options
+    )
+    with warnings.catch_warnings():
+        warnings.simplefilter("error", OptimizeWarning)
+        candidate, best_idx, _ = optimize_acqf_mixed(
+            "batched", options=options
+        )
+    assert best_idx == serial_idx
+    assert torch.allclose(candidate, serial_candidate, atol=1e-3)
+
+
+def test_acqf_mixed_batched_post_processing():
+    # the batched run does not support post-processing, the serial path is used
+    num_calls = []
+
+    def post_processing_func(X):
+        num_calls.append(X.shape[0])
+        return X
+
+    optimize_acqf_mixed("batched", post_processing_func=post_processing_func)
+    assert len(num_calls) > 0
+
+
+def sequential_select_reference(acq_function, q, max_batch_size, choices):
+    # per-item sequential selection which rebuilds the choices at each step,
+    # analytic acquisition functions do not support pending points
+    original_choices = torch.clone(choices)
+    choices_batched = choices.unsqueeze(-2)
+    candidate_list = []
+    update_pending = isinstance(acq_function, MCAcquisitionFunction)
+    base_X_pending = getattr(acq_function, "X_pending", None)
+    for _ in range(q):
+        with torch.no_grad():
+            acq_values = torch.cat(
+                [
+                    acq_function(X_)
+                    for X_ in choices_batched.split(max_batch_size)
+                ]
+            )
+        best_idxs_ = torch.argsort(acq_values, descending=True)
+        best_idx = best_idxs_[torch.randint(low=0, high=500, size=(1,))]
+        candidate_list.append(choices_batched[best_idx])
+        if update_pending:
+            candidates = torch.cat(candidate_list, dim=-2)
+            acq_function.set_X_pending(
+                torch.cat([base_X_pending, candidates], dim=-2)
+                if base_X_pending is not None
+                else candidates
+            )
+        choices_batched = torch.cat(
+            [choices_batched[:best_idx], choices_batched[best_idx + 1 :]]
+        )
+    if update_pending:
+        acq_function.set_X_pending(base_X_pending)
+
+    best_idxs = []
+    for candidate in candidate_list:
+        matches = torch.all(candidate[0] == original_choices, dim=-1)
+        assert matches.sum() == 1
+        best_idxs.append(int(torch.where(matches)[0][0]))
+    return best_idxs
+
+
+@pytest.mark.parametrize("acqf_kind", ["analytic", "mc"])
+def test_acqf_discrete_sequential_matches_reference(acqf_kind):
+    torch.manual_seed(100700)
+    train_x = torch.rand(20, 3).double()
+    model = SingleTaskGP(train_x, torch.rand(20, 1).double())
+    model.eval()
+    if acqf_kind == "analytic":
+        acqf = UpperConfidenceBound(model, beta=0.2)
+    else:
+        sampler = SobolQMCNormalSampler(
+            sample_shape=torch.Size([64]), seed=100700
+        )
+        acqf = qUpperConfidenceBound(model, beta=0.2, sampler=sampler)
+    choices = torch.rand(800, 3).double()
+
+    optimizer = GradientOptimizer.__new__(GradientOptimizer)
+    optimizer.batched_strategy = "sequential"
+
+    torch.manual_seed(100701)
+    ref_idxs = sequential_select_reference(acqf, 4, 300, choices)
+    torch.manual_seed(100701)
+    candidates, best_idxs = optimizer._optimize_acqf_discrete(
+        acqf, q=4, max_batch_size=300, choices=choices, unique=True
+    )
+    assert best_idxs == ref_idxs
+    assert len(set(best_idxs)) == 4
+    for candidate, best_idx in zip(candidates, best_idxs):
+        assert torch.equal(candidate.view(-1), choices[best_idx])
+
+
+
 @pytest.mark.parametrize(
     "init_design_strategy", MIXED_DISC_CONT["init_design_strategy"]
 )
@@ -291,7 +472,7 @@ def run_categorical(
 
 
 def run_mixed_cat_cont(
-    init_design_strategy, batch_size, use_descriptors, acquisition_type, acquisition_optimizer, num_init_design=5
+    init_design_strategy, batch_size, use_descriptors, acquisition_type, acquisition_optimizer, num_init_design=5, **planner_kwargs
 ):
 
     param_space = ParameterSpace()
@@ -347,6 +528,7 @@ def run_mixed_cat_cont(
         use_descriptors=use_descriptors,
         acquisition_type=acquisition_type,
         acquisition_optimizer=acquisition_optimizer,
+        **planner_kwargs,
     )
     planner.set_param_space(param_space)
 
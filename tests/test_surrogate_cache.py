@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+
+import os
+
+import numpy as np
+import pytest
+import torch
+from olympus.campaigns import Campaign, ParameterSpace
+from olympus.objects import ParameterContinuous
+
+from atlas.optimizers.acquisition_optimizers import GradientOptimizer
+from atlas.optimizers.gp.planner import BoTorchPlanner
+
+
+def surface(x):
+    if x[0] + x[1] > 1.5:
+        return np.nan
+    return np.sin(8 * x[0]) - 2 * np.cos(6 * x[1])
+
+
+def set_planner(param_space, surrogate_cache_dir=None):
+    planner = BoTorchPlanner(
+        goal="minimize",
+        feas_strategy="fwa",
+        init_design_strategy="random",
+        num_init_design=5,
+        batch_size=1,
+        share_candidate_pool=True,
+        random_seed=100700,
+        surrogate_cache_dir=surrogate_cache_dir,
+    )
+    planner.set_param_space(param_space)
+    return planner
+
+
+def test_surrogate_cache(tmp_path, monkeypatch):
+    param_space = ParameterSpace()
+    param_space.add(ParameterContinuous(name="param_0", low=0.0, high=1.0))
+    param_space.add(ParameterContinuous(name="param_1", low=0.0, high=1.0))
+
+    planner = set_planner(param_space)
+
+    campaign = Campaign()
+    campaign.set_param_space(param_space)
+
+    BUDGET = 8
+    while len(campaign.observations.get_values()) < BUDGET:
+        samples = planner.recommend(campaign.observations)
+        for sample in samples:
+            sample_arr = sample.to_array()
+            campaign.add_observation(sample_arr, surface(sample_arr))
+
+    # the surrogate fitting consumes the global random state on a cache miss
+    # only, reseed it before the acquisition optimization of both planners
+    optimize = GradientOptimizer.optimize
+
+    def seeded_optimize(self):
+        np.random.seed(100700)
+        torch.manual_seed(100700)
+        return optimize(self)
+
+    monkeypatch.setattr(GradientOptimizer, "optimize", seeded_optimize)
+
+    # fit the surrogates on the final observations and cache them
+    fresh_planner = set_planner(param_space, surrogate_cache_dir=str(tmp_path))
+    fresh_samples = fresh_planner.recommend(campaign.observations)
+    num_entries = len(os.listdir(tmp_path))
+    assert num_entries > 0
+
+    # a fresh planner reuses the surrogates fitted on the same observations
+    def no_fit(*args, **kwargs):
+        raise AssertionError("surrogates refitted on a cache hit")
+
+    new_planner = set_planner(param_space, surrogate_cache_dir=str(tmp_path))
+    monkeypatch.setattr(new_planner, "build_train_regression_gp", no_fit)
+    monkeypatch.setattr(new_planner, "build_train_classification_gp", no_fit)
+    new_samples = new_planner.recommend(campaign.observations)
+
+    assert len(os.listdir(tmp_path)) == num_entries
+    key = new_planner.get_surrogate_cache_key()
+    assert new_planner.surrogate_cache.get(key) is not None
+
+    # the cached surrogates give the same recommendation as a fresh fit
+    assert len(new_samples) == len(fresh_samples)
+    for new_sample, fresh_sample in zip(new_samples, fresh_samples):
+        assert np.allclose(new_sample.to_array(), fresh_sample.to_array())
+
+    # surrogates are not shared between planner configurations
+    for attr, value in [
+        ("batch_size", 2),
+        ("candidate_sampler", "sobol"),
+        ("candidate_pool_size", 17),
+        ("share_candidate_pool", False),
+        ("exact_general_posterior", True),
+    ]:
+        default = getattr(new_planner, attr)
+        setattr(new_planner, attr, value)
+        assert new_planner.get_surrogate_cache_key() != key
+        setattr(new_planner, attr, default)
@@ -0,0 +1,368 @@
+#!/usr/bin/env python
+
+import numpy as np
+import pytest
+import torch
+from olympus.campaigns import ParameterSpace
+from olympus.objects import (
+    ParameterCategorical,
+    ParameterContinuous,
+    ParameterDiscrete,
+)
+
+from atlas.optimizers.acqfs import (
+    OptionSpace,
+    create_available_options,
+    get_batch_initial_conditions,
+)
+from atlas.optimizers.samplers import (
+    CandidatePool,
+    InitialDesignSampler,
+    sample_param_space,
+)
+from atlas.optimizers.utils import (
+    ParamEncoder,
+    PartitionSampler,
+    batched_constraint,
+    cat_param_to_feat,
+    evaluate_known_constraints,
+    gen_partitions,
+    propose_randomly,
+)
+
+
+def mixed_param_space():
+    param_space = ParameterSpace()
+    param_space.add(ParameterContinuous(name="param_0", low=0.0, high=1.0))
+    param_space.add(
+        ParameterCategorical(
+            name="param_1",
+            options=["x0", "x1", "x2"],
+            descriptors=[[0.0, 1.0], [1.0, 0.0], [0.5, 0.5]],
+        )
+    )
+    param_space.add(
+        ParameterDiscrete(name="param_2", options=[0.0, 0.25, 0.5, 1.0])
+    )
+    return param_space
+
+
+@pytest.mark.parametrize("has_descriptors", [False, True])
+def test_param_encoder(has_descriptors):
+    param_space = mixed_param_space()
+    encoder = ParamEncoder(param_space, has_descriptors)
+
+    X = np.array(
+        [
+            [np.random.uniform(), np.random.choice(param_space[1].options), np.random.choice(param_space[2].options)]
+            for _ in range(50)
+        ],
+        dtype=object,
+    )
+
+    expected = []
+    for sample in X:
+        feats = [float(sample[0])]
+        feats.extend(cat_param_to_feat(param_space[1], sample[1], has_descriptors))
+        feats.append(float(sample[2]))
+        expected.append(feats)
+
+    encoded = encoder.encode(X)
+    assert encoded.shape == (50, encoder.num_feats)
+    assert np.allclose(encoded, np.array(expected))
+
+    with pytest.raises(ValueError):
+        encoder.encode([[0.5, "x3", 0.25]])
+
+
+@pytest.mark.parametrize("has_descriptors", [False, True])
+def test_propose_randomly(has_descriptors):
+    param_space = mixed_param_space()
+    encoder = ParamEncoder(param_space, has_descriptors)
+
+    proposals, raw_proposals = propose_randomly(
+        100, param_space, has_descriptors, rng=np.random.default_rng(100700)
+    )
+    assert proposals.shape == (100, encoder.num_feats)
+    assert raw_proposals.shape == (100, len(param_space))
+    assert np.allclose(encoder.encode(raw_proposals), proposals)
+    assert np.all((proposals[:, 0] >= 0.0) & (proposals[:, 0] <= 1.0))
+    assert set(raw_proposals[:, 1]).issubset(param_space[1].options)
+
+    # the same generator seed gives the same proposals
+    proposals_torch, _ = propose_randomly(
+        100,
+        param_space,
+        has_descriptors,
+        rng=np.random.default_rng(100700),
+        return_torch=True,
+    )
+    assert isinstance(proposals_torch, torch.Tensor)
+    assert np.allclose(proposals_torch.numpy(), proposals)
+
+
+@pytest.mark.parametrize("kind", ["random", "sobol", "lhs"])
+def test_sample_param_space(kind):
+    param_space = mixed_param_space()
+    encoder = ParamEncoder(param_space, False)
+
+    samples, raw_samples = sample_param_space(
+        64, param_space, False, kind=kind, rng=np.random.default_rng(100700)
+    )
+    assert samples.shape == (64, encoder.num_feats)
+    assert np.allclose(encoder.encode(raw_samples), samples)
+
+    if kind != "random":
+        # space-filling designs cover every quarter of the continuous range
+        counts, _ = np.histogram(samples[:, 0], bins=4, range=(0.0, 1.0))
+        assert np.all(counts == 16)
+
+
+@pytest.mark.parametrize("kind", ["random", "sobol", "lhs"])
+def test_initial_design_sampler(kind):
+    param_space = mixed_param_space()
+
+    @batched_constraint
+    def known_constraint(params):
+        return (params[:, 0].astype(float) < 0.2) & (params[:, 1] != "x0")
+
+    sampler = InitialDesignSampler(
+        param_space,
+        kind=kind,
+        known_constraints=known_constraint,
+        rng=np.random.default_rng(100700),
+    )
+    samples = []
+    num_attempted = 0
+    for _ in range(3):
+        samples_, num_attempted_ = sampler.sample(4)
+        assert samples_.shape == (4, len(param_space))
+        samples.append(samples_)
+        num_attempted += num_attempted_
+    samples = np.concatenate(samples)
+
+    assert np.all(evaluate_known_constraints(known_constraint, samples, param_space))
+    assert num_attempted >= samples.shape[0]
+    if kind == "sobol":
+        # the sequence continues where the previous batch stopped
+        assert sampler.sobol_index == num_attempted
+
+
+@pytest.mark.parametrize("batch_size", [1, 2])
+def test_candidate_pool(batch_size):
+    param_space = mixed_param_space()
+    encoder = ParamEncoder(param_space, False)
+    mins_x = np.zeros(encoder.num_feats)
+    maxs_x = np.ones(encoder.num_feats)
+
+    pool = CandidatePool(
+        501,
+        param_space,
+        False,
+        mins_x,
+        maxs_x,
+        batch_size=batch_size,
+        rng=np.random.default_rng(100700),
+    )
+    assert len(pool) % batch_size == 0
+    # the candidates are drawn on first use
+    assert not pool.is_drawn
+    assert pool.batched_samples.shape == (
+        len(pool) // batch_size,
+        batch_size,
+        encoder.num_feats,
+    )
+
+    num_calls = []
+
+    def constraint(X):
+        num_calls.append(X.shape[0])
+        return X[..., 0] - 0.5
+
+    for _ in range(2):
+        batch_initial_conditions, raw_conditions = get_batch_initial_conditions(
+            num_restarts=10,
+            batch_size=batch_size,
+            param_space=param_space,
+            constraint_callable=[constraint],
+            mins_x=mins_x,
+            maxs_x=maxs_x,
+            has_descriptors=False,
+            return_raw=True,
+            candidate_pool=pool,
+        )
+        assert batch_initial_conditions.shape == (10, batch_size, encoder.num_feats)
+        assert torch.all(batch_initial_conditions[..., 0] >= 0.5)
+        assert raw_conditions.shape == (10, len(param_space))
+
+    # the constraint is evaluated once on the pool
+    assert len(num_calls) == 1
+
+
+def cat_disc_param_space():
+    param_space = ParameterSpace()
+    param_space.add(
+        ParameterCategorical(name="param_0", options=["x0", "x1", "x2"])
+    )
+    param_space.add(
+        ParameterDiscrete(name="param_1", options=[0.0, 0.25, 0.5, 1.0])
+    )
+    param_space.add(
+        ParameterCategorical(name="param_2", options=["y0", "y1"])
+    )
+    return param_space
+
+
+@pytest.mark.parametrize("chunk_size", [1, 5, 100000])
+def test_create_available_options(chunk_size):
+    param_space = cat_disc_param_space()
+    params = [
+        np.array(["x0", 0.25, "y1"], dtype=object),
+        np.array(["x2", 1.0, "y0"], dtype=object),
+    ]
+
+    def known_constraint(params):
+        return params[0] != "x1"
+
+    choices_feat, choices_cat = create_available_options(
+        param_space,
+        params,
+        fca_constraint_callable=None,
+        known_constraint_callables=[known_constraint],
+        normalize=False,
+        mins_x=None,
+        maxs_x=None,
+        has_descriptors=False,
+        chunk_size=chunk_size,
+    )
+
+    # 2 x 4 x 2 options satisfy the known constraint, 2 of which are measured
+    assert choices_feat.shape == (14, 3 + 1 + 2)
+    assert choices_cat.shape == (14, 3)
+    assert not np.any(choices_cat[:, 0] == "x1")
+    measured = [[str(elem) for elem in param] for param in params]
+    assert not any(list(cat) in measured for cat in choices_cat)
+
+    encoder = ParamEncoder(param_space, False)
+    assert np.allclose(encoder.encode(choices_cat), choices_feat.numpy())
+
+
+def test_option_space():
+    param_space = cat_disc_param_space()
+    params = [
+        np.array(["x0", 0.25, "y1"], dtype=object),
+        np.array(["x2", 1.0, "y0"], dtype=object),
+    ]
+
+    option_space = OptionSpace(param_space, None, False)
+
+    # the options are enumerated on first use, with the observations so far
+    option_space.update(params[:1])
+    assert not option_space.is_built
+    assert len(option_space) == 3 * 4 * 2
+    assert option_space.measured.sum() == 1
+
+    nbytes = (
+        option_space.feat.numpy().nbytes
+        + option_space.cat.nbytes
+        + option_space.flat_ixs.nbytes
+        + option_space.measured.nbytes
+    )
+    assert nbytes <= OptionSpace.estimate_nbytes(param_space, False)
+
+    # observations are marked incrementally
+    option_space.update(params)
+    assert option_space.measured.sum() == 2
+
+    choices_feat, choices_cat = create_available_options(
+        param_space,
+        params,
+        fca_constraint_callable=None,
+        known_constraint_callables=None,
+        normalize=False,
+        mins_x=None,
+        maxs_x=None,
+        has_descriptors=False,
+    )
+    avail = list(
+        option_space.iter_available(
+            normalize=False, mins_x=None, maxs_x=None, chunk_size=5
+        )
+    )
+    assert torch.equal(torch.cat([feat for feat, _ in avail]), choices_feat)
+    assert np.all(np.concatenate([cat for _, cat in avail]) == choices_cat)
+
+    # replaced observations reset the measured options
+    option_space.update(params[1:])
+    assert option_space.measured.sum() == 1
+
+
+def test_evaluate_known_constraints():
+    param_space = cat_disc_param_space()
+    params = np.array(
+        [["x0", 0.25, "y1"], ["x1", 1.0, "y0"], ["x2", 0.0, "y1"]], dtype=object
+    )
+
+    def known_constraint(params):
+        return params[0] != "x1"
+
+    @batched_constraint
+    def batched_known_constraint(params):
+        return params[:, 1].astype(float) < 0.5
+
+    @batched_constraint(as_dataframe=True)
+    def dataframe_known_constraint(params):
+        return (params["param_2"] == "y1").values
+
+    assert np.all(
+        evaluate_known_constraints(known_constraint, params, param_space)
+        == [True, False, True]
+    )
+    assert np.all(
+        evaluate_known_constraints(
+            [known_constraint, batched_known_constraint], params, param_space
+        )
+        == [True, False, True]
+    )
+    assert np.all(
+        evaluate_known_constraints(
+            [batched_known_constraint, dataframe_known_constraint],
+            params,
+            param_space,
+        )
+        == [True, False, True]
+    )
+    assert np.all(evaluate_known_constraints(None, params, param_space))
+
+
+@pytest.mark.parametrize("num_blocks", [None, 1, 3])
+def test_partition_sampler(num_blocks):
+    S = list(range(6))
+    sampler = PartitionSampler(S, num_blocks=num_blocks)
+
+    def canonical(G):
+        return tuple(sorted(tuple(sorted(block)) for block in G))
+
+    partitions = gen_partitions(S)
+    if num_blocks is not None:
+        partitions = [G for G in partitions if len(G) == num_blocks]
+    assert sampler.num_partitions == len(partitions)
+
+    # unranking enumerates every partition exactly once, in rank order
+    unranked = [sampler.unrank(r) for r in range(sampler.num_partitions)]
+    assert sorted(canonical(G) for G in unranked) == sorted(
+        canonical(G) for G in partitions
+    )
+    assert all(sampler.rank(G) == r for r, G in enumerate(unranked))
+
+    samples = sampler.sample(10, rng=np.random.default_rng(100700))
+    ranks = [sampler.rank(G) for G in samples]
+    assert len(samples) == min(10, sampler.num_partitions)
+    assert len(set(ranks)) == len(ranks)
+    if num_blocks is not None:
+        assert all(len(G) == num_blocks for G in samples)
+
+    # large sets are sampled without enumeration
+    sampler = PartitionSampler(list(range(40)))
+    samples = sampler.sample(5, rng=np.random.default_rng(100700))
+    assert all(sampler.unrank(sampler.rank(G)) == G for G in samples)